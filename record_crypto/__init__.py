@@ -0,0 +1,51 @@
+"""
+레코드별 개인정보 암호화/복호화 파이프라인.
+
+명령행에서는 `python -m record_crypto <encrypt|decrypt|tamper-test|verify>`로,
+서비스 코드에서는 아래 라이브러리 API를 직접 import 해서 사용합니다.
+
+    from record_crypto import encrypt_csv, decrypt_to_csv
+    encrypt_csv(password, raw_path="data.csv", encrypted_path="data.bin", salt_path="data.salt")
+
+cryptography 스택은 실제로 API를 처음 사용할 때 import 됩니다. (패키지 import 자체는 가볍다!)
+"""
+import importlib
+
+# 공개 이름 -> 정의된 하위 모듈
+_LAZY_EXPORTS = {
+    "encrypt_csv": "pipeline",
+    "decrypt_to_csv": "pipeline",
+    "tamper_test": "pipeline",
+    "verify_without_key": "pipeline",
+    "load_key": "pipeline",
+    "RunSummary": "pipeline",
+    "derive_key": "kdf",
+    "encrypt_records": "engine",
+    "decrypt_records": "engine",
+    "DecryptResult": "engine",
+    "decrypt_file": "reader",
+    "MappedRecordFile": "reader",
+    "IndexedRecordStore": "index",
+    "ContainerReader": "container",
+    "ContainerWriter": "container",
+    "ColumnarReader": "columnar",
+    "ColumnarWriter": "columnar",
+    "BlockReader": "blocks",
+    "BlockWriter": "blocks",
+    "scan_integrity": "integrity",
+    "rekey": "rekey",
+    "ShardedDataset": "shards",
+    "BlindIndex": "blind_index",
+    "lookup_records": "blind_index",
+}
+
+__all__ = sorted(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,314 @@
+"""
+암호화 / 복호화 / 손상 복호화 / 틀린 키 시나리오 벤치마크.
+
+'Temporary personal data.csv'와 같은 8개 컬럼 스키마의 가짜 개인정보 CSV를 원하는 행 수(10^3 ~ 10^7)만큼 만들고,
+단계별로 따로 시간을 재서 릴리스마다 비교할 수 있는 JSON으로 보고합니다.
+
+    python -m record_crypto bench --rows 1000 100000 --output bench.json
+
+시나리오별 측정 항목:
+    seconds, records_per_s, mb_per_s   - 병렬 파이프라인 전체의 벽시계 기준 처리량
+    latency_us (p50/p99)              - 표본 레코드를 하나씩 처리하며 잰 레코드당 지연 시간
+    peak_rss_bytes                    - 그 시나리오만의 최대 RSS (시나리오 프로세스 / 그 워커 자식 프로세스)
+                                        시나리오마다 새 인터프리터(spawn)에서 돌리고 끝날 때 ru_maxrss를 읽으므로,
+                                        앞 시나리오나 더 큰 행 수에서 찍은 최대값이 섞이지 않습니다.
+"""
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from . import kdf
+from .engine import decrypt_token, default_workers
+from .incremental import checkpoint_path_for
+from .index import index_path_for
+from .keycheck import is_key_correct, key_check_path_for
+from .output import failure_path_for
+from .pipeline import corrupt_random_records, write_decrypted_csv, write_encrypted_records
+
+BENCH_SCHEMA_VERSION = 1
+CSV_HEADER = "이름,주소,전화번호,이메일,나이,성별,주민등록번호,은행계좌"
+LATENCY_SAMPLE_SIZE = 1000  # 레코드당 지연 시간을 잴 표본 수
+BENCH_PASSWORD = "benchmark-password"
+
+_SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+_GIVEN_NAMES = ["주원", "민준", "서연", "지우", "하은", "도윤", "서준", "예린", "지호", "수아", "현우", "유진"]
+_REGIONS = ["서울특별시 강남구", "부산광역시 해운대구", "대구광역시 남구", "인천광역시 연수구", "광주광역시 북구",
+            "대전광역시 서구", "울산광역시 중구", "경기도 수원시", "강원도 남양주시", "충청북도 청주시",
+            "전라남도 목포시", "경상북도 포항시", "제주특별자치도 제주시"]
+_EMAIL_DOMAINS = ["gmail.com", "naver.com", "daum.net", "kakao.com"]
+_BANKS = [("신한", "{0:03d}-{1:03d}-{2:06d}"), ("국민", "{0:06d}-{1:02d}-{2:06d}"),
+          ("우리", "{0:04d}-{1:03d}-{2:06d}"), ("하나", "{0:03d}-{1:06d}-{2:05d}"),
+          ("농협", "{0:03d}-{1:04d}-{2:04d}")]
+
+
+def _synthetic_row(rng: random.Random) -> str:
+    gender = rng.choice("남여")
+    age = rng.randint(19, 79)
+    birth_year = 2025 - age
+    century_digit = (1 if gender == "남" else 2) + (2 if birth_year >= 2000 else 0)
+    rrn = f"{birth_year % 100:02d}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}-{century_digit}{rng.randint(0, 999999):06d}"
+    bank, account_format = rng.choice(_BANKS)
+    account = account_format.format(rng.randint(0, 999), rng.randint(0, 99), rng.randint(0, 99999))
+    email_user = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 8)))
+    return ",".join([
+        rng.choice(_SURNAMES) + rng.choice(_GIVEN_NAMES),
+        rng.choice(_REGIONS),
+        f"010-{rng.randint(0, 9999):04d}-{rng.randint(0, 9999):04d}",
+        f"{email_user}@{rng.choice(_EMAIL_DOMAINS)}",
+        str(age),
+        gender,
+        rrn,
+        f"{bank} {account}",
+    ])
+
+
+def generate_synthetic_csv(path: str, rows: int, seed: Optional[int] = 0) -> int:
+    """
+    헤더 + rows개 데이터 행의 가짜 개인정보 CSV를 스트리밍으로 만들고, 파일 크기(바이트)를 돌려줍니다.
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', buffering=1024 * 1024) as f:
+        f.write(CSV_HEADER + "\n")
+        for _ in range(rows):
+            f.write(_synthetic_row(rng) + "\n")
+    return os.path.getsize(path)
+
+
+def _peak_rss() -> Dict[str, Optional[int]]:
+    """현재 프로세스와 (이미 끝나 회수된) 자식 프로세스들의 최대 RSS."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {"self": None, "children": None}
+    # Linux는 KB 단위, macOS는 바이트 단위로 보고한다.
+    unit = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit,
+    }
+
+
+def _scenario_process(conn, scenario: Callable[[Dict], Dict], ctx: Dict) -> None:
+    try:
+        result = scenario(ctx)
+        # 워커 풀은 시나리오 안에서 닫혔으므로 RUSAGE_CHILDREN에 이 시나리오의 워커들이 들어 있다.
+        result["peak_rss_bytes"] = _peak_rss()
+        conn.send((True, result))
+    except BaseException as e:
+        conn.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _run_isolated(scenario: Callable[[Dict], Dict], ctx: Dict) -> Dict:
+    """
+    시나리오 하나를 새 인터프리터(spawn)에서 돌려 결과를 받습니다.
+    ru_maxrss는 프로세스 수명 동안 줄어들지 않으므로, 시나리오별 최대 RSS를 재려면 프로세스를 따로 써야 합니다.
+    """
+    mp = multiprocessing.get_context("spawn")
+    receiver, sender = mp.Pipe(duplex=False)
+    process = mp.Process(target=_scenario_process, args=(sender, scenario, ctx))
+    process.start()
+    sender.close()
+    try:
+        ok, payload = receiver.recv()
+    except EOFError:
+        ok, payload = False, None
+    finally:
+        receiver.close()
+        process.join()
+    if payload is None:
+        payload = f"프로세스가 결과 없이 종료되었습니다 (exit code {process.exitcode})"
+    if not ok:
+        raise RuntimeError(f"벤치마크 시나리오 '{scenario.__name__}' 실패: {payload}")
+    return payload
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def _latency_us(func: Callable, items: Iterable) -> Dict[str, Optional[float]]:
+    samples = []
+    for item in items:
+        start = time.perf_counter_ns()
+        func(item)
+        samples.append((time.perf_counter_ns() - start) / 1000.0)
+    samples.sort()
+    return {"p50": _percentile(samples, 0.50), "p99": _percentile(samples, 0.99), "samples": len(samples)}
+
+
+def _sample_tokens(encrypted_path: str, limit: int) -> List[bytes]:
+    tokens = []
+    with open(encrypted_path, 'rb') as f:
+        for line in f:
+            if len(tokens) >= limit:
+                break
+            if line.strip(b'\n'):
+                tokens.append(line.strip(b'\n'))
+    return tokens
+
+
+def _result(scenario: str, rows: int, records: int, seconds: float, nbytes: int,
+            latency: Optional[Dict] = None, **extra) -> Dict:
+    result = {
+        "scenario": scenario,
+        "rows": rows,
+        "records": records,
+        "seconds": seconds,
+        "records_per_s": records / seconds if seconds > 0 else None,
+        "mb_per_s": nbytes / 1e6 / seconds if seconds > 0 else None,
+        "latency_us": latency,
+    }
+    result.update(extra)
+    return result
+
+
+# 각 시나리오는 _run_isolated로 새 프로세스에서 돌므로 모듈 수준 함수여야 하고,
+# 필요한 값은 모두 ctx(경로, 행 수, 키 등)로 받는다.
+
+def _scenario_kdf(ctx: Dict) -> Dict:
+    """KDF (캐시를 비우고 PBKDF2 한 번의 순수 비용). 이후 시나리오가 쓸 키를 "key"로 같이 돌려준다."""
+    kdf.clear_memo()
+    start = time.perf_counter()
+    key = kdf.derive_key(BENCH_PASSWORD, ctx["salt"], ctx["iterations"], use_disk_cache=False)
+    result = _result("kdf", ctx["rows"], 1, time.perf_counter() - start, 0, iterations=ctx["iterations"])
+    result["key"] = key
+    return result
+
+
+def _scenario_encrypt(ctx: Dict) -> Dict:
+    """암호화 (CSV 읽기 + 병렬 암호화 + 토큰/인덱스 쓰기)"""
+    from cryptography.fernet import Fernet
+
+    start = time.perf_counter()
+    write_encrypted_records(ctx["key"], ctx["raw_path"], ctx["encrypted_path"], ctx["workers"])
+    seconds = time.perf_counter() - start
+    with open(ctx["raw_path"], 'rb') as f:
+        sample_lines = [line.rstrip(b'\n') for _, line in zip(range(LATENCY_SAMPLE_SIZE), f)]
+    return _result("encrypt", ctx["rows"], ctx["records"], seconds, ctx["csv_bytes"],
+                   _latency_us(Fernet(ctx["key"]).encrypt, sample_lines))
+
+
+def _scenario_decrypt(ctx: Dict) -> Dict:
+    """정상 복호화"""
+    from cryptography.fernet import Fernet
+
+    fernet = Fernet(ctx["key"])
+    start = time.perf_counter()
+    summary = write_decrypted_csv(ctx["key"], ctx["encrypted_path"], ctx["output_path"], workers=ctx["workers"])
+    seconds = time.perf_counter() - start
+    sample_tokens = _sample_tokens(ctx["encrypted_path"], LATENCY_SAMPLE_SIZE)
+    return _result("decrypt", ctx["rows"], summary.total, seconds, os.path.getsize(ctx["encrypted_path"]),
+                   _latency_us(lambda t: decrypt_token(fernet, 0, t), sample_tokens), failed=summary.failed)
+
+
+def _scenario_corrupted_decrypt(ctx: Dict) -> Dict:
+    """손상된 레코드가 섞인 복호화"""
+    from cryptography.fernet import Fernet
+
+    fernet = Fernet(ctx["key"])
+    corrupted = corrupt_random_records(ctx["encrypted_path"], max(1, ctx["records"] // 100), random.Random(ctx["seed"]))
+    start = time.perf_counter()
+    summary = write_decrypted_csv(ctx["key"], ctx["encrypted_path"], ctx["output_path"], workers=ctx["workers"],
+                                  overrides=corrupted)
+    return _result("corrupted-decrypt", ctx["rows"], summary.total, time.perf_counter() - start,
+                   os.path.getsize(ctx["encrypted_path"]),
+                   _latency_us(lambda t: decrypt_token(fernet, 0, t), corrupted.values()),
+                   failed=summary.failed, corrupted=len(corrupted))
+
+
+def _scenario_wrong_key(ctx: Dict) -> Dict:
+    """틀린 키 (감사 모드처럼 모든 레코드를 시도 -> 모두 InvalidToken)"""
+    from cryptography.fernet import Fernet
+
+    wrong_key = Fernet.generate_key()
+    wrong_fernet = Fernet(wrong_key)
+    start = time.perf_counter()
+    summary = write_decrypted_csv(wrong_key, ctx["encrypted_path"], ctx["output_path"], workers=ctx["workers"])
+    seconds = time.perf_counter() - start
+    sample_tokens = _sample_tokens(ctx["encrypted_path"], LATENCY_SAMPLE_SIZE)
+    return _result("wrong-key", ctx["rows"], summary.total, seconds, os.path.getsize(ctx["encrypted_path"]),
+                   _latency_us(lambda t: decrypt_token(wrong_fernet, 0, t), sample_tokens), failed=summary.failed)
+
+
+def _scenario_wrong_key_check(ctx: Dict) -> Dict:
+    """틀린 키 조기 거부 (키 검증 태그만 확인)"""
+    from cryptography.fernet import Fernet
+
+    wrong_key = Fernet.generate_key()
+    start = time.perf_counter()
+    rejected = not is_key_correct(ctx["encrypted_path"], wrong_key)
+    return _result("wrong-key-check", ctx["rows"], ctx["records"], time.perf_counter() - start, 0, rejected=rejected)
+
+
+_SCENARIOS = (_scenario_encrypt, _scenario_decrypt, _scenario_corrupted_decrypt, _scenario_wrong_key,
+              _scenario_wrong_key_check)
+
+
+def run_scenarios(rows: int, work_dir: str, workers: Optional[int] = None,
+                  iterations: int = kdf.DEFAULT_ITERATIONS, seed: Optional[int] = 0) -> List[Dict]:
+    """
+    행 수 하나에 대해 kdf / encrypt / decrypt / corrupted-decrypt / wrong-key / wrong-key-check 시나리오를
+    차례로, 각각 별도 프로세스에서 잽니다.
+    """
+    raw_path = os.path.join(work_dir, f"bench_{rows}.csv")
+    encrypted_path = os.path.join(work_dir, f"bench_{rows}.bin")
+    output_path = os.path.join(work_dir, f"bench_{rows}_out.csv")
+    ctx = {
+        "rows": rows, "records": rows + 1,  # 헤더 줄도 레코드로 암호화된다
+        "raw_path": raw_path, "encrypted_path": encrypted_path, "output_path": output_path,
+        "csv_bytes": generate_synthetic_csv(raw_path, rows, seed),
+        "workers": workers, "iterations": iterations, "seed": seed, "salt": os.urandom(16),
+    }
+    try:
+        kdf_result = _run_isolated(_scenario_kdf, ctx)
+        ctx["key"] = kdf_result.pop("key")
+        results = [kdf_result]
+        for scenario in _SCENARIOS:
+            results.append(_run_isolated(scenario, ctx))
+    finally:
+        for path in (raw_path, encrypted_path, index_path_for(encrypted_path), key_check_path_for(encrypted_path),
+                     checkpoint_path_for(encrypted_path), output_path, failure_path_for(output_path)):
+            if os.path.exists(path):
+                os.remove(path)
+    return results
+
+
+def run_benchmark(row_counts: Iterable[int], workers: Optional[int] = None,
+                  iterations: int = kdf.DEFAULT_ITERATIONS, work_dir: Optional[str] = None,
+                  seed: Optional[int] = 0) -> Dict:
+    """여러 데이터셋 크기에 대해 벤치마크를 돌리고, JSON으로 직렬화 가능한 보고서를 돌려줍니다."""
+    workers = workers or default_workers()
+    report = {
+        "schema_version": BENCH_SCHEMA_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workers": workers,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix="record_crypto_bench_") as tmp_dir:
+        for rows in row_counts:
+            report["results"].extend(run_scenarios(rows, tmp_dir, workers, iterations, seed))
+    return report
+
+
+def write_report(report: Dict, output_path: Optional[str] = None) -> None:
+    """보고서를 JSON 파일로 쓰거나, 경로가 없으면 표준 출력으로 내보냅니다."""
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,322 @@
+"""
+이메일 / 전화번호 같은 컬럼의 값으로 레코드를 찾는 블라인드 인덱스 (keyed-HMAC).
+
+예전에는 특정 이메일의 행을 찾으려면 encrypted_records.bin의 모든 토큰을 복호화해서 평문을 훑어야 했습니다.
+(조회 한 번에 레코드 수만큼의 복호화!) 여기서는 암호화할 때 컬럼 값마다
+HMAC-SHA256(컬럼별 하위 키, 정규화한 값)을 계산해 '해시 -> 레코드 번호' 표로 정렬해 두고,
+조회할 때는 이 표를 mmap 해서 이진 탐색한 뒤 일치하는 레코드만 IndexedRecordStore로 복호화합니다.
+
+하위 키는 Fernet 키에서 컬럼마다 HKDF로 따로 파생하므로, 키 없이는 해시에서 값을 추측할 수 없고
+같은 값이라도 컬럼이 다르면 해시가 다릅니다. (단, 같은 값을 가진 행끼리는 같은 해시라서 '값이 같다'는 사실은 드러난다)
+
+인덱스 파일 '<암호화 파일>.<컬럼>.bidx' 형식:
+    BLIND_INDEX_MAGIC (8바이트)
+    records u64 | entries u64 | column_position u32   (little-endian, 만들 당시의 레코드 수 / 항목 수 / 컬럼 위치)
+    key_tag (32바이트)                                 : 이 인덱스를 만든 하위 키의 검증 태그
+    항목 x entries, (해시, 레코드 번호) 순으로 정렬    : HMAC 앞 16바이트 | 레코드 번호 u64 big-endian
+
+해시를 16바이트로 자르므로 충돌은 사실상 없지만, 조회 결과는 복호화한 뒤 값을 한 번 더 비교해서 돌려줍니다.
+
+인덱스를 만들 때는 항목을 고정 길이(ENTRY_SIZE) 바이트열로 이어 붙여 모으다가, 컬럼마다 BLIND_INDEX_RUN_ENTRIES개가 차면
+정렬해서 임시 파일(정렬된 run)로 내리고, 마지막에 run들을 병합하면서 인덱스 파일을 씁니다.
+(레코드 수와 상관없이 메모리는 run 하나 크기만큼만 쓴다)
+
+키 교체(rekey)나 증분 암호화로 데이터 파일이 바뀌면 그 파일의 인덱스는 remove_blind_indexes()로 지웁니다.
+(이름이 정확히 일치하는 컬럼의 인덱스만 지운다. 그 밖의 컬럼으로 만든 인덱스가 남아 있어도
+조회할 때 키 검증 태그와 레코드 수로 예전 인덱스임을 알아내고 거부한다)
+"""
+import base64
+import csv
+import hashlib
+import heapq
+import hmac
+import mmap
+import os
+import re
+import struct
+import tempfile
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from . import config
+from .engine import DecryptResult
+from .index import IndexedRecordStore
+from .kdf import derive_subkey
+from .keycheck import KEY_CHECK_LABEL, ensure_key_correct, tags_match
+from .pipeline import Log, _log, _require_file, load_key
+from .reader import decrypt_file
+
+BLIND_INDEX_MAGIC = b"RCBLND1\0"
+BLIND_INDEX_SUFFIX = ".bidx"
+BLIND_INDEX_KEY_LABEL = b"record_crypto blind index v1\0"
+HASH_SIZE = 16
+_HEADER = struct.Struct('<QQI')
+_RECORD = struct.Struct('>Q')  # big-endian이라 (해시 + 레코드 번호) 바이트열 정렬 = (해시, 번호) 정렬
+ENTRY_SIZE = HASH_SIZE + _RECORD.size
+_KEY_TAG_SIZE = 32
+_DATA_START = len(BLIND_INDEX_MAGIC) + _HEADER.size + _KEY_TAG_SIZE
+_WRITE_ENTRIES = 65536  # 병합한 항목을 이 개수씩 묶어서 쓴다
+
+# 컬럼별 값 정규화 (같은 이메일/번호를 다르게 적어도 같은 해시가 나오도록)
+_NORMALIZERS: Dict[str, Callable[[str], str]] = {
+    "이메일": lambda value: value.strip().lower(),
+    "전화번호": lambda value: re.sub(r"\D", "", value),
+}
+
+
+def normalize(column: str, value: str) -> str:
+    return _NORMALIZERS.get(column, str.strip)(value)
+
+
+def blind_index_path_for(data_path: str, column: str) -> str:
+    return f"{data_path}.{column.replace(os.sep, '_')}{BLIND_INDEX_SUFFIX}"
+
+
+def blind_index_paths(data_path: str, columns: Sequence[str] = config.BLIND_INDEX_COLUMNS) -> List[str]:
+    """
+    data_path에 딸린 columns의 블라인드 인덱스 중 실제로 있는 파일 경로.
+    ('<파일>.*.bidx'로 찾으면 'records.bin.v2' 같은 이웃 데이터셋의 인덱스까지 잡히므로 컬럼 이름으로만 찾는다)
+    """
+    paths = dict.fromkeys(blind_index_path_for(data_path, column) for column in columns)
+    return [path for path in paths if os.path.exists(path)]
+
+
+def remove_blind_indexes(data_path: str, columns: Sequence[str] = config.BLIND_INDEX_COLUMNS) -> List[str]:
+    """데이터 파일이 바뀌어 더는 맞지 않는 columns의 블라인드 인덱스 파일들을 지우고, 지운 경로 목록을 돌려줍니다."""
+    paths = blind_index_paths(data_path, columns)
+    for path in paths:
+        os.remove(path)
+    return paths
+
+
+def _missing_columns(columns: Sequence[str], header: Sequence[str]) -> None:
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise ValueError(f"오류: 헤더에 없는 인덱스 컬럼입니다: {', '.join(missing)}")
+
+
+def check_index_columns(raw_path: str, columns: Sequence[str]) -> None:
+    """원본 CSV의 헤더 줄만 읽어 인덱스 컬럼이 모두 있는지 확인합니다. 없으면 ValueError. (파일을 건드리기 전에 호출)"""
+    with open(raw_path, 'r', encoding='utf-8', newline='') as f:
+        header = next(csv.reader(f), [])
+    _missing_columns(columns, header)
+
+
+def column_key(fernet_key: bytes, column: str) -> bytes:
+    """Fernet 키에서 컬럼 전용 HMAC 하위 키를 파생합니다."""
+    return derive_subkey(base64.urlsafe_b64decode(fernet_key), BLIND_INDEX_KEY_LABEL + column.encode('utf-8'))
+
+
+def _key_tag(subkey: bytes) -> bytes:
+    return hmac.new(subkey, KEY_CHECK_LABEL, hashlib.sha256).digest()
+
+
+def blind_hash(subkey: bytes, column: str, value: str) -> bytes:
+    return hmac.digest(subkey, normalize(column, value).encode('utf-8'), 'sha256')[:HASH_SIZE]
+
+
+class BlindIndexBuilder:
+    """
+    레코드(원본 CSV 줄)를 순서대로 받아 컬럼별 블라인드 인덱스를 만듭니다. 0번 레코드는 헤더 줄이어야 합니다.
+
+        builder = BlindIndexBuilder(key, ["이메일", "전화번호"])
+        for number, line in enumerate(lines):
+            builder.add(number, line)
+        builder.write("encrypted_records.bin")
+
+    컬럼마다 항목 run_entries개가 모이면 정렬해서 tmp_dir(기본값: 시스템 임시 디렉터리)의 익명 임시 파일로 내립니다.
+    """
+
+    def __init__(self, fernet_key: bytes, columns: Sequence[str], run_entries: int = config.BLIND_INDEX_RUN_ENTRIES,
+                 tmp_dir: Optional[str] = None):
+        self.columns = list(columns)
+        self._subkeys = [column_key(fernet_key, column) for column in self.columns]
+        self._positions: Optional[List[int]] = None
+        self._buffers = [bytearray() for _ in self.columns]  # 아직 정렬하지 않은 항목들 (ENTRY_SIZE씩 이어 붙임)
+        self._runs: List[List[BinaryIO]] = [[] for _ in self.columns]  # 정렬해서 내려 둔 run 파일들
+        self._counts = [0] * len(self.columns)
+        self._run_bytes = max(run_entries, 1) * ENTRY_SIZE
+        self._tmp_dir = tmp_dir
+        self.records = 0
+
+    def add(self, record_number: int, line: str) -> None:
+        fields = next(csv.reader([line]), [])
+        if self._positions is None:
+            if record_number != 0:
+                raise ValueError("오류: 블라인드 인덱스를 만들려면 0번 레코드(헤더 줄)가 필요합니다.")
+            _missing_columns(self.columns, fields)
+            self._positions = [fields.index(column) for column in self.columns]
+        else:
+            record = _RECORD.pack(record_number)
+            for i, (subkey, column, position) in enumerate(zip(self._subkeys, self.columns, self._positions)):
+                if position < len(fields) and fields[position].strip():
+                    buffer = self._buffers[i]
+                    buffer += blind_hash(subkey, column, fields[position])
+                    buffer += record
+                    self._counts[i] += 1
+                    if len(buffer) >= self._run_bytes:
+                        self._runs[i].append(self._spill(buffer))
+        self.records = max(self.records, record_number + 1)
+
+    @staticmethod
+    def _sorted_entries(buffer: bytearray) -> List[bytes]:
+        return sorted(bytes(buffer[i:i + ENTRY_SIZE]) for i in range(0, len(buffer), ENTRY_SIZE))
+
+    def _spill(self, buffer: bytearray) -> BinaryIO:
+        """버퍼의 항목들을 정렬해서 익명 임시 파일에 쓰고 버퍼를 비웁니다."""
+        run = tempfile.TemporaryFile(prefix="record_crypto_bidx_", dir=self._tmp_dir)
+        run.write(b''.join(self._sorted_entries(buffer)))
+        del buffer[:]
+        return run
+
+    @staticmethod
+    def _read_run(run: BinaryIO) -> Iterator[bytes]:
+        run.seek(0)
+        while True:
+            block = run.read(ENTRY_SIZE * 4096)
+            if not block:
+                return
+            for i in range(0, len(block), ENTRY_SIZE):
+                yield block[i:i + ENTRY_SIZE]
+
+    def tap(self, lines: Iterable[bytes]) -> Iterator[bytes]:
+        """암호화할 레코드 스트림을 그대로 흘려보내면서 인덱스 항목을 모읍니다. (원본을 두 번 읽지 않기 위함)"""
+        for number, line in enumerate(lines):
+            self.add(number, line.decode('utf-8'))
+            yield line
+
+    def write(self, data_path: str) -> List[str]:
+        """컬럼별로 정렬된 run들을 병합하여 인덱스 파일을 쓰고, 파일 경로 목록을 돌려줍니다. (run을 다 쓰므로 한 번만 호출)"""
+        if self._positions is None:
+            raise ValueError("오류: 인덱스를 만들 레코드가 없습니다.")
+        paths = []
+        for i, (column, subkey, position) in enumerate(zip(self.columns, self._subkeys, self._positions)):
+            runs = self._runs[i]
+            path = blind_index_path_for(data_path, column)
+            tmp_path = path + ".tmp"
+            try:
+                with open(tmp_path, 'wb', buffering=config.WRITE_BUFFER_SIZE) as f:
+                    f.write(BLIND_INDEX_MAGIC)
+                    f.write(_HEADER.pack(self.records, self._counts[i], position))
+                    f.write(_key_tag(subkey))
+                    merged = heapq.merge(self._sorted_entries(self._buffers[i]), *(self._read_run(run) for run in runs))
+                    while True:
+                        block = b''.join(islice(merged, _WRITE_ENTRIES))
+                        if not block:
+                            break
+                        f.write(block)
+            finally:
+                for run in runs:
+                    run.close()
+                del runs[:]
+            os.replace(tmp_path, path)
+            paths.append(path)
+        return paths
+
+
+class BlindIndex:
+    """정렬된 블라인드 인덱스 파일을 mmap 하여 해시로 레코드 번호를 이진 탐색합니다."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(BLIND_INDEX_MAGIC)] != BLIND_INDEX_MAGIC or len(self._mm) < _DATA_START:
+            self._mm.close()
+            raise ValueError(f"오류: '{path}'는 올바른 블라인드 인덱스 파일이 아닙니다.")
+        self.records, self.entries, self.column_position = _HEADER.unpack_from(self._mm, len(BLIND_INDEX_MAGIC))
+        self.key_tag = self._mm[_DATA_START - _KEY_TAG_SIZE:_DATA_START]
+        if len(self._mm) != _DATA_START + self.entries * ENTRY_SIZE:
+            self._mm.close()
+            raise ValueError(f"오류: '{path}' 블라인드 인덱스 파일이 잘렸거나 손상되었습니다.")
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def _hash_at(self, i: int) -> bytes:
+        start = _DATA_START + i * ENTRY_SIZE
+        return self._mm[start:start + HASH_SIZE]
+
+    def lookup(self, value_hash: bytes) -> List[int]:
+        """해시가 value_hash인 항목들의 레코드 번호 (오름차순)."""
+        low, high = 0, self.entries
+        while low < high:  # 첫 번째 일치(하한) 위치 찾기
+            middle = (low + high) // 2
+            if self._hash_at(middle) < value_hash:
+                low = middle + 1
+            else:
+                high = middle
+        numbers = []
+        while low < self.entries and self._hash_at(low) == value_hash:
+            numbers.append(_RECORD.unpack_from(self._mm, _DATA_START + low * ENTRY_SIZE + HASH_SIZE)[0])
+            low += 1
+        return numbers
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def build_blind_indexes(key: bytes, columns: Sequence[str],
+                        encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                        workers: Optional[int] = None, log: Log = print) -> List[str]:
+    """
+    이미 암호화된 파일을 (메모리 안에서만) 한 번 복호화하여 블라인드 인덱스를 새로 만듭니다.
+    인덱스 없이 암호화한 파일이나 키 교체(rekey) 뒤의 파일에 사용합니다.
+    """
+    builder = BlindIndexBuilder(key, columns, tmp_dir=os.path.dirname(os.path.abspath(encrypted_path)))
+    failed = 0
+    for result in decrypt_file(encrypted_path, key, workers=workers):
+        if result.ok:
+            builder.add(result.index, result.plaintext)
+        else:
+            failed += 1
+    if failed:
+        _log(log, f"[!] 경고: 복호화에 실패한 레코드 {failed}개는 인덱스에서 빠졌습니다. (scan 명령으로 확인하세요)")
+    paths = builder.write(encrypted_path)
+    _log(log, f"[+] 블라인드 인덱스 저장 완료: {', '.join(paths)}")
+    return paths
+
+
+def find_records(key: bytes, column: str, value: str,
+                 encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME) -> List[DecryptResult]:
+    """
+    이미 파생된 키로 column 값이 value인 레코드만 찾아 복호화합니다. (정규화한 값 기준 일치)
+    """
+    index_path = blind_index_path_for(encrypted_path, column)
+    _require_file(index_path, f"'{column}' 컬럼의 블라인드 인덱스")
+    subkey = column_key(key, column)
+    with BlindIndex(index_path) as index:
+        if not tags_match(index.key_tag, _key_tag(subkey)):
+            # 비밀번호는 데이터 파일의 키 검증을 통과했으니, 키 교체나 재암호화 전에 만든 낡은 인덱스다
+            raise ValueError(f"오류: '{index_path}'는 다른 키로 만든 인덱스입니다. build-index로 다시 만드세요.")
+        numbers = index.lookup(blind_hash(subkey, column, value))
+        records, position = index.records, index.column_position
+    with IndexedRecordStore(encrypted_path, key) as store:
+        if len(store) != records:
+            raise ValueError(f"오류: '{index_path}' 인덱스를 만든 뒤에 '{encrypted_path}'의 레코드 수가 바뀌었습니다 "
+                             f"({records} -> {len(store)}). build-index로 다시 만드세요.")
+        results = store.get_records(numbers)
+    expected = normalize(column, value)
+    matches = []
+    for result in results:
+        if result.ok:
+            fields = next(csv.reader([result.plaintext]), [])
+            if position < len(fields) and normalize(column, fields[position]) == expected:
+                matches.append(result)
+    return matches
+
+
+def lookup_records(password: str, column: str, value: str,
+                   encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                   salt_path: str = config.SALT_FILE_NAME) -> List[DecryptResult]:
+    """비밀번호로 키를 파생하여 find_records를 실행합니다. 비밀번호가 틀리면 WrongKeyError가 발생합니다."""
+    key = load_key(password, salt_path)
+    _require_file(encrypted_path, "암호화된 레코드 파일")
+    ensure_key_correct(encrypted_path, key)
+    return find_records(key, column, value, encrypted_path)
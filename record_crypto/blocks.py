@@ -0,0 +1,353 @@
+"""
+블록 단위로 '압축한 뒤 암호화'하는 레코드 파일 (AES-256-GCM).
+
+원본 CSV는 '대구광역시', '010-', '@gmail.com', 은행 이름처럼 반복되는 문자열 투성이인데,
+레코드를 하나씩 암호화하면 암호문은 압축이 전혀 되지 않습니다. (암호화한 뒤에는 너무 늦다!)
+그래서 N개 레코드를 한 블록으로 묶어 zlib/lzma(설치되어 있으면 zstd)로 압축한 다음 암호화합니다.
+
+파일 형식 (정수는 모두 little-endian):
+    헤더: MAGIC(4) | version u8 | kdf u8 | iterations u32 | codec u8 | block_records u32 | salt_len u8 | salt
+          | key_check(32) | records u64 (전체 레코드 수)
+    블록: length u32 | nonce(12) | AES-GCM(압축(레코드들을 '\\n'으로 이은 것)) + tag(16)
+
+각 블록은 블록 번호(u64)를 AAD로 묶어 인증하므로 블록 순서를 바꿔치기해도 복호화에 실패합니다.
+마지막 블록을 제외한 모든 블록은 정확히 block_records개의 레코드를 담으므로, n번째 레코드는
+(n // block_records)번째 블록에 있습니다. 블록 시작 위치는 '<파일>.idx' 사이드카(index.py 형식)에 기록되어
+임의 접근은 블록 하나만 읽고 복호화하면 됩니다.
+헤더의 전체 레코드 수로 마지막 블록의 레코드 수도 알 수 있으므로, 손상된 블록의 실패 레코드 수를 정확히 보고합니다.
+
+파일은 '<파일>.tmp'에 쓰고 다 쓴 뒤에야 제자리로 옮기므로(인덱스도 같다), 중간에 실패한 쓰기는 남지 않습니다.
+"""
+import lzma
+import mmap
+import os
+import struct
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import config
+from .engine import DecryptResult, FAILURE_ERROR, FAILURE_INVALID_TOKEN, default_workers, ordered_map
+from .index import IndexWriter, RecordIndex, index_path_for
+from .kdf import DEFAULT_ITERATIONS, derive_raw_key
+from .keycheck import KEY_CHECK_SIZE, WrongKeyError, compute_tag, tags_match
+from .output import failure_path_for, write_results
+from .pipeline import Log, _log, _require_file, strip_line_end
+
+BLOCK_MAGIC = b"RCBK"
+BLOCK_VERSION = 2
+KDF_PBKDF2_SHA256 = 1
+
+NONCE_SIZE = 12
+_HEADER = struct.Struct('<4sBBIBIB')  # magic, version, kdf, iterations, codec, block_records, salt_len
+_RECORDS = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_AAD = struct.Struct('<Q')
+
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+CODEC_ZSTD = 3
+CODEC_NAMES = {"zlib": CODEC_ZLIB, "lzma": CODEC_LZMA, "zstd": CODEC_ZSTD}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("오류: zstd 코덱을 쓰려면 'zstandard' 패키지를 설치하세요. (pip install zstandard)") from None
+    return zstandard
+
+
+def _codec_functions(codec: int) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """코덱 번호 -> (압축 함수, 해제 함수)"""
+    if codec == CODEC_ZLIB:
+        return (lambda data: zlib.compress(data, 6)), zlib.decompress
+    if codec == CODEC_LZMA:
+        return (lambda data: lzma.compress(data, preset=6)), lzma.decompress
+    if codec == CODEC_ZSTD:
+        zstandard = _zstd()
+        return zstandard.ZstdCompressor(level=9).compress, zstandard.ZstdDecompressor().decompress
+    raise ValueError(f"오류: 지원하지 않는 압축 코덱입니다 (codec={codec}).")
+
+
+class BlockWriter:
+    """
+    레코드를 block_records개씩 모아 압축 -> 암호화하여 블록 파일에 스트리밍으로 씁니다.
+
+        with BlockWriter.create("encrypted_records.rcz", password, codec="zlib") as writer:
+            writer.write(b"...")
+
+    with 블록이 예외로 끝나면 임시 파일을 지우고, 정상적으로 끝날 때만 path에 완성된 블록 파일이 생깁니다.
+    """
+
+    def __init__(self, path: str, key: bytes, salt: bytes, codec: str = config.BLOCK_CODEC,
+                 block_records: int = config.BLOCK_RECORDS, iterations: int = DEFAULT_ITERATIONS,
+                 with_index: bool = True):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        if codec not in CODEC_NAMES:
+            raise ValueError(f"오류: 알 수 없는 압축 코덱 '{codec}' (사용 가능: {', '.join(CODEC_NAMES)})")
+        if block_records < 1:
+            raise ValueError("오류: 블록당 레코드 수는 1 이상이어야 합니다.")
+        self._codec = CODEC_NAMES[codec]
+        self._compress, _ = _codec_functions(self._codec)
+        self._aesgcm = AESGCM(key)
+        self._block_records = block_records
+        self._pending: List[bytes] = []
+        self.path = path
+        self._index_path = index_path_for(path) if with_index else None
+        self._file = open(path + ".tmp", 'wb', buffering=config.WRITE_BUFFER_SIZE)
+        header = _HEADER.pack(BLOCK_MAGIC, BLOCK_VERSION, KDF_PBKDF2_SHA256, iterations, self._codec,
+                              block_records, len(salt)) + salt + compute_tag(key)
+        self._records_offset = len(header)  # 전체 레코드 수는 close()에서 채운다
+        header += _RECORDS.pack(0)
+        self._file.write(header)
+        self._index_writer = IndexWriter(self._index_path + ".tmp", start_offset=len(header)) if with_index else None
+        self.count = 0
+        self.blocks = 0
+        self.plain_bytes = 0
+
+    @classmethod
+    def create(cls, path: str, password: str, salt: Optional[bytes] = None, codec: str = config.BLOCK_CODEC,
+               block_records: int = config.BLOCK_RECORDS, iterations: int = DEFAULT_ITERATIONS,
+               with_index: bool = True) -> "BlockWriter":
+        """비밀번호로 키를 파생하여 새 블록 파일을 만듭니다. 솔트를 주지 않으면 무작위로 생성합니다."""
+        salt = salt or os.urandom(16)
+        key = derive_raw_key(password, salt, iterations)
+        return cls(path, key, salt, codec, block_records, iterations, with_index)
+
+    def write(self, record: bytes) -> None:
+        if b'\n' in record:
+            raise ValueError(f"오류: {self.count + 1}번째 레코드에 개행 문자가 들어 있습니다.")
+        self._pending.append(record)
+        self.count += 1
+        if len(self._pending) >= self._block_records:
+            self._flush_block()
+
+    def _flush_block(self) -> None:
+        if not self._pending:
+            return
+        plaintext = b'\n'.join(self._pending)
+        self.plain_bytes += len(plaintext)
+        nonce = os.urandom(NONCE_SIZE)
+        sealed = self._aesgcm.encrypt(nonce, self._compress(plaintext), _AAD.pack(self.blocks))
+        self._file.write(_LENGTH.pack(NONCE_SIZE + len(sealed)))
+        self._file.write(nonce)
+        self._file.write(sealed)
+        if self._index_writer:
+            self._index_writer.add(_LENGTH.size + NONCE_SIZE + len(sealed))
+        self.blocks += 1
+        self._pending = []
+
+    def close(self) -> None:
+        """남은 블록과 전체 레코드 수를 쓰고, fsync 한 뒤 제자리로 옮겨 파일을 완성합니다."""
+        if self._file.closed:
+            return
+        self._flush_block()
+        self._file.seek(self._records_offset)
+        self._file.write(_RECORDS.pack(self.count))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self._index_writer:
+            self._index_writer.close(fsync=True)
+            os.replace(self._index_path + ".tmp", self._index_path)
+        os.replace(self.path + ".tmp", self.path)
+
+    def abort(self) -> None:
+        """지금까지 쓴 내용을 버립니다. path(와 인덱스)는 건드리지 않습니다."""
+        self._file.close()
+        tmp_paths = [self.path + ".tmp"]
+        if self._index_writer:
+            self._index_writer.close()
+            tmp_paths.append(self._index_path + ".tmp")
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()  # 중간에 실패한 쓰기를 완성된 파일처럼 남기지 않는다
+
+
+class BlockReader:
+    """
+    블록 파일을 mmap 하여 블록 단위로 복호화합니다.
+
+    헤더에서 솔트, KDF 파라미터, 코덱, 블록 크기를 읽으므로 별도의 솔트 파일이 필요 없습니다.
+    임의 접근(get_record)은 사이드카 인덱스를 사용하며, 최근에 푼 블록 몇 개를 기억해 둡니다.
+    """
+
+    CACHED_BLOCKS = 4
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _HEADER.size or self._mm[:len(BLOCK_MAGIC)] != BLOCK_MAGIC:
+            self._mm.close()
+            raise ValueError(f"오류: '{path}'는 블록 압축 파일이 아닙니다 (MAGIC 불일치).")
+        magic, version, kdf_id, iterations, codec, block_records, salt_len = _HEADER.unpack_from(self._mm, 0)
+        if version != BLOCK_VERSION or kdf_id != KDF_PBKDF2_SHA256:
+            self._mm.close()
+            raise ValueError(f"오류: 지원하지 않는 블록 파일 버전/KDF입니다 (version={version}, kdf={kdf_id}).")
+        self.iterations = iterations
+        self.codec = codec
+        self.block_records = block_records
+        self.salt = bytes(self._mm[_HEADER.size:_HEADER.size + salt_len])
+        self.key_check = bytes(self._mm[_HEADER.size + salt_len:_HEADER.size + salt_len + KEY_CHECK_SIZE])
+        self.data_offset = _HEADER.size + salt_len + KEY_CHECK_SIZE + _RECORDS.size
+        if len(self._mm) < self.data_offset:
+            self._mm.close()
+            raise ValueError(f"오류: '{path}' 파일의 헤더가 잘려 있습니다.")
+        (self.records,) = _RECORDS.unpack_from(self._mm, self.data_offset - _RECORDS.size)
+        _, self._decompress = _codec_functions(codec)
+        self._aesgcm = None
+        self._index = None
+        self._cache: Dict[int, List[bytes]] = {}
+
+    def unlock(self, password: Optional[str] = None, key: Optional[bytes] = None) -> "BlockReader":
+        """비밀번호(또는 원시 키)를 검증하고 복호화를 준비합니다. 틀리면 WrongKeyError."""
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        if key is None:
+            key = derive_raw_key(password, self.salt, self.iterations)
+        if not tags_match(self.key_check, compute_tag(key)):
+            raise WrongKeyError(f"오류: '{self.path}'를 암호화할 때 사용한 비밀번호와 다릅니다. (키 검증 실패)")
+        self._aesgcm = AESGCM(key)
+        return self
+
+    def frames(self) -> Iterator[memoryview]:
+        """각 블록의 'nonce | ciphertext+tag' 영역을 복사 없이 memoryview로 돌려줍니다."""
+        view = memoryview(self._mm)
+        pos = self.data_offset
+        end = len(self._mm)
+        while pos < end:
+            if pos + _LENGTH.size > end:
+                raise ValueError(f"오류: '{self.path}' 파일 끝의 블록 길이가 잘려 있습니다.")
+            (length,) = _LENGTH.unpack_from(self._mm, pos)
+            pos += _LENGTH.size
+            if pos + length > end:
+                raise ValueError(f"오류: '{self.path}' 파일 끝의 블록이 잘려 있습니다.")
+            yield view[pos:pos + length]
+            pos += length
+
+    def _open_block(self, block: int, frame: memoryview) -> List[bytes]:
+        """블록 하나를 복호화 -> 압축 해제하여 레코드(bytes) 목록으로 돌려줍니다. 손상되면 InvalidTag."""
+        if self._aesgcm is None:
+            raise RuntimeError("unlock()을 먼저 호출하세요.")
+        compressed = self._aesgcm.decrypt(frame[:NONCE_SIZE], frame[NONCE_SIZE:], _AAD.pack(block))
+        return self._decompress(compressed).split(b'\n')
+
+    def _try_open_block(self, block: int, frame: memoryview) -> Tuple[Optional[List[bytes]], Optional[str], str]:
+        """블록 하나를 열어 (레코드 목록, 실패 종류, 메시지)를 돌려줍니다. 실패하면 레코드 목록이 None."""
+        from cryptography.exceptions import InvalidTag
+
+        try:
+            return self._open_block(block, frame), None, ""
+        except InvalidTag:
+            return None, FAILURE_INVALID_TOKEN, ""
+        except Exception as e:
+            return None, FAILURE_ERROR, str(e)
+
+    def decrypt_all(self, workers: int = 1) -> Iterator[DecryptResult]:
+        """
+        모든 레코드를 순서대로 복호화합니다. workers가 2 이상이면 블록들을 스레드 풀에서 병렬로 엽니다.
+        (AES-GCM과 zlib/lzma 해제는 GIL을 놓고 돌기 때문에 스레드로도 여러 코어를 쓴다)
+
+        블록이 손상되면 그 블록에 속한 레코드 전체를 실패로 보고합니다. (블록 하나 = 인증 단위)
+        마지막 블록의 레코드 수는 헤더의 전체 레코드 수로 구합니다.
+        """
+        if self._aesgcm is None:
+            raise RuntimeError("unlock()을 먼저 호출하세요.")
+        index = 0
+        for records, failure, message in ordered_map(self._try_open_block, None, enumerate(self.frames()),
+                                                     workers, True):
+            if records is None:
+                for _ in range(min(self.block_records, self.records - index)):
+                    yield DecryptResult(index, None, failure, message)
+                    index += 1
+                continue
+            for record in records:
+                try:
+                    yield DecryptResult(index, record.decode('utf-8'))
+                except UnicodeDecodeError as e:
+                    yield DecryptResult(index, None, FAILURE_ERROR, str(e))
+                index += 1
+
+    def _block(self, block: int) -> List[bytes]:
+        records = self._cache.get(block)
+        if records is None:
+            if self._index is None:
+                self._index = RecordIndex(self.path)
+            start, end = self._index.span(block)
+            records = self._open_block(block, memoryview(self._mm)[start + _LENGTH.size:end])
+            if len(self._cache) >= self.CACHED_BLOCKS:
+                self._cache.pop(next(iter(self._cache)))  # 가장 먼저 들어온 블록부터 버린다
+            self._cache[block] = records
+        return records
+
+    def get_record(self, n: int) -> str:
+        """n번째(0부터) 레코드가 든 블록 하나만 복호화하여 그 레코드를 돌려줍니다."""
+        block, offset = divmod(n, self.block_records)
+        records = self._block(block)
+        if not 0 <= offset < len(records):
+            raise IndexError(f"레코드 번호 {n}이(가) 범위를 벗어났습니다.")
+        return records[offset].decode('utf-8')
+
+    def close(self) -> None:
+        self._cache.clear()
+        if self._index is not None:
+            self._index.close()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def encrypt_csv_blocks(password: str, raw_path: str = config.RAW_DATA_FILE_NAME,
+                       output_path: str = config.BLOCK_FILE_NAME, codec: str = config.BLOCK_CODEC,
+                       block_records: int = config.BLOCK_RECORDS, iterations: int = DEFAULT_ITERATIONS,
+                       log: Log = print) -> int:
+    """원본 CSV의 모든 줄(헤더 포함)을 블록 단위로 압축 -> 암호화하여 저장하고 레코드 수를 돌려줍니다."""
+    _require_file(raw_path, "원본 파일")
+    with open(raw_path, 'rb', buffering=config.READ_BUFFER_SIZE) as raw_file, \
+            BlockWriter.create(output_path, password, codec=codec, block_records=block_records,
+                               iterations=iterations) as writer:
+        for line in raw_file:
+            writer.write(strip_line_end(line))
+
+    stored = os.path.getsize(output_path)
+    ratio = writer.plain_bytes / stored if stored else 0.0
+    _log(log, f"[+] 총 {writer.count}개의 레코드를 {writer.blocks}개 블록({codec})으로 압축 암호화 완료.")
+    _log(log, f"[+] '{output_path}' 파일로 저장되었습니다. (평문 {writer.plain_bytes:,}바이트 -> {stored:,}바이트, "
+              f"{ratio:.1f}배 축소, 인덱스: '{index_path_for(output_path)}')")
+    return writer.count
+
+
+def blocks_to_csv(password: str, input_path: str = config.BLOCK_FILE_NAME,
+                  output_path: str = config.DECRYPTED_NORMAL_OUTPUT_FILE_NAME,
+                  failure_label: str = "손상된 블록", output_format: str = "csv", workers: Optional[int] = None,
+                  log: Log = print) -> Tuple[int, int]:
+    """
+    블록 파일 전체를 (workers개 스레드로) 복호화하여 성공한 행만 결과 파일로 저장하고
+    (성공 레코드 수, 실패 레코드 수)를 돌려줍니다. 실패한 레코드 번호는 '<결과 파일>.failures.csv' 사이드카에 기록합니다.
+    """
+    _require_file(input_path, "블록 압축 파일")
+    with BlockReader(input_path) as reader:
+        reader.unlock(password)
+        counts = write_results(reader.decrypt_all(workers or default_workers()), output_path,
+                               failure_label=failure_label, output_format=output_format)
+
+    succeeded = counts.total - counts.failed
+    _log(log, f"[+] {succeeded}개 레코드 복호화 성공, {counts.failed}개 실패. '{output_path}' 파일로 저장되었습니다.")
+    if counts.failed:
+        _log(log, f"[!] 실패한 레코드 목록: '{failure_path_for(output_path)}'")
+    return succeeded, counts.failed
@@ -0,0 +1,510 @@
+"""
+record_crypto 통합 명령행 인터페이스.
+
+    python -m record_crypto encrypt     # Hacking project.py
+    python -m record_crypto decrypt     # 복호화 과정.py
+    python -m record_crypto tamper-test # 비정상적인 해킹 과정.py
+    python -m record_crypto verify      # 보안 시스템성공.py
+    python -m record_crypto bench       # 합성 데이터셋 벤치마크 (JSON 보고서)
+    python -m record_crypto serve       # 상주 복호화 조회 서비스 (asyncio)
+    python -m record_crypto encrypt-columns / read-columns  # 컬럼 단위 필드 암호화
+    python -m record_crypto encrypt-blocks / decrypt-blocks  # 블록 단위 압축 후 암호화
+    python -m record_crypto scan        # 복호화 없이 HMAC만 검사하는 무결성 스캔 (손상 비트맵)
+    python -m record_crypto rekey       # 평문을 디스크에 쓰지 않고 새 비밀번호/솔트로 키 교체 (이어하기 지원)
+    python -m record_crypto encrypt-shards / decrypt-shards / verify-shards  # 여러 파일로 나눈 데이터셋 병렬 처리
+    python -m record_crypto build-index / lookup  # 이메일/전화번호 블라인드 인덱스로 일치하는 레코드만 복호화
+    python -m record_crypto report      # bench / --metrics-json 결과로 성능 그래프(PNG/SVG) 생성 (시각화.py)
+
+`--metrics-json`, `--metrics-prom`, `--profile`, `--trace-memory`는 서브커맨드 앞이나 뒤 어디에 주어도 되는 공통 옵션입니다.
+
+`--help`나 인자 오류만으로는 cryptography 같은 무거운 모듈을 import 하지 않도록,
+실제 작업 모듈은 각 서브커맨드 핸들러 안에서만 import 합니다.
+"""
+import argparse
+import getpass
+import os
+import sys
+import traceback
+from typing import List, Optional
+
+from . import config
+from .keycheck import WrongKeyError
+
+
+def _resolve_password(args: argparse.Namespace) -> str:
+    # 우선순위: --password > 환경변수 > 대화형 입력
+    if args.password is not None:
+        return args.password
+    password = os.environ.get(config.PASSWORD_ENV)
+    if password is not None:
+        return password
+    return getpass.getpass("비밀번호: ")
+
+
+def _add_common_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--password", help=f"비밀번호 (생략 시 환경변수 {config.PASSWORD_ENV} 또는 입력 프롬프트)")
+    parser.add_argument("--encrypted-file", default=config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                        help="암호화된 레코드 파일 (기본값: %(default)s)")
+    parser.add_argument("--salt-file", default=config.SALT_FILE_NAME, help="솔트 파일 (기본값: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="병렬 워커 수 (기본값: CPU 코어 수)")
+
+
+def _add_verify_all_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--verify-all", action="store_true",
+                        help="감사 모드: 키 검증으로 조기 거부하지 않고 모든 레코드를 직접 복호화 시도")
+
+
+def _add_output_arguments(parser: argparse.ArgumentParser, default_output: str, help_text: str) -> None:
+    parser.add_argument("--output", default=None,
+                        help=f"{help_text} (기본값: {default_output}, Parquet이면 확장자 .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="결과 형식 (parquet은 pyarrow 필요, 기본값: %(default)s). 실패한 레코드는 '<결과>.failures.csv'")
+    parser.set_defaults(default_output=default_output)
+
+
+def _output_path(args: argparse.Namespace) -> str:
+    if args.output:
+        return args.output
+    if args.format == "parquet":
+        return os.path.splitext(args.default_output)[0] + ".parquet"
+    return args.default_output
+
+
+def _cmd_encrypt(args: argparse.Namespace) -> int:
+    print(f"\n--- '{args.input}' 파일 레코드별 암호화 시작 ---")
+    if args.incremental:
+        from .incremental import encrypt_incremental
+
+        if args.blind_index:
+            raise ValueError("오류: 증분 암호화에는 --blind-index를 쓸 수 없습니다. 암호화 후 build-index로 다시 만드세요.")
+
+        encrypt_incremental(_resolve_password(args), raw_path=args.input, encrypted_path=args.encrypted_file,
+                            salt_path=args.salt_file, workers=args.workers)
+        print("\n--- 레코드별 증분 암호화 과정 완료 ---")
+        return 0
+
+    from .pipeline import encrypt_csv
+
+    encrypt_csv(_resolve_password(args), raw_path=args.input, encrypted_path=args.encrypted_file,
+                salt_path=args.salt_file, workers=args.workers, blind_index_columns=args.blind_index)
+    print("\n--- 레코드별 암호화 과정 완료 ---")
+    return 0
+
+
+def _cmd_decrypt(args: argparse.Namespace) -> int:
+    from .pipeline import decrypt_to_csv
+
+    print(f"\n--- '{args.encrypted_file}' 파일 레코드별 복호화 시작 ---")
+    decrypt_to_csv(_resolve_password(args), encrypted_path=args.encrypted_file, salt_path=args.salt_file,
+                   output_path=_output_path(args), workers=args.workers, verify_all=args.verify_all,
+                   output_format=args.format)
+    print("\n--- 레코드별 복호화 과정 완료 ---")
+    return 0
+
+
+def _cmd_tamper_test(args: argparse.Namespace) -> int:
+    from .pipeline import tamper_test
+
+    print(f"\n--- '{args.encrypted_file}' 파일 랜덤 레코드 손상 및 복호화 시뮬레이션 시작 ---")
+    summary = tamper_test(_resolve_password(args), encrypted_path=args.encrypted_file, salt_path=args.salt_file,
+                          output_path=_output_path(args), num_to_corrupt=args.corrupt, seed=args.seed,
+                          workers=args.workers, verify_all=args.verify_all, output_format=args.format)
+    expected_failures = min(args.corrupt, summary.total)
+    if summary.failed == expected_failures:
+        print("[!!!] 🎉🎉🎉 압도적인 성공: 예상대로 정확히 손상된 레코드만 복호화 실패했습니다! 🎉🎉🎉")
+    print("\n--- 랜덤 레코드 손상 및 복호화 시뮬레이션 완료 ---")
+    return 0
+
+
+def _cmd_verify(args: argparse.Namespace) -> int:
+    from .pipeline import verify_without_key
+
+    password = args.password if args.password is not None else ""
+    print(f"\n--- '{args.encrypted_file}' 파일 - 인증키 제거 시 데이터 유출 0 검증 시뮬레이션 시작 ---")
+    print(f"--- 현재 설정된 인증키(비밀번호): '{password}' (비어있음/잘못됨!) ---")
+    summary = verify_without_key(password, encrypted_path=args.encrypted_file, salt_path=args.salt_file,
+                                 output_path=_output_path(args), workers=args.workers, verify_all=args.verify_all,
+                                 output_format=args.format)
+    leaked = summary.succeeded != 0 or summary.failed != summary.total
+    if not leaked:
+        print("[!!!] 🎉🎉🎉 압도적인 성공: 인증키 없이는 '단 한 건의 유출 데이터'도 없습니다! 보안 시스템 완벽 작동! 🎉🎉🎉")
+    else:
+        print("[!] 오류: 예상과 다른 결과가 나왔습니다. 코드를 다시 확인하세요.")
+    print("\n--- 인증키 제거 시 데이터 유출 0 검증 시뮬레이션 완료 ---")
+    return 1 if leaked else 0
+
+
+def _cmd_bench(args: argparse.Namespace) -> int:
+    from .bench import run_benchmark, write_report
+
+    print(f"[*] 벤치마크 시작: 행 수 {args.rows}", file=sys.stderr)
+    report = run_benchmark(args.rows, workers=args.workers, iterations=args.iterations,
+                           work_dir=args.work_dir, seed=args.seed)
+    write_report(report, args.output)
+    if args.output:
+        print(f"[+] 벤치마크 결과가 '{args.output}' 파일로 저장되었습니다.", file=sys.stderr)
+    return 0
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    from .service import run_service
+
+    auth_token = os.environ.get(config.SERVICE_TOKEN_ENV) or None
+    if args.tcp and auth_token is None:
+        print(f"[!] --tcp로 열려면 환경변수 {config.SERVICE_TOKEN_ENV}에 공유 비밀 토큰을 설정해야 합니다.")
+        return 1
+    run_service(_resolve_password(args), encrypted_path=args.encrypted_file, salt_path=args.salt_file,
+                unix_path=args.unix, host=args.host if args.tcp else None, port=args.port, auth_token=auth_token,
+                workers=args.workers, max_concurrency=args.max_concurrency, max_batch=args.max_batch)
+    return 0
+
+
+def _cmd_encrypt_columns(args: argparse.Namespace) -> int:
+    from .columnar import encrypt_csv_columnar
+
+    print(f"\n--- '{args.input}' 파일 컬럼 단위 암호화 시작 ---")
+    encrypt_csv_columnar(_resolve_password(args), raw_path=args.input, output_dir=args.output_dir,
+                         sensitive_columns=args.sensitive, row_group_size=args.row_group_size)
+    print("\n--- 컬럼 단위 암호화 과정 완료 ---")
+    return 0
+
+
+def _cmd_read_columns(args: argparse.Namespace) -> int:
+    from .columnar import ColumnarReader, columns_to_csv
+
+    reader = ColumnarReader(args.input_dir)
+    columns = args.columns or reader.columns
+    sensitive = reader.sensitive_columns
+    # 평문 컬럼만 읽을 때는 비밀번호를 묻지 않는다
+    password = _resolve_password(args) if any(column in sensitive for column in columns) else None
+    columns_to_csv(args.input_dir, columns, args.output, password=password)
+    return 0
+
+
+def _cmd_encrypt_blocks(args: argparse.Namespace) -> int:
+    from .blocks import encrypt_csv_blocks
+
+    print(f"\n--- '{args.input}' 파일 블록 압축 암호화 시작 ---")
+    encrypt_csv_blocks(_resolve_password(args), raw_path=args.input, output_path=args.output,
+                       codec=args.codec, block_records=args.block_records)
+    print("\n--- 블록 압축 암호화 과정 완료 ---")
+    return 0
+
+
+def _cmd_decrypt_blocks(args: argparse.Namespace) -> int:
+    from .blocks import blocks_to_csv
+
+    print(f"\n--- '{args.input}' 파일 블록 복호화 시작 ---")
+    _, failed = blocks_to_csv(_resolve_password(args), input_path=args.input, output_path=_output_path(args),
+                              output_format=args.format, workers=args.workers)
+    print("\n--- 블록 복호화 과정 완료 ---")
+    return 1 if failed else 0
+
+
+def _cmd_scan(args: argparse.Namespace) -> int:
+    from .integrity import integrity_scan
+
+    print(f"\n--- '{args.encrypted_file}' 파일 무결성 스캔 시작 ---")
+    report = integrity_scan(_resolve_password(args), encrypted_path=args.encrypted_file, salt_path=args.salt_file,
+                            bitmap_path=args.bitmap, simulate_corrupt=args.simulate_corrupt, seed=args.seed,
+                            workers=args.workers)
+    print("\n--- 무결성 스캔 완료 ---")
+    if args.simulate_corrupt:
+        return 0 if report.bad == min(args.simulate_corrupt, report.total) else 1
+    return 1 if report.bad else 0
+
+
+def _resolve_new_password(args: argparse.Namespace) -> str:
+    # 우선순위: --new-password > 환경변수 > 대화형 입력(두 번 확인)
+    if args.new_password is not None:
+        return args.new_password
+    password = os.environ.get(config.NEW_PASSWORD_ENV)
+    if password is not None:
+        return password
+    password = getpass.getpass("새 비밀번호: ")
+    if getpass.getpass("새 비밀번호 확인: ") != password:
+        raise ValueError("오류: 새 비밀번호가 서로 다릅니다.")
+    return password
+
+
+def _cmd_rekey(args: argparse.Namespace) -> int:
+    from .rekey import rekey
+
+    print(f"\n--- '{args.encrypted_file}' 파일 키 교체 시작 ---")
+    rekey(_resolve_password(args), _resolve_new_password(args), encrypted_path=args.encrypted_file,
+          salt_path=args.salt_file, workers=args.workers, checkpoint_every=args.checkpoint_every)
+    print("\n--- 키 교체 과정 완료 ---")
+    return 0
+
+
+def _cmd_encrypt_shards(args: argparse.Namespace) -> int:
+    from .shards import encrypt_csv_sharded
+
+    print(f"\n--- '{args.input}' 파일 샤드 암호화 시작 ---")
+    encrypt_csv_sharded(_resolve_password(args), raw_path=args.input, output_dir=args.output_dir,
+                        shards=args.shards, shard_dirs=args.shard_dirs, workers=args.workers)
+    print("\n--- 샤드 암호화 과정 완료 ---")
+    return 0
+
+
+def _cmd_decrypt_shards(args: argparse.Namespace) -> int:
+    from .shards import decrypt_sharded
+
+    print(f"\n--- '{args.input_dir}' 샤드 데이터셋 복호화 시작 ---")
+    decrypt_sharded(_resolve_password(args), directory=args.input_dir, output_path=args.output,
+                    workers=args.workers, verify_all=args.verify_all)
+    print("\n--- 샤드 복호화 과정 완료 ---")
+    return 0
+
+
+def _cmd_verify_shards(args: argparse.Namespace) -> int:
+    from .shards import verify_shards
+
+    print(f"\n--- '{args.input_dir}' 샤드 데이터셋 무결성 검증 시작 ---")
+    problems = verify_shards(args.input_dir, workers=args.workers)
+    if not problems:
+        print("[+] 모든 샤드가 manifest의 레코드 수 / SHA-256과 일치합니다.")
+    print("\n--- 샤드 무결성 검증 완료 ---")
+    return 1 if problems else 0
+
+
+def _cmd_build_index(args: argparse.Namespace) -> int:
+    from .blind_index import build_blind_indexes
+    from .keycheck import ensure_key_correct
+    from .pipeline import load_key
+
+    print(f"\n--- '{args.encrypted_file}' 파일 블라인드 인덱스 생성 시작 ---")
+    key = load_key(_resolve_password(args), args.salt_file)
+    ensure_key_correct(args.encrypted_file, key)
+    build_blind_indexes(key, args.columns, encrypted_path=args.encrypted_file, workers=args.workers)
+    print("\n--- 블라인드 인덱스 생성 완료 ---")
+    return 0
+
+
+def _cmd_lookup(args: argparse.Namespace) -> int:
+    from .blind_index import lookup_records
+
+    matches = lookup_records(_resolve_password(args), args.column, args.value,
+                             encrypted_path=args.encrypted_file, salt_path=args.salt_file)
+    for result in matches:
+        print(f"[+] {result.index + 1}번째 레코드: {result.plaintext}")
+    if not matches:
+        print(f"[*] '{args.column}' 값이 일치하는 레코드가 없습니다.")
+    return 0 if matches else 1
+
+
+def _cmd_report(args: argparse.Namespace) -> int:
+    from .report import build_report
+
+    print(f"\n--- 성능 보고서 생성 시작: {', '.join(args.input)} ---")
+    summary = build_report(args.input, args.output, freq=args.freq, font=args.font, summary_path=args.summary)
+    print(summary.to_string())
+    print("\n--- 성능 보고서 생성 완료 ---")
+    return 0
+
+
+def _add_global_arguments(parser: argparse.ArgumentParser, in_subcommand: bool = False) -> None:
+    # 서브커맨드 뒤에서도 받되, 기본값을 두지 않아(SUPPRESS) 서브커맨드 앞에서 준 값을 덮어쓰지 않는다.
+    # (단축 실행 스크립트는 서브커맨드를 먼저 넣으므로 사용자가 준 공통 옵션은 항상 서브커맨드 뒤에 온다)
+    def default(value):
+        return argparse.SUPPRESS if in_subcommand else value
+
+    parser.add_argument("--metrics-json", default=default(None), help="단계별 시간/카운터/지연 시간 히스토그램을 JSON으로 저장")
+    parser.add_argument("--metrics-prom", default=default(None), help="같은 계측 값을 Prometheus 텍스트 형식으로 저장")
+    parser.add_argument("--profile", default=default(None), help="cProfile 통계 파일 (python -m pstats로 확인)")
+    parser.add_argument("--trace-memory", action="store_true", default=default(False),
+                        help="tracemalloc으로 최대 메모리와 주요 할당 위치 보고")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="record_crypto", description="레코드별 개인정보 암호화/복호화 파이프라인")
+    _add_global_arguments(parser)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    encrypt = subparsers.add_parser("encrypt", help="원본 CSV를 레코드별로 암호화")
+    _add_common_arguments(encrypt)
+    encrypt.add_argument("--input", default=config.RAW_DATA_FILE_NAME, help="원본 CSV 파일 (기본값: %(default)s)")
+    encrypt.add_argument("--incremental", action="store_true",
+                         help="체크포인트 이후에 추가된 행만 암호화하여 기존 파일에 덧붙임 (기존 솔트 유지)")
+    encrypt.add_argument("--blind-index", nargs="+", default=None, metavar="COLUMN",
+                         help="값으로 조회할 컬럼의 블라인드 인덱스도 함께 생성 (예: 이메일 전화번호)")
+    encrypt.set_defaults(handler=_cmd_encrypt)
+
+    decrypt = subparsers.add_parser("decrypt", help="모든 레코드를 복호화하여 CSV로 저장")
+    _add_common_arguments(decrypt)
+    _add_output_arguments(decrypt, config.DECRYPTED_NORMAL_OUTPUT_FILE_NAME, "복호화 결과 파일")
+    _add_verify_all_argument(decrypt)
+    decrypt.set_defaults(handler=_cmd_decrypt)
+
+    tamper = subparsers.add_parser("tamper-test", help="무작위 레코드를 손상시킨 뒤 복호화 (손상 탐지 시뮬레이션)")
+    _add_common_arguments(tamper)
+    _add_output_arguments(tamper, config.DECRYPTED_MALICIOUS_OUTPUT_FILE_NAME, "복호화 결과 파일")
+    tamper.add_argument("--corrupt", type=int, default=config.NUM_TO_CORRUPT,
+                        help="손상시킬 레코드 수 (기본값: %(default)s)")
+    tamper.add_argument("--seed", type=int, default=None, help="손상 위치를 고정하기 위한 난수 시드")
+    _add_verify_all_argument(tamper)
+    tamper.set_defaults(handler=_cmd_tamper_test)
+
+    verify = subparsers.add_parser("verify", help="틀린/빈 인증키로 데이터가 전혀 유출되지 않는지 검증")
+    _add_common_arguments(verify)
+    _add_output_arguments(verify, config.DECRYPTED_NO_KEY_OUTPUT_FILE_NAME, "복호화 시도 결과 파일")
+    _add_verify_all_argument(verify)
+    verify.set_defaults(handler=_cmd_verify)
+
+    bench = subparsers.add_parser("bench", help="합성 데이터셋으로 시나리오별 성능을 측정하여 JSON으로 보고")
+    bench.add_argument("--rows", type=int, nargs="+", default=[1000, 10000],
+                       help="합성 CSV의 데이터 행 수 (여러 개 지정 가능, 기본값: %(default)s)")
+    bench.add_argument("--workers", type=int, default=None, help="병렬 워커 수 (기본값: CPU 코어 수)")
+    bench.add_argument("--iterations", type=int, default=480000, help="PBKDF2 반복 횟수 (기본값: %(default)s)")
+    bench.add_argument("--seed", type=int, default=0, help="합성 데이터 난수 시드 (기본값: %(default)s)")
+    bench.add_argument("--work-dir", default=None, help="임시 데이터셋을 만들 디렉터리 (기본값: 시스템 임시 디렉터리)")
+    bench.add_argument("--output", default=None, help="JSON 보고서 파일 (생략 시 표준 출력)")
+    bench.set_defaults(handler=_cmd_bench)
+
+    serve = subparsers.add_parser("serve", help="키를 한 번만 파생해 두고 레코드 복호화 요청을 처리하는 상주 서비스")
+    _add_common_arguments(serve)
+    serve.add_argument("--unix", default=config.SERVICE_SOCKET_FILE_NAME,
+                       help="Unix 소켓 경로 (0600으로 생성, 기본값: %(default)s)")
+    serve.add_argument("--tcp", action="store_true",
+                       help=f"Unix 소켓 대신 TCP로 열기 (환경변수 {config.SERVICE_TOKEN_ENV}의 토큰이 모든 요청에 필요)")
+    serve.add_argument("--host", default="127.0.0.1", help="--tcp일 때 바인드 주소 (기본값: %(default)s)")
+    serve.add_argument("--port", type=int, default=8765, help="--tcp일 때 포트 (기본값: %(default)s)")
+    serve.add_argument("--max-concurrency", type=int, default=64, help="동시에 처리할 배치 수 (기본값: %(default)s)")
+    serve.add_argument("--max-batch", type=int, default=10000, help="요청 하나의 최대 레코드 수 (기본값: %(default)s)")
+    serve.set_defaults(handler=_cmd_serve)
+
+    encrypt_columns = subparsers.add_parser("encrypt-columns",
+                                            help="원본 CSV를 컬럼별로 저장하고 민감한 컬럼만 암호화")
+    encrypt_columns.add_argument("--password", help=f"비밀번호 (생략 시 환경변수 {config.PASSWORD_ENV} 또는 입력 프롬프트)")
+    encrypt_columns.add_argument("--input", default=config.RAW_DATA_FILE_NAME, help="원본 CSV 파일 (기본값: %(default)s)")
+    encrypt_columns.add_argument("--output-dir", default=config.COLUMNAR_DIR_NAME,
+                                 help="컬럼 저장소 디렉터리 (기본값: %(default)s)")
+    encrypt_columns.add_argument("--sensitive", nargs="+", default=list(config.SENSITIVE_COLUMNS),
+                                 help="암호화할 컬럼 (기본값: %(default)s)")
+    encrypt_columns.add_argument("--row-group-size", type=int, default=config.COLUMNAR_ROW_GROUP_SIZE,
+                                 help="한 번에 압축/암호화할 행 수 (기본값: %(default)s)")
+    encrypt_columns.set_defaults(handler=_cmd_encrypt_columns)
+
+    read_columns = subparsers.add_parser("read-columns", help="컬럼 저장소에서 필요한 컬럼만 읽어 CSV로 저장")
+    read_columns.add_argument("--password", help=f"비밀번호 (암호화된 컬럼을 읽을 때만 필요, 환경변수 {config.PASSWORD_ENV})")
+    read_columns.add_argument("--input-dir", default=config.COLUMNAR_DIR_NAME,
+                              help="컬럼 저장소 디렉터리 (기본값: %(default)s)")
+    read_columns.add_argument("--columns", nargs="+", default=None, help="읽을 컬럼 (생략 시 전체)")
+    read_columns.add_argument("--output", required=True, help="결과 CSV 파일")
+    read_columns.set_defaults(handler=_cmd_read_columns)
+
+    encrypt_blocks = subparsers.add_parser("encrypt-blocks", help="레코드를 블록으로 묶어 압축한 뒤 암호화")
+    encrypt_blocks.add_argument("--password", help=f"비밀번호 (생략 시 환경변수 {config.PASSWORD_ENV} 또는 입력 프롬프트)")
+    encrypt_blocks.add_argument("--input", default=config.RAW_DATA_FILE_NAME, help="원본 CSV 파일 (기본값: %(default)s)")
+    encrypt_blocks.add_argument("--output", default=config.BLOCK_FILE_NAME, help="블록 압축 파일 (기본값: %(default)s)")
+    encrypt_blocks.add_argument("--codec", choices=["zlib", "lzma", "zstd"], default=config.BLOCK_CODEC,
+                                help="압축 코덱 (zstd는 zstandard 패키지 필요, 기본값: %(default)s)")
+    encrypt_blocks.add_argument("--block-records", type=int, default=config.BLOCK_RECORDS,
+                                help="블록 하나에 담을 레코드 수 (기본값: %(default)s)")
+    encrypt_blocks.set_defaults(handler=_cmd_encrypt_blocks)
+
+    decrypt_blocks = subparsers.add_parser("decrypt-blocks", help="블록 압축 파일을 복호화하여 CSV로 저장")
+    decrypt_blocks.add_argument("--password", help=f"비밀번호 (생략 시 환경변수 {config.PASSWORD_ENV} 또는 입력 프롬프트)")
+    decrypt_blocks.add_argument("--input", default=config.BLOCK_FILE_NAME, help="블록 압축 파일 (기본값: %(default)s)")
+    decrypt_blocks.add_argument("--workers", type=int, default=None, help="동시에 복호화할 블록 수 (기본값: CPU 코어 수)")
+    _add_output_arguments(decrypt_blocks, config.DECRYPTED_NORMAL_OUTPUT_FILE_NAME, "복호화 결과 파일")
+    decrypt_blocks.set_defaults(handler=_cmd_decrypt_blocks)
+
+    scan = subparsers.add_parser("scan", help="복호화 없이 모든 레코드의 HMAC을 검사하여 손상 레코드 비트맵 저장")
+    _add_common_arguments(scan)
+    scan.add_argument("--bitmap", default=None, help="손상 레코드 비트맵 파일 (기본값: <암호화 파일>.bad)")
+    scan.add_argument("--simulate-corrupt", type=int, default=0,
+                      help="이 수만큼 레코드를 손상시킨 임시 사본을 검사 (손상 탐지 시뮬레이션)")
+    scan.add_argument("--seed", type=int, default=None, help="손상 위치를 고정하기 위한 난수 시드")
+    scan.set_defaults(handler=_cmd_scan)
+
+    rekey = subparsers.add_parser("rekey", help="평문을 디스크에 쓰지 않고 모든 레코드를 새 비밀번호/솔트의 키로 교체")
+    _add_common_arguments(rekey)
+    rekey.add_argument("--new-password",
+                       help=f"새 비밀번호 (생략 시 환경변수 {config.NEW_PASSWORD_ENV} 또는 입력 프롬프트)")
+    rekey.add_argument("--checkpoint-every", type=int, default=config.REKEY_CHECKPOINT_RECORDS,
+                       help="이 개수의 레코드마다 체크포인트 저장 (기본값: %(default)s)")
+    rekey.set_defaults(handler=_cmd_rekey)
+
+    encrypt_shards = subparsers.add_parser("encrypt-shards", help="원본 CSV를 샤드 파일 여러 개로 나누어 병렬 암호화")
+    encrypt_shards.add_argument("--password", help=f"비밀번호 (생략 시 환경변수 {config.PASSWORD_ENV} 또는 입력 프롬프트)")
+    encrypt_shards.add_argument("--input", default=config.RAW_DATA_FILE_NAME, help="원본 CSV 파일 (기본값: %(default)s)")
+    encrypt_shards.add_argument("--output-dir", default=config.SHARD_DIR_NAME,
+                                help="manifest.json을 저장할 디렉터리 (기본값: %(default)s)")
+    encrypt_shards.add_argument("--shards", type=int, default=config.SHARD_COUNT, help="샤드 수 (기본값: %(default)s)")
+    encrypt_shards.add_argument("--shard-dirs", nargs="+", default=None,
+                                help="샤드 파일을 돌아가며 나누어 둘 디렉터리들 (디스크 분산, 기본값: --output-dir)")
+    encrypt_shards.add_argument("--workers", type=int, default=None, help="동시에 처리할 샤드 수 (기본값: CPU 코어 수)")
+    encrypt_shards.set_defaults(handler=_cmd_encrypt_shards)
+
+    decrypt_shards = subparsers.add_parser("decrypt-shards",
+                                           help="샤드들을 병렬 복호화하여 순서대로 합친 CSV로 저장 (실패한 샤드만 재시도)")
+    decrypt_shards.add_argument("--password", help=f"비밀번호 (생략 시 환경변수 {config.PASSWORD_ENV} 또는 입력 프롬프트)")
+    decrypt_shards.add_argument("--input-dir", default=config.SHARD_DIR_NAME,
+                                help="샤드 데이터셋 디렉터리 (기본값: %(default)s)")
+    decrypt_shards.add_argument("--output", default=config.DECRYPTED_NORMAL_OUTPUT_FILE_NAME,
+                                help="복호화 결과 파일 (기본값: %(default)s, 실패한 레코드는 '<결과>.failures.csv')")
+    decrypt_shards.add_argument("--workers", type=int, default=None, help="동시에 처리할 샤드 수 (기본값: CPU 코어 수)")
+    _add_verify_all_argument(decrypt_shards)
+    decrypt_shards.set_defaults(handler=_cmd_decrypt_shards)
+
+    verify_shards = subparsers.add_parser("verify-shards", help="키 없이 모든 샤드의 레코드 수 / SHA-256을 manifest와 대조")
+    verify_shards.add_argument("--input-dir", default=config.SHARD_DIR_NAME,
+                               help="샤드 데이터셋 디렉터리 (기본값: %(default)s)")
+    verify_shards.add_argument("--workers", type=int, default=None, help="동시에 검사할 샤드 수 (기본값: CPU 코어 수)")
+    verify_shards.set_defaults(handler=_cmd_verify_shards)
+
+    build_index = subparsers.add_parser("build-index", help="이미 암호화된 파일로 블라인드 인덱스를 (다시) 생성")
+    _add_common_arguments(build_index)
+    build_index.add_argument("--columns", nargs="+", default=list(config.BLIND_INDEX_COLUMNS),
+                             help="인덱스를 만들 컬럼 (기본값: %(default)s)")
+    build_index.set_defaults(handler=_cmd_build_index)
+
+    lookup = subparsers.add_parser("lookup", help="블라인드 인덱스로 컬럼 값이 일치하는 레코드만 찾아 복호화")
+    _add_common_arguments(lookup)
+    lookup.add_argument("--column", required=True, help="조회할 컬럼 (예: 이메일)")
+    lookup.add_argument("--value", required=True, help="찾을 값 (이메일은 대소문자, 전화번호는 하이픈 무시)")
+    lookup.set_defaults(handler=_cmd_lookup)
+
+    report = subparsers.add_parser("report", help="bench 보고서와 --metrics-json 결과로 성능 그래프를 PNG/SVG로 저장")
+    report.add_argument("--input", nargs="+", default=[config.RUN_LOG_DIR_NAME],
+                        help="JSON / JSON Lines 파일 또는 디렉터리 (여러 개 지정 가능, 기본값: %(default)s)")
+    report.add_argument("--output", nargs="+", default=[config.REPORT_FILE_NAME],
+                        help="그래프 파일 (확장자로 PNG/SVG 결정, 여러 개 지정 가능, 기본값: %(default)s)")
+    report.add_argument("--freq", default=None, help="시간 축 집계 주기 (pandas 주기 문자열, 예: h, D, W / 생략 시 실행마다)")
+    report.add_argument("--font", default=None, help="그래프에 쓸 한글 폰트 이름 (생략 시 설치된 폰트 중 자동 선택)")
+    report.add_argument("--summary", default=None, help="시나리오별 요약 표를 저장할 CSV 파일")
+    report.set_defaults(handler=_cmd_report)
+
+    for subparser in subparsers.choices.values():
+        _add_global_arguments(subparser, in_subcommand=True)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from . import metrics
+
+    args = build_parser().parse_args(argv)
+    registry = metrics.enable() if args.metrics_json or args.metrics_prom else None
+    if registry is not None:
+        registry.extra["command"] = args.command  # report에서 시나리오 이름으로 쓴다
+    try:
+        with metrics.profiling(args.profile, args.trace_memory):
+            return args.handler(args)
+    except WrongKeyError as e:
+        print(f"[!] 비밀번호가 틀렸습니다. {e}")
+    except FileNotFoundError as e:
+        print(f"[!] 초강력 오류: 필요한 파일이 없습니다. {e}")
+        traceback.print_exc()
+    except Exception as e:
+        print(f"[!] 예상치 못한 초강력 오류 발생: {type(e).__name__} - {e}")
+        traceback.print_exc()
+    finally:
+        if registry is not None:
+            metrics.disable()
+            metrics.write_metrics(registry, args.metrics_json, args.metrics_prom)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+컬럼 단위(columnar) 필드 암호화 저장소.
+
+줄 단위 암호화는 '나이'나 '성별' 하나를 보려 해도 주민등록번호와 은행계좌까지 들어 있는 행 전체를
+복호화해야 합니다. 이 모드는 8개 컬럼 스키마를 파싱해서 컬럼마다 별도의 파일에 저장하고,
+민감한 컬럼만 컬럼별 하위 키(HKDF)로 AES-256-GCM 암호화합니다. 나머지 컬럼은 압축만 합니다.
+분석 작업은 요청한 컬럼의 파일만 읽고, 그중 민감한 컬럼만 복호화합니다.
+(민감하지 않은 컬럼만 읽을 때는 비밀번호도, KDF도 필요 없다!)
+
+디렉터리 구성:
+    manifest.json  : 컬럼 목록, 민감 여부, 행 묶음(row group)별 행 수, KDF 파라미터, 키 검증 태그
+    col_<i>.bin    : 행 묶음마다 한 프레임 - length u32 | payload
+        평문 컬럼 payload: zlib(JSON 문자열 배열)
+        민감 컬럼 payload: nonce(12) | AES-GCM(zlib(JSON 문자열 배열)), AAD = 행 묶음 번호(u64)
+
+manifest.json은 모든 컬럼 파일을 다 쓴 뒤 마지막에 원자적으로 기록하므로,
+중간에 중단된 디렉터리는 manifest가 없어 읽히지 않습니다.
+"""
+import base64
+import csv
+import json
+import os
+import struct
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import config
+from .kdf import DEFAULT_ITERATIONS, derive_raw_key, derive_subkey
+from .keycheck import WrongKeyError, compute_tag, tags_match
+from .pipeline import Log, _log, _require_file
+
+MANIFEST_FILE_NAME = "manifest.json"
+COLUMNAR_FORMAT = "record_crypto-columnar"
+COLUMNAR_VERSION = 1
+COLUMN_KEY_LABEL = b"record_crypto column v1\0"
+
+NONCE_SIZE = 12
+_LENGTH = struct.Struct('<I')
+_AAD = struct.Struct('<Q')
+COMPRESS_LEVEL = 6
+
+
+def _column_key(raw_key: bytes, column: str) -> bytes:
+    # 컬럼마다 독립된 키: 한 컬럼의 키가 새어도 다른 컬럼은 안전하다
+    return derive_subkey(raw_key, COLUMN_KEY_LABEL + column.encode('utf-8'))
+
+
+def _encode_values(values: List[str]) -> bytes:
+    return zlib.compress(json.dumps(values, ensure_ascii=False).encode('utf-8'), COMPRESS_LEVEL)
+
+
+def _decode_values(payload: bytes) -> List[str]:
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def _write_manifest(directory: str, manifest: Dict) -> None:
+    path = os.path.join(directory, MANIFEST_FILE_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ColumnarWriter:
+    """
+    행을 받아 컬럼별로 모았다가, 행 묶음이 찰 때마다 컬럼 파일에 한 프레임씩 씁니다.
+
+        with ColumnarWriter.create("encrypted_columns", password, header) as writer:
+            writer.write_row(["김주원", "강원도 남양주시", ...])
+
+    with 블록이 예외로 끝나면 manifest를 쓰지 않으므로, 반쯤 쓴 저장소는 읽히지 않습니다.
+    """
+
+    def __init__(self, directory: str, raw_key: bytes, salt: bytes, columns: Sequence[str],
+                 sensitive_columns: Iterable[str] = config.SENSITIVE_COLUMNS,
+                 iterations: int = DEFAULT_ITERATIONS, row_group_size: int = config.COLUMNAR_ROW_GROUP_SIZE):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        self.directory = directory
+        self.columns = list(columns)
+        sensitive = set(sensitive_columns)
+        self._sensitive = [name in sensitive for name in self.columns]
+        self._aesgcm = [AESGCM(_column_key(raw_key, name)) if is_sensitive else None
+                        for name, is_sensitive in zip(self.columns, self._sensitive)]
+        self._salt = salt
+        self._iterations = iterations
+        self._key_check = compute_tag(raw_key)
+        self._row_group_size = row_group_size
+        self._row_groups: List[int] = []
+        self._pending: List[List[str]] = [[] for _ in self.columns]
+        self.count = 0
+        self._closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, MANIFEST_FILE_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)  # 다 쓰기 전까지는 읽을 수 없는 상태로 둔다
+        self._files = [open(os.path.join(directory, self._file_name(i)), 'wb',
+                            buffering=config.WRITE_BUFFER_SIZE) for i in range(len(self.columns))]
+
+    @classmethod
+    def create(cls, directory: str, password: str, columns: Sequence[str],
+               sensitive_columns: Iterable[str] = config.SENSITIVE_COLUMNS, salt: Optional[bytes] = None,
+               iterations: int = DEFAULT_ITERATIONS,
+               row_group_size: int = config.COLUMNAR_ROW_GROUP_SIZE) -> "ColumnarWriter":
+        """비밀번호로 키를 파생하여 새 컬럼 저장소를 만듭니다. 솔트를 주지 않으면 무작위로 생성합니다."""
+        salt = salt or os.urandom(16)
+        raw_key = derive_raw_key(password, salt, iterations)
+        return cls(directory, raw_key, salt, columns, sensitive_columns, iterations, row_group_size)
+
+    @staticmethod
+    def _file_name(column_index: int) -> str:
+        return f"col_{column_index}.bin"
+
+    def write_row(self, fields: Sequence[str]) -> None:
+        if len(fields) != len(self.columns):
+            raise ValueError(f"오류: {self.count + 1}번째 행의 필드 수가 {len(fields)}개입니다 "
+                             f"(스키마는 {len(self.columns)}개).")
+        for values, field in zip(self._pending, fields):
+            values.append(field)
+        self.count += 1
+        if len(self._pending[0]) >= self._row_group_size:
+            self._flush_row_group()
+
+    def _flush_row_group(self) -> None:
+        rows = len(self._pending[0])
+        if not rows:
+            return
+        group = len(self._row_groups)
+        for i, values in enumerate(self._pending):
+            payload = _encode_values(values)
+            if self._aesgcm[i] is not None:
+                nonce = os.urandom(NONCE_SIZE)
+                payload = nonce + self._aesgcm[i].encrypt(nonce, payload, _AAD.pack(group))
+            self._files[i].write(_LENGTH.pack(len(payload)))
+            self._files[i].write(payload)
+        self._row_groups.append(rows)
+        self._pending = [[] for _ in self.columns]
+
+    def close(self) -> None:
+        """남은 행 묶음을 쓰고 컬럼 파일을 fsync 한 뒤 manifest를 기록하여 저장소를 완성합니다."""
+        if self._closed:
+            return
+        self._closed = True
+        self._flush_row_group()
+        for f in self._files:
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        _write_manifest(self.directory, {
+            "format": COLUMNAR_FORMAT,
+            "version": COLUMNAR_VERSION,
+            "kdf": {"name": "pbkdf2-sha256", "iterations": self._iterations,
+                    "salt": base64.b64encode(self._salt).decode('ascii')},
+            "key_check": self._key_check.hex(),
+            "rows": self.count,
+            "row_groups": self._row_groups,
+            "columns": [{"name": name, "sensitive": is_sensitive, "file": self._file_name(i)}
+                        for i, (name, is_sensitive) in enumerate(zip(self.columns, self._sensitive))],
+        })
+
+    def abort(self) -> None:
+        """manifest 없이 컬럼 파일만 닫습니다. (중단된 저장소로 남는다)"""
+        self._closed = True
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ColumnarReader:
+    """
+    컬럼 저장소에서 필요한 컬럼만 골라 읽습니다.
+
+    민감한 컬럼을 읽으려면 먼저 unlock()으로 키를 준비해야 하고,
+    민감하지 않은 컬럼은 unlock() 없이도 읽을 수 있습니다.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        manifest_path = os.path.join(directory, MANIFEST_FILE_NAME)
+        _require_file(manifest_path, "컬럼 저장소 manifest")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("format") != COLUMNAR_FORMAT or manifest.get("version") != COLUMNAR_VERSION:
+            raise ValueError(f"오류: '{directory}'는 지원하지 않는 컬럼 저장소입니다 "
+                             f"(format={manifest.get('format')}, version={manifest.get('version')}).")
+        self.salt = base64.b64decode(manifest["kdf"]["salt"])
+        self.iterations = manifest["kdf"]["iterations"]
+        self.key_check = bytes.fromhex(manifest["key_check"])
+        self.rows = manifest["rows"]
+        self.row_groups = manifest["row_groups"]
+        self._columns = {entry["name"]: entry for entry in manifest["columns"]}
+        self.columns = [entry["name"] for entry in manifest["columns"]]
+        self._raw_key = None
+
+    @property
+    def sensitive_columns(self) -> List[str]:
+        return [name for name in self.columns if self._columns[name]["sensitive"]]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def unlock(self, password: Optional[str] = None, raw_key: Optional[bytes] = None) -> "ColumnarReader":
+        """비밀번호(또는 원시 키)를 검증하고 민감한 컬럼을 복호화할 준비를 합니다. 틀리면 WrongKeyError."""
+        if raw_key is None:
+            raw_key = derive_raw_key(password, self.salt, self.iterations)
+        if not tags_match(self.key_check, compute_tag(raw_key)):
+            raise WrongKeyError(f"오류: '{self.directory}'를 암호화할 때 사용한 비밀번호와 다릅니다. (키 검증 실패)")
+        self._raw_key = raw_key
+        return self
+
+    def _frames(self, column: str) -> Iterator[bytes]:
+        path = os.path.join(self.directory, self._columns[column]["file"])
+        with open(path, 'rb', buffering=config.READ_BUFFER_SIZE) as f:
+            for group in range(len(self.row_groups)):
+                header = f.read(_LENGTH.size)
+                payload = f.read(_LENGTH.unpack(header)[0]) if len(header) == _LENGTH.size else b""
+                if not payload:
+                    raise ValueError(f"오류: '{path}' 파일의 {group}번째 행 묶음이 잘려 있습니다.")
+                yield payload
+
+    def _column_groups(self, column: str) -> Iterator[List[str]]:
+        """한 컬럼을 행 묶음 단위로 읽어서 (필요하면 복호화하여) 값 목록으로 돌려줍니다."""
+        if column not in self._columns:
+            raise KeyError(f"오류: '{column}' 컬럼이 없습니다. (사용 가능: {', '.join(self.columns)})")
+        if not self._columns[column]["sensitive"]:
+            for payload in self._frames(column):
+                yield _decode_values(payload)
+            return
+
+        if self._raw_key is None:
+            raise RuntimeError(f"'{column}'은(는) 암호화된 컬럼입니다. unlock()을 먼저 호출하세요.")
+        from cryptography.exceptions import InvalidTag
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        aesgcm = AESGCM(_column_key(self._raw_key, column))
+        for group, payload in enumerate(self._frames(column)):
+            try:
+                plaintext = aesgcm.decrypt(payload[:NONCE_SIZE], payload[NONCE_SIZE:], _AAD.pack(group))
+            except InvalidTag:
+                raise ValueError(f"오류: '{column}' 컬럼의 {group}번째 행 묶음이 손상되었습니다 (인증 실패).") from None
+            yield _decode_values(plaintext)
+
+    def read_column(self, column: str) -> List[str]:
+        """한 컬럼의 값 전체를 읽습니다."""
+        values: List[str] = []
+        for group_values in self._column_groups(column):
+            values.extend(group_values)
+        return values
+
+    def read_columns(self, columns: Sequence[str]) -> Dict[str, List[str]]:
+        """요청한 컬럼만 읽어서 {컬럼명: 값 목록}으로 돌려줍니다."""
+        return {column: self.read_column(column) for column in columns}
+
+    def iter_rows(self, columns: Sequence[str]) -> Iterator[Tuple[str, ...]]:
+        """요청한 컬럼들로 이루어진 행을 행 묶음 단위로 스트리밍합니다. (전체 컬럼을 메모리에 올리지 않는다)"""
+        readers = [self._column_groups(column) for column in columns]
+        for groups in zip(*readers):
+            yield from zip(*groups)
+
+
+def encrypt_csv_columnar(password: str, raw_path: str = config.RAW_DATA_FILE_NAME,
+                         output_dir: str = config.COLUMNAR_DIR_NAME,
+                         sensitive_columns: Iterable[str] = config.SENSITIVE_COLUMNS,
+                         iterations: int = DEFAULT_ITERATIONS,
+                         row_group_size: int = config.COLUMNAR_ROW_GROUP_SIZE, log: Log = print) -> int:
+    """원본 CSV(첫 줄은 헤더)를 컬럼 저장소로 변환하고 데이터 행 수를 돌려줍니다."""
+    _require_file(raw_path, "원본 데이터")
+    with open(raw_path, 'r', encoding='utf-8', newline='', buffering=config.READ_BUFFER_SIZE) as raw_file:
+        rows = csv.reader(raw_file)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError(f"오류: '{raw_path}' 파일이 비어 있습니다.")
+        sensitive_columns = list(sensitive_columns)
+        unknown = [name for name in sensitive_columns if name not in header]
+        if unknown:
+            raise ValueError(f"오류: 헤더에 없는 민감 컬럼입니다: {', '.join(unknown)}")
+        with ColumnarWriter.create(output_dir, password, header, sensitive_columns,
+                                   iterations=iterations, row_group_size=row_group_size) as writer:
+            for fields in rows:
+                if fields:
+                    writer.write_row(fields)
+
+    encrypted = [name for name in header if name in sensitive_columns]
+    _log(log, f"[+] {writer.count}개 행을 컬럼별로 '{output_dir}'에 저장했습니다. (암호화: {', '.join(encrypted)})")
+    return writer.count
+
+
+def columns_to_csv(directory: str, columns: Sequence[str], output_path: str,
+                   password: Optional[str] = None, log: Log = print) -> int:
+    """
+    컬럼 저장소에서 지정한 컬럼만 읽어 CSV로 저장하고 행 수를 돌려줍니다.
+
+    요청한 컬럼이 모두 평문 컬럼이면 password는 필요 없습니다 (KDF도 돌리지 않는다).
+    """
+    reader = ColumnarReader(directory)
+    columns = list(columns) or reader.columns
+    needs_key = [column for column in columns if column in reader.sensitive_columns]
+    if needs_key:
+        if password is None:
+            raise WrongKeyError(f"오류: 암호화된 컬럼({', '.join(needs_key)})을 읽으려면 비밀번호가 필요합니다.")
+        reader.unlock(password)
+
+    count = 0
+    with open(output_path, 'w', encoding='utf-8', newline='', buffering=config.WRITE_BUFFER_SIZE) as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(columns)
+        for row in reader.iter_rows(columns):
+            writer.writerow(row)
+            count += 1
+
+    _log(log, f"[+] {count}개 행의 컬럼({', '.join(columns)})을 '{output_path}' 파일로 저장했습니다. "
+              f"(복호화한 컬럼: {', '.join(needs_key) or '없음'})")
+    return count
@@ -0,0 +1,53 @@
+"""
+파이프라인 전체에서 공유하는 기본 파일명과 설정값.
+
+예전에는 스크립트마다 같은 상수를 복사해서 들고 있었지만, 이제는 여기 한 곳에서만 정의하고
+CLI 옵션으로 얼마든지 바꿀 수 있습니다. (이 모듈은 가벼워야 하므로 무거운 import 금지!)
+"""
+RAW_DATA_FILE_NAME = "Temporary personal data.csv"  # 암호화할 '원본 데이터 파일명'
+ENCRYPTED_PER_RECORD_FILE_NAME = "encrypted_records.bin"  # 각 레코드가 암호화되어 저장될 파일
+SALT_FILE_NAME = "salt_per_record.bin"  # 이 방식에서 사용할 솔트 파일
+
+DECRYPTED_NORMAL_OUTPUT_FILE_NAME = "decrypted_records_normal.csv"  # 정상 복호화 결과
+DECRYPTED_MALICIOUS_OUTPUT_FILE_NAME = "decrypted_records_malicious_random.csv"  # 랜덤 손상 시뮬레이션 결과
+DECRYPTED_NO_KEY_OUTPUT_FILE_NAME = "decrypted_records_no_key_leak_final.csv"  # 인증키 제거 검증 결과
+
+# 비밀번호를 명령행에 직접 쓰지 않도록 환경변수로도 받을 수 있다.
+PASSWORD_ENV = "RECORD_CRYPTO_PASSWORD"
+
+# 스트리밍 암호화 설정 (레코드를 메모리에 쌓지 않고 바로바로 파일에 쓴다!)
+READ_BUFFER_SIZE = 1024 * 1024  # 원본 CSV를 읽을 때 사용할 버퍼 크기 (바이트)
+WRITE_BUFFER_SIZE = 1024 * 1024  # 암호화 결과를 쓸 때 사용할 버퍼 크기 (바이트)
+FLUSH_EVERY_RECORDS = 10000  # 이 개수의 레코드마다 출력 버퍼를 디스크로 flush
+
+NUM_TO_CORRUPT = 50  # 랜덤 손상 시뮬레이션에서 손상시킬 레코드 수
+
+# 컬럼 단위 암호화 설정 (민감한 컬럼만 암호화하고, 필요한 컬럼만 골라서 읽는다)
+COLUMNAR_DIR_NAME = "encrypted_columns"  # 컬럼별 파일과 manifest.json이 저장될 디렉터리
+SENSITIVE_COLUMNS = ("이름", "주소", "전화번호", "이메일", "주민등록번호", "은행계좌")  # 나머지(나이, 성별)는 압축만
+COLUMNAR_ROW_GROUP_SIZE = 65536  # 한 번에 압축/암호화하는 행 묶음 크기
+
+# 블록 압축 암호화 설정 (N개 레코드를 묶어 압축한 뒤 암호화한다)
+BLOCK_FILE_NAME = "encrypted_records.rcz"  # 블록 압축 암호화 파일 (인덱스: '<파일>.idx')
+BLOCK_CODEC = "zlib"  # zlib / lzma / zstd(zstandard 패키지가 있을 때)
+BLOCK_RECORDS = 1024  # 블록 하나에 담을 레코드 수 (클수록 잘 압축되고, 작을수록 임의 접근이 싸다)
+
+# 키 교체(rekey) 설정
+NEW_PASSWORD_ENV = "RECORD_CRYPTO_NEW_PASSWORD"  # 새 비밀번호를 환경변수로 받을 때
+REKEY_CHECKPOINT_RECORDS = 100000  # 이 개수의 레코드마다 결과를 fsync 하고 체크포인트 저장
+
+# 샤드 데이터셋 설정 (레코드를 여러 파일로 나누어 프로세스마다 따로 암호화/복호화한다)
+SHARD_DIR_NAME = "encrypted_shards"  # manifest.json과 샤드 파일이 저장될 디렉터리
+SHARD_COUNT = 8  # 기본 샤드 수 (CPU 코어 수 이상이면 모든 코어를 쓴다)
+
+# 블라인드 인덱스 설정 (복호화 없이 이메일/전화번호 값으로 레코드를 찾는다)
+BLIND_INDEX_COLUMNS = ("이메일", "전화번호")  # build-index에서 컬럼을 지정하지 않았을 때의 기본값
+BLIND_INDEX_RUN_ENTRIES = 500000  # 인덱스를 만들 때 컬럼마다 이 개수의 항목이 모이면 정렬해서 임시 파일로 내린다 (메모리 상한)
+
+# 복호화 서비스(serve) 설정
+SERVICE_SOCKET_FILE_NAME = "record_crypto.sock"  # 기본 Unix 소켓 (만든 사용자만 접속 가능한 0600)
+SERVICE_TOKEN_ENV = "RECORD_CRYPTO_SERVICE_TOKEN"  # --tcp로 열 때 모든 요청에 필요한 공유 비밀 토큰
+
+# 성능 보고서(report) 설정
+RUN_LOG_DIR_NAME = "run_logs"  # bench 보고서 / --metrics-json 결과를 모아 두는 디렉터리
+REPORT_FILE_NAME = "performance_report.png"  # 확장자(.png / .svg)에 맞는 형식으로 저장
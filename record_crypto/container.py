@@ -0,0 +1,297 @@
+"""
+길이 접두 방식의 컴팩트 바이너리 레코드 컨테이너 (AES-256-GCM).
+
+Fernet 토큰은 Base64 텍스트라서 암호문보다 약 33% 크고, 레코드마다 버전/타임스탬프/IV까지 붙습니다.
+이 컨테이너는 원시 바이너리로 저장하므로 레코드당 오버헤드가 '길이 4 + nonce 12 + 태그 16 = 32바이트'뿐이고,
+복호화할 때 레코드마다 Base64 디코딩을 할 필요도 없습니다.
+
+파일 형식 (정수는 모두 little-endian):
+    헤더: MAGIC(4) | version u8 | kdf u8 | iterations u32 | salt_len u8 | salt | key_check(32)
+    레코드: length u32 | nonce(12) | ciphertext + GCM tag(16)
+    끝 표시: (length | 0x80000000) u32 | nonce(12) | GCM tag(16)   (빈 평문, AAD = END_AAD + 레코드 수 u64)
+
+각 레코드는 레코드 번호(u64)를 AAD로 묶어 인증하므로, 레코드 순서를 바꿔치기해도 복호화에 실패합니다.
+마지막의 끝 표시는 전체 레코드 수를 인증하므로, 레코드 경계에서 파일 뒤쪽을 잘라내도(끝 표시째로 잘라내도) 알아챕니다.
+헤더의 key_check(키 검증 태그)로 틀린 비밀번호는 레코드를 하나도 건드리기 전에 거부합니다.
+"""
+import mmap
+import os
+import struct
+from typing import Iterator, Optional, Tuple
+
+from . import metrics
+from .engine import DecryptResult, FAILURE_ERROR, FAILURE_INVALID_TOKEN, decrypt_records
+from .index import IndexWriter, RecordIndex, index_path_for
+from .kdf import DEFAULT_ITERATIONS, derive_raw_key
+from .keycheck import KEY_CHECK_SIZE, WrongKeyError, compute_tag, tags_match
+
+CONTAINER_MAGIC = b"RCBF"
+CONTAINER_VERSION = 2
+CONTAINER_SUFFIX = ".rcb"
+KDF_PBKDF2_SHA256 = 1
+
+NONCE_SIZE = 12
+TAG_SIZE = 16
+_HEADER = struct.Struct('<4sBBIB')  # magic, version, kdf, iterations, salt_len
+_LENGTH = struct.Struct('<I')
+_AAD = struct.Struct('<Q')
+_END_FLAG = 0x80000000  # 길이 필드의 최상위 비트 = 끝 표시 프레임
+_END_AAD = b"record_crypto container end\0"
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def _aad(index: int) -> bytes:
+    return _AAD.pack(index)
+
+
+def _end_aad(records: int) -> bytes:
+    return _END_AAD + _AAD.pack(records)
+
+
+def _pack_header(salt: bytes, iterations: int, key: bytes) -> bytes:
+    header = _HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, KDF_PBKDF2_SHA256, iterations, len(salt))
+    return header + salt + compute_tag(key)
+
+
+class ContainerWriter:
+    """
+    레코드를 하나씩 AES-GCM으로 암호화하여 컨테이너 파일에 스트리밍으로 씁니다.
+
+        with ContainerWriter.create("records.rcb", password) as writer:
+            writer.write(b"...")
+
+    with 블록이 예외로 끝나면 임시 파일을 지우고, 정상적으로 끝날 때만 path에 완성된 컨테이너가 생깁니다.
+    """
+
+    def __init__(self, path: str, key: bytes, salt: bytes, iterations: int = DEFAULT_ITERATIONS,
+                 index_path: Optional[str] = None):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        self._aesgcm = AESGCM(key)
+        self.path = path
+        self._index_path = index_path
+        # 다 쓰기 전까지는 임시 파일에 쓰고 close()에서 제자리로 옮긴다. (반쯤 쓴 컨테이너가 보이지 않도록)
+        self._file = open(path + ".tmp", 'wb', buffering=WRITE_BUFFER_SIZE)
+        header = _pack_header(salt, iterations, key)
+        self._file.write(header)
+        self._index_writer = IndexWriter(index_path + ".tmp", start_offset=len(header)) if index_path else None
+        self.count = 0
+
+    @classmethod
+    def create(cls, path: str, password: str, salt: Optional[bytes] = None,
+               iterations: int = DEFAULT_ITERATIONS, with_index: bool = False) -> "ContainerWriter":
+        """비밀번호로 키를 파생하여 새 컨테이너를 만듭니다. 솔트를 주지 않으면 무작위로 생성합니다."""
+        salt = salt or os.urandom(16)
+        key = derive_raw_key(password, salt, iterations)
+        return cls(path, key, salt, iterations, index_path_for(path) if with_index else None)
+
+    def write(self, plaintext: bytes) -> None:
+        nonce = os.urandom(NONCE_SIZE)
+        sealed = self._aesgcm.encrypt(nonce, plaintext, _aad(self.count))
+        self._file.write(_LENGTH.pack(NONCE_SIZE + len(sealed)))
+        self._file.write(nonce)
+        self._file.write(sealed)
+        if self._index_writer:
+            self._index_writer.add(_LENGTH.size + NONCE_SIZE + len(sealed))
+        self.count += 1
+
+    def close(self) -> None:
+        """레코드 수를 인증하는 끝 표시를 쓰고, 파일을 fsync 한 뒤 제자리로 옮겨 컨테이너를 완성합니다."""
+        if self._file.closed:
+            return
+        nonce = os.urandom(NONCE_SIZE)
+        sealed = self._aesgcm.encrypt(nonce, b"", _end_aad(self.count))
+        self._file.write(_LENGTH.pack(_END_FLAG | (NONCE_SIZE + len(sealed))))
+        self._file.write(nonce)
+        self._file.write(sealed)
+        if self._index_writer:
+            self._index_writer.skip(_LENGTH.size + NONCE_SIZE + len(sealed))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self._index_writer:
+            self._index_writer.close(fsync=True)
+            os.replace(self._index_path + ".tmp", self._index_path)
+        os.replace(self.path + ".tmp", self.path)
+
+    def abort(self) -> None:
+        """지금까지 쓴 내용을 버립니다. path(와 인덱스)는 건드리지 않습니다."""
+        self._file.close()
+        if self._index_writer:
+            self._index_writer.close()
+        for tmp_path in (self.path + ".tmp", self._index_path and self._index_path + ".tmp"):
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()  # 중간에 실패한 쓰기를 완성된 컨테이너처럼 남기지 않는다
+
+
+class ContainerReader:
+    """
+    컨테이너 파일을 mmap 하여 레코드를 읽고 복호화합니다.
+
+    헤더에서 솔트와 KDF 파라미터를 읽으므로 별도의 솔트 파일이 필요 없습니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _HEADER.size:
+            raise ValueError(f"오류: '{path}'는 컨테이너 파일이 아닙니다 (헤더가 너무 짧음).")
+        magic, version, kdf_id, iterations, salt_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != CONTAINER_MAGIC:
+            raise ValueError(f"오류: '{path}'는 컨테이너 파일이 아닙니다 (MAGIC 불일치).")
+        if version != CONTAINER_VERSION or kdf_id != KDF_PBKDF2_SHA256:
+            raise ValueError(f"오류: 지원하지 않는 컨테이너 버전/KDF입니다 (version={version}, kdf={kdf_id}).")
+        self.iterations = iterations
+        self.salt = bytes(self._mm[_HEADER.size:_HEADER.size + salt_len])
+        self.key_check = bytes(self._mm[_HEADER.size + salt_len:_HEADER.size + salt_len + KEY_CHECK_SIZE])
+        self.data_offset = _HEADER.size + salt_len + KEY_CHECK_SIZE
+        self._end_span: Optional[Tuple[int, int]] = None  # frames()를 끝까지 읽으면 끝 표시 프레임의 [시작, 끝)
+        self._aesgcm = None
+        self._index = None
+
+    def unlock(self, password: Optional[str] = None, key: Optional[bytes] = None,
+               check_key: bool = True) -> "ContainerReader":
+        """
+        비밀번호(또는 이미 파생된 원시 키)로 복호화 준비를 합니다.
+
+        헤더의 키 검증 태그와 상수 시간으로 비교하여, 틀린 키는 WrongKeyError로 즉시 거부합니다.
+        감사 목적으로 모든 레코드를 직접 시도해 보려면 check_key=False를 주세요.
+        """
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        if key is None:
+            key = derive_raw_key(password, self.salt, self.iterations)
+        if check_key and not tags_match(self.key_check, compute_tag(key)):
+            raise WrongKeyError(f"오류: '{self.path}'를 암호화할 때 사용한 비밀번호와 다릅니다. (키 검증 실패)")
+        self._aesgcm = AESGCM(key)
+        return self
+
+    def frames(self) -> Iterator[memoryview]:
+        """
+        각 레코드의 'nonce | ciphertext+tag' 영역을 복사 없이 memoryview로 돌려줍니다.
+        파일 끝에 끝 표시가 없거나 그 뒤에 바이트가 더 있으면 ValueError. (끝 표시의 인증은 decrypt_all이 한다)
+        """
+        view = memoryview(self._mm)
+        pos = self.data_offset
+        end = len(self._mm)
+        while pos < end:
+            if pos + _LENGTH.size > end:
+                raise ValueError(f"오류: '{self.path}' 파일 끝의 레코드 길이가 잘려 있습니다.")
+            (length,) = _LENGTH.unpack_from(self._mm, pos)
+            pos += _LENGTH.size
+            is_end = bool(length & _END_FLAG)
+            length &= ~_END_FLAG
+            if pos + length > end:
+                raise ValueError(f"오류: '{self.path}' 파일 끝의 레코드가 잘려 있습니다.")
+            if is_end:
+                if pos + length != end:
+                    raise ValueError(f"오류: '{self.path}'의 끝 표시 뒤에 데이터가 더 있습니다.")
+                self._end_span = (pos, end)
+                return
+            yield view[pos:pos + length]
+            pos += length
+        raise ValueError(f"오류: '{self.path}'에 끝 표시가 없습니다. (파일 뒤쪽이 잘렸을 수 있음)")
+
+    def _decrypt_frame(self, index: int, frame: memoryview) -> DecryptResult:
+        from cryptography.exceptions import InvalidTag
+
+        try:
+            plaintext = self._aesgcm.decrypt(frame[:NONCE_SIZE], frame[NONCE_SIZE:], _aad(index))
+            return DecryptResult(index, plaintext.decode('utf-8'))
+        except InvalidTag:
+            return DecryptResult(index, None, FAILURE_INVALID_TOKEN)
+        except Exception as e:
+            return DecryptResult(index, None, FAILURE_ERROR, str(e))
+
+    def decrypt_all(self) -> Iterator[DecryptResult]:
+        """
+        모든 레코드를 순서대로 복호화합니다. 실패는 DecryptResult.failure로 보고합니다.
+        마지막에 끝 표시로 레코드 수를 확인하고, 레코드가 빠졌으면(파일이 잘렸으면) ValueError를 발생시킵니다.
+        """
+        from cryptography.exceptions import InvalidTag
+
+        if self._aesgcm is None:
+            raise RuntimeError("unlock()을 먼저 호출하세요.")
+        records = 0
+        for index, frame in enumerate(self.frames()):
+            yield self._decrypt_frame(index, frame)
+            records = index + 1
+        start, end = self._end_span
+        end_frame = self._mm[start:end]
+        try:
+            self._aesgcm.decrypt(end_frame[:NONCE_SIZE], end_frame[NONCE_SIZE:], _end_aad(records))
+        except InvalidTag:
+            raise ValueError(f"오류: '{self.path}'의 끝 표시가 레코드 {records}개와 맞지 않습니다. "
+                             f"(레코드가 잘려 나갔거나 끝 표시가 손상됨)") from None
+
+    def get_record(self, n: int) -> DecryptResult:
+        """사이드카 인덱스('<파일>.idx')를 이용해 n번째 레코드 하나만 복호화합니다."""
+        if self._aesgcm is None:
+            raise RuntimeError("unlock()을 먼저 호출하세요.")
+        if self._index is None:
+            self._index = RecordIndex(self.path)
+        start, _ = self._index.span(n)  # 마지막 레코드의 범위에는 끝 표시도 들어 있으므로 길이는 접두에서 읽는다
+        (length,) = _LENGTH.unpack_from(self._mm, start)
+        return self._decrypt_frame(n, memoryview(self._mm)[start + _LENGTH.size:start + _LENGTH.size + length])
+
+    def close(self) -> None:
+        if self._index is not None:
+            self._index.close()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def build_container_index(path: str, index_path: Optional[str] = None) -> int:
+    """이미 만들어진 컨테이너 파일을 훑어서 오프셋 인덱스를 만들고, 레코드 수를 돌려줍니다."""
+    index_path = index_path or index_path_for(path)
+    with ContainerReader(path) as reader, IndexWriter(index_path, start_offset=reader.data_offset) as index_writer:
+        for frame in reader.frames():
+            index_writer.add(_LENGTH.size + len(frame))
+            frame.release()
+        start, end = reader._end_span
+        index_writer.skip(_LENGTH.size + end - start)
+        return index_writer.count
+
+
+def convert_fernet_file(source_path: str, salt_path: str, password: str, output_path: str,
+                        iterations: int = DEFAULT_ITERATIONS, workers: Optional[int] = None,
+                        with_index: bool = True, source_iterations: int = DEFAULT_ITERATIONS) -> int:
+    """
+    기존 Base64 텍스트 형식(encrypted_records.bin)을 컴팩트 컨테이너로 변환하고 레코드 수를 돌려줍니다.
+
+    source_iterations는 기존 파일을 암호화할 때 쓴 PBKDF2 반복 횟수, iterations는 새 컨테이너의 반복 횟수입니다.
+    평문은 메모리 안에서만 거쳐 가며 디스크에는 쓰지 않습니다.
+    복호화에 실패한 레코드가 하나라도 있으면 변환 결과를 남기지 않고 ValueError를 발생시킵니다.
+    """
+    from .kdf import derive_key
+    from .keycheck import ensure_key_correct
+
+    with open(salt_path, 'rb') as f:
+        old_salt = f.read()
+    old_key = derive_key(password, old_salt, source_iterations)
+    ensure_key_correct(source_path, old_key)
+
+    with open(source_path, 'rb') as source_file, \
+            ContainerWriter.create(output_path, password, iterations=iterations, with_index=with_index) as writer:
+        tokens = (line.strip(b'\n') for line in source_file)
+        for result in decrypt_records(old_key, (token for token in tokens if token), workers=workers):
+            if not result.ok:
+                raise ValueError(f"오류: {result.index + 1}번째 레코드를 복호화할 수 없어 변환을 중단합니다 ({result.failure}).")
+            writer.write(result.plaintext.encode('utf-8'))
+    metrics.count("records", writer.count, result="ok")
+    return writer.count
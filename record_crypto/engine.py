@@ -0,0 +1,159 @@
+"""
+멀티코어 레코드 암호화/복호화 엔진.
+
+레코드를 청크로 나누어 프로세스 풀(또는 스레드 풀)에 분배하고,
+결과는 항상 '원래 레코드 순서 그대로' 돌려줍니다.
+동시에 처리 중인 청크 수에 상한을 두므로 입력이 아무리 커도 메모리 사용량은 일정합니다.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from cryptography.fernet import Fernet, InvalidToken
+
+DEFAULT_CHUNK_SIZE = 2000  # 워커 하나에 한 번에 넘길 레코드 수
+MAX_IN_FLIGHT_PER_WORKER = 4  # 워커당 동시에 대기시킬 수 있는 청크 수 (메모리 상한)
+
+# 레코드 복호화 실패 유형 (기존 스크립트의 except 분기와 1:1 대응)
+FAILURE_INVALID_TOKEN = "InvalidToken"  # except cryptography.fernet.InvalidToken
+FAILURE_ERROR = "error"  # except Exception
+
+# 프로세스 풀 워커마다 한 번만 만들어 두는 Fernet 객체
+_worker_fernet: Optional[Fernet] = None
+
+
+class DecryptResult(NamedTuple):
+    """레코드 하나의 복호화 결과."""
+    index: int  # 0부터 시작하는 레코드 번호
+    plaintext: Optional[str]  # 성공 시 복호화된 문자열
+    failure: Optional[str] = None  # 실패 시 FAILURE_INVALID_TOKEN 또는 FAILURE_ERROR
+    message: str = ""  # FAILURE_ERROR일 때의 예외 메시지
+
+    @property
+    def ok(self) -> bool:
+        return self.failure is None
+
+
+def default_workers() -> int:
+    """사용 가능한 CPU 코어 수 (기본 워커 수)."""
+    return os.cpu_count() or 1
+
+
+def worker_fernet() -> Optional[Fernet]:
+    """프로세스 풀 워커 안에서 initializer가 만들어 둔 Fernet 객체."""
+    return _worker_fernet
+
+
+def _init_worker(key: bytes) -> None:
+    global _worker_fernet
+    _worker_fernet = Fernet(key)
+
+
+def _encrypt_chunk(records: List[bytes], fernet: Optional[Fernet] = None) -> List[bytes]:
+    fernet = fernet or _worker_fernet
+    return [fernet.encrypt(record) for record in records]
+
+
+def decrypt_token(fernet: Fernet, index: int, token) -> DecryptResult:
+    """
+    토큰 하나를 복호화하고, 실패하면 예외 대신 실패 결과를 돌려줍니다.
+
+    token은 bytes 또는 memoryview 등 bytes-like 객체입니다.
+    Fernet.decrypt는 bytes만 받으므로 memoryview는 여기서 단 한 번만 bytes로 바뀝니다.
+    """
+    try:
+        return DecryptResult(index, fernet.decrypt(bytes(token)).decode('utf-8'))
+    except InvalidToken:
+        return DecryptResult(index, None, FAILURE_INVALID_TOKEN)
+    except Exception as e:
+        return DecryptResult(index, None, FAILURE_ERROR, str(e))
+
+
+def _decrypt_chunk(start: int, tokens: List[bytes], fernet: Optional[Fernet] = None) -> List[DecryptResult]:
+    fernet = fernet or _worker_fernet
+    return [decrypt_token(fernet, start + offset, token) for offset, token in enumerate(tokens)]
+
+
+def chunked(items: Iterable, chunk_size: int) -> Iterator[Tuple[int, list]]:
+    iterator = iter(items)
+    start = 0
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def ordered_map(func, key: Optional[bytes], arg_tuples: Iterable[tuple], workers: int, use_threads: bool) -> Iterator:
+    """
+    arg_tuples의 각 인자로 func를 병렬 실행하고, 결과를 제출 순서대로 돌려줍니다.
+
+    워커가 1개면 풀 없이 현재 프로세스에서 바로 처리합니다.
+    key가 None이면 fernet 인자 없이 func(*args)만 호출합니다. (HMAC 검사, AES-GCM 블록처럼 Fernet을 쓰지 않는 작업용)
+    """
+    if workers <= 1:
+        call = func if key is None else partial(func, fernet=Fernet(key))
+        for args in arg_tuples:
+            yield call(*args)
+        return
+
+    if use_threads:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        if key is not None:
+            func = partial(func, fernet=Fernet(key))
+    elif key is None:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(key,))
+
+    max_in_flight = workers * MAX_IN_FLIGHT_PER_WORKER
+    with executor:
+        pending = deque()
+        for args in arg_tuples:
+            pending.append(executor.submit(func, *args))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def encrypt_records(key: bytes, records: Iterable[bytes], workers: Optional[int] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, use_threads: bool = False) -> Iterator[bytes]:
+    """
+    평문 레코드들을 병렬로 암호화하여 Fernet 토큰을 입력 순서대로 하나씩 돌려줍니다.
+    """
+    from . import metrics
+
+    workers = workers or default_workers()
+    chunks = ((chunk,) for _, chunk in chunked(records, chunk_size))
+    if metrics.current() is None:
+        for tokens in ordered_map(_encrypt_chunk, key, chunks, workers, use_threads):
+            yield from tokens
+        return
+    timed = ordered_map(partial(metrics.timed_chunk, _encrypt_chunk), key, chunks, workers, use_threads)
+    for tokens in metrics.observe_chunks(timed, "encrypt"):
+        yield from tokens
+
+
+def decrypt_records(key: bytes, tokens: Iterable[bytes], workers: Optional[int] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, use_threads: bool = False) -> Iterator[DecryptResult]:
+    """
+    Fernet 토큰들을 병렬로 복호화하여 DecryptResult를 입력 순서대로 하나씩 돌려줍니다.
+
+    InvalidToken 및 기타 예외는 전파하지 않고 결과의 failure 필드로 보고합니다.
+    """
+    from . import metrics
+
+    workers = workers or default_workers()
+    chunks = chunked(tokens, chunk_size)
+    if metrics.current() is None:
+        for results in ordered_map(_decrypt_chunk, key, chunks, workers, use_threads):
+            yield from results
+        return
+    timed = ordered_map(partial(metrics.timed_chunk, _decrypt_chunk), key, chunks, workers, use_threads)
+    for results in metrics.observe_chunks(timed, "decrypt"):
+        yield from results
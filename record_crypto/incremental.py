@@ -0,0 +1,217 @@
+"""
+추가된 CSV 행만 암호화하는 증분(append-only) 암호화.
+
+전체 암호화(encrypt_csv)는 새 솔트로 모든 행을 암호화한 뒤 '<암호화 파일>.ckpt' 체크포인트를 남기고,
+증분 모드는 이 체크포인트에 기억해 둔 위치 뒤에 새로 붙은 행만 처리합니다.
+
+    source_path                  - 암호화한 원본 CSV의 경로 (다른 파일로 이어서 쓰지 않도록, 암호화 파일 디렉터리 기준 상대 경로)
+    source_offset / source_rows  - 지금까지 암호화한 원본 CSV의 바이트 위치와 행 수
+    source_sha256                - 원본 CSV [0, source_offset) 구간의 SHA-256 (앞부분이 바뀌었는지 확인)
+    source_ends_with_newline     - 마지막으로 암호화한 줄이 개행으로 끝났는지 (전체 암호화는 개행 없는 마지막 줄도 암호화한다)
+    encrypted_size / records     - 커밋된 암호화 파일 크기와 레코드 수
+
+기존 솔트와 키를 그대로 쓰므로(키 검증 태그로 확인) 예전 암호문은 그대로 유효하고, 새 레코드의 토큰만 파일 끝에 덧붙습니다.
+체크포인트 없이 암호화 파일만 있으면 어디까지 암호화했는지 알 수 없으므로, 덮어쓰지 않고 전체 암호화를 다시 하라고 거부합니다.
+
+중간에 죽어도 안전하도록, 데이터 파일과 인덱스를 fsync 한 다음에야 체크포인트를 원자적으로(os.replace) 교체합니다.
+다음 실행은 항상 체크포인트에 적힌 크기로 데이터/인덱스 파일을 잘라낸 뒤 이어서 쓰므로,
+커밋되지 않은 반쯤 쓰인 레코드는 자동으로 버려지고 다시 암호화됩니다.
+
+원본 CSV의 마지막 줄이 개행으로 끝나지 않으면 아직 쓰는 중인 행일 수 있으므로 다음 실행으로 미룹니다.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from . import config, metrics
+from .blind_index import remove_blind_indexes
+from .index import IndexWriter, index_path_for
+from .kdf import derive_key
+from .keycheck import ensure_key_correct, write_key_check
+from .pipeline import Log, _log, _require_file, load_key, save_salt, strip_line_end, write_token_stream
+
+CHECKPOINT_SUFFIX = ".ckpt"
+CHECKPOINT_VERSION = 1
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class IncrementalResult(NamedTuple):
+    new_records: int  # 이번 실행에서 새로 암호화한 레코드 수
+    total_records: int  # 암호화 파일의 전체 레코드 수
+
+
+def checkpoint_path_for(encrypted_path: str) -> str:
+    return encrypted_path + CHECKPOINT_SUFFIX
+
+
+def load_checkpoint(encrypted_path: str) -> Optional[Dict]:
+    path = checkpoint_path_for(encrypted_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"오류: 지원하지 않는 체크포인트 버전입니다: '{path}'")
+    return checkpoint
+
+
+def write_checkpoint(encrypted_path: str, checkpoint: Dict) -> None:
+    path = checkpoint_path_for(encrypted_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)  # 커밋 지점: 이 교체가 끝나야 새 레코드가 '확정'된다
+
+
+def remove_checkpoint(encrypted_path: str) -> None:
+    path = checkpoint_path_for(encrypted_path)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _hash_prefix(raw_file, length: int):
+    digest = hashlib.sha256()
+    remaining = length
+    while remaining > 0:
+        block = raw_file.read(min(_HASH_BLOCK_SIZE, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest
+
+
+class SourceLines:
+    """
+    원본 CSV(바이너리 모드)의 현재 위치부터 줄 단위 레코드를 돌려주며, 소비한 바이트 수와 해시를 누적합니다.
+
+    complete_only=True(증분 암호화)이면 개행으로 끝나지 않은 마지막 줄은 아직 쓰는 중일 수 있으므로 건드리지 않고,
+    False(전체 암호화)이면 그 줄도 레코드로 돌려준 뒤 ends_with_newline을 False로 남깁니다.
+    """
+
+    def __init__(self, raw_file, digest=None, complete_only: bool = True, offset: int = 0, rows: int = 0):
+        self._raw_file = raw_file
+        self._complete_only = complete_only
+        self.digest = digest or hashlib.sha256()
+        self.offset = offset  # 지금까지 소비한 원본 바이트 위치
+        self.rows = rows
+        self.ends_with_newline = True
+
+    def consume(self, data: bytes) -> None:
+        """레코드가 아닌 원본 바이트(앞 줄을 끝맺는 개행)를 소비한 것으로 기록합니다."""
+        self.digest.update(data)
+        self.offset += len(data)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for line in self._raw_file:
+            if not line.endswith(b'\n'):
+                if self._complete_only:
+                    return  # 아직 다 쓰이지 않은 마지막 줄은 다음 실행에서 처리
+                self.ends_with_newline = False
+            self.consume(line)
+            self.rows += 1
+            yield strip_line_end(line)
+
+
+def _source_path(raw_path: str, encrypted_path: str) -> str:
+    # 상대 경로로 적어 두어야 원본과 암호화 파일을 디렉터리째 옮겨도 체크포인트가 유효하다.
+    return os.path.relpath(os.path.abspath(raw_path), os.path.dirname(os.path.abspath(encrypted_path)))
+
+
+def new_checkpoint(raw_path: str, encrypted_path: str, source: SourceLines, encrypted_size: int, records: int) -> Dict:
+    """원본을 source까지 암호화한 상태의 체크포인트 내용."""
+    return {
+        "version": CHECKPOINT_VERSION,
+        "source_path": _source_path(raw_path, encrypted_path),
+        "source_offset": source.offset,
+        "source_rows": source.rows,
+        "source_sha256": source.digest.hexdigest(),
+        "source_ends_with_newline": source.ends_with_newline,
+        "encrypted_size": encrypted_size,
+        "records": records,
+    }
+
+
+def encrypt_incremental(password: str, raw_path: str = config.RAW_DATA_FILE_NAME,
+                        encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                        salt_path: str = config.SALT_FILE_NAME, workers: Optional[int] = None,
+                        log: Log = print) -> IncrementalResult:
+    """
+    체크포인트 이후에 추가된 원본 CSV 행만 암호화하여 기존 암호화 파일 끝에 덧붙입니다.
+
+    암호화 파일이 아직 없으면 새 솔트로 처음부터 암호화하고 체크포인트를 만듭니다.
+    다음 경우에는 기존 파일을 건드리지 않고 ValueError를 발생시킵니다. (전체 암호화 필요)
+        - 암호화 파일은 있는데 체크포인트가 없을 때
+        - 체크포인트가 다른 원본 CSV의 것일 때
+        - 원본 CSV의 이미 암호화된 앞부분(개행 없이 암호화한 마지막 줄 포함)이 바뀌었을 때
+    """
+    _require_file(raw_path, "원본 파일")
+    index_path = index_path_for(encrypted_path)
+    checkpoint = load_checkpoint(encrypted_path)
+
+    if checkpoint is None:
+        if os.path.exists(encrypted_path):
+            raise ValueError(f"오류: '{encrypted_path}'에 증분 암호화 체크포인트가 없어 어디까지 암호화했는지 알 수 없습니다. "
+                             f"증분이 아닌 전체 암호화를 한 번 실행하세요.")
+        _log(log, "[*] 암호화 파일이 없어 새 솔트로 처음부터 암호화합니다.")
+        salt = os.urandom(16)
+        save_salt(salt, salt_path)
+        with metrics.stage("derive_key"):
+            key = derive_key(password, salt)
+        write_key_check(encrypted_path, key)
+        checkpoint = new_checkpoint(raw_path, encrypted_path, SourceLines(None), 0, 0)
+        open(encrypted_path, 'wb').close()
+        write_checkpoint(encrypted_path, checkpoint)  # 여기서 죽어도 다음 실행은 빈 체크포인트에서 이어서 한다
+    else:
+        source_path = checkpoint.get("source_path")
+        # (예전 체크포인트에는 절대 경로가 적혀 있다)
+        expected = os.path.abspath(raw_path) if source_path and os.path.isabs(source_path) \
+            else _source_path(raw_path, encrypted_path)
+        if source_path is not None and source_path != expected:
+            raise ValueError(f"오류: '{encrypted_path}'는 다른 원본 파일('{source_path}')을 암호화한 것입니다. "
+                             f"같은 원본으로 이어서 하거나 전체 암호화를 다시 실행하세요.")
+        key = load_key(password, salt_path)
+        ensure_key_correct(encrypted_path, key)
+        _log(log, f"[*] 체크포인트 발견: 원본 {checkpoint['source_rows']}행 / 레코드 {checkpoint['records']}개까지 암호화되어 있음.")
+    existing_records = checkpoint["records"] or None  # 레코드가 없으면 인덱스도 새로 만든다
+
+    with open(raw_path, 'rb', buffering=config.READ_BUFFER_SIZE) as raw_file:
+        digest = _hash_prefix(raw_file, checkpoint["source_offset"])
+        if digest.hexdigest() != checkpoint["source_sha256"]:
+            raise ValueError(f"오류: '{raw_path}'의 이미 암호화된 앞부분이 바뀌었습니다. 증분이 아닌 전체 암호화를 다시 실행하세요.")
+
+        new_lines = SourceLines(raw_file, digest, offset=checkpoint["source_offset"], rows=checkpoint["source_rows"])
+        if not checkpoint.get("source_ends_with_newline", True):
+            # 지난번에 개행 없는 마지막 줄까지 암호화했으므로, 그 줄 뒤에는 줄을 끝맺는 개행만 올 수 있다.
+            line_end = raw_file.readline()
+            if line_end not in (b'', b'\n', b'\r\n'):
+                raise ValueError(f"오류: '{raw_path}'의 이미 암호화된 마지막 줄이 바뀌었습니다. 증분이 아닌 전체 암호화를 다시 실행하세요.")
+            new_lines.consume(line_end)
+            new_lines.ends_with_newline = bool(line_end)
+        with open(encrypted_path, 'r+b', buffering=config.WRITE_BUFFER_SIZE) as output_file:
+            # 지난번에 커밋되지 못한 꼬리 부분은 잘라버리고 이어서 쓴다.
+            output_file.truncate(checkpoint["encrypted_size"])
+            output_file.seek(checkpoint["encrypted_size"])
+            index_writer = IndexWriter(index_path, start_offset=checkpoint["encrypted_size"],
+                                       existing_records=existing_records)
+            try:
+                new_records = write_token_stream(key, new_lines, output_file, index_writer, workers)
+                output_file.flush()
+                os.fsync(output_file.fileno())
+                encrypted_size = output_file.tell()
+            finally:
+                index_writer.close(fsync=True)
+
+    checkpoint = new_checkpoint(raw_path, encrypted_path, new_lines, encrypted_size, checkpoint["records"] + new_records)
+    write_checkpoint(encrypted_path, checkpoint)
+    if new_records:
+        # 새 레코드가 빠진 블라인드 인덱스는 레코드 수가 맞지 않아 조회할 수 없다.
+        removed = remove_blind_indexes(encrypted_path)
+        if removed:
+            _log(log, f"[!] 새 레코드가 빠진 블라인드 인덱스를 지웠습니다: {', '.join(removed)} (build-index로 다시 만드세요)")
+
+    _log(log, f"[+] 새로 추가된 {new_records}개의 레코드를 암호화하여 덧붙였습니다. (전체 {checkpoint['records']}개)")
+    return IncrementalResult(new_records, checkpoint["records"])
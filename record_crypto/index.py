@@ -0,0 +1,192 @@
+"""
+암호화된 레코드 파일(encrypted_records.bin)용 오프셋 인덱스.
+
+암호화 시점에 '<파일명>.idx' 사이드카를 함께 써 두면,
+N번째 레코드를 찾을 때 앞의 모든 줄을 읽을 필요 없이 바로 seek 할 수 있습니다.
+
+인덱스 파일 형식:
+    INDEX_MAGIC (8바이트)
+    uint64 little-endian 오프셋 x (레코드 수 + 1)
+        - i번째 값 = i번째 레코드의 시작 위치, 마지막 값 = 데이터 파일 끝 위치
+"""
+import mmap
+import os
+import struct
+from array import array
+from typing import Iterable, List, Optional, Tuple, Union
+
+from .engine import decrypt_token, DecryptResult
+
+INDEX_MAGIC = b"RCIDX1\0\0"
+INDEX_SUFFIX = ".idx"
+_OFFSET = struct.Struct('<Q')
+_FLUSH_EVERY_OFFSETS = 65536  # 이 개수만큼 모이면 인덱스 파일에 기록
+
+
+def index_path_for(data_path: str) -> str:
+    """데이터 파일에 대응하는 사이드카 인덱스 파일 경로."""
+    return data_path + INDEX_SUFFIX
+
+
+class IndexWriter:
+    """
+    레코드를 쓰는 순서대로 길이를 받아 오프셋 인덱스를 스트리밍으로 기록합니다.
+
+        with IndexWriter(index_path) as index_writer:
+            index_writer.add(len(token) + 1)  # 개행 포함 길이
+
+    existing_records를 주면 기존 인덱스의 앞쪽 레코드 항목만 남기고 그 뒤에 이어서 씁니다. (추가 암호화용)
+    이때 start_offset은 기존 데이터 파일의 끝 위치여야 합니다.
+    """
+
+    def __init__(self, index_path: str, start_offset: int = 0, existing_records: Optional[int] = None):
+        if existing_records is None:
+            self._file = open(index_path, 'wb')
+            self._file.write(INDEX_MAGIC)
+            self.count = 0
+        else:
+            self._file = open(index_path, 'r+b')
+            if self._file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                self._file.close()
+                raise ValueError(f"오류: '{index_path}'는 올바른 레코드 인덱스 파일이 아닙니다.")
+            self._file.truncate(len(INDEX_MAGIC) + existing_records * _OFFSET.size)  # 예전 '끝 위치' 항목 제거
+            self._file.seek(0, os.SEEK_END)
+            self.count = existing_records
+        self._offset = start_offset
+        self._pending = array('Q')
+
+    def add(self, record_length: int) -> None:
+        self._pending.append(self._offset)
+        self._offset += record_length
+        self.count += 1
+        if len(self._pending) >= _FLUSH_EVERY_OFFSETS:
+            self._flush()
+
+    def skip(self, length: int) -> None:
+        """레코드가 아닌 바이트(빈 줄 등)만큼 오프셋을 건너뜁니다."""
+        self._offset += length
+
+    def _flush(self) -> None:
+        for offset in self._pending:
+            self._file.write(_OFFSET.pack(offset))
+        del self._pending[:]
+
+    def close(self, fsync: bool = False) -> None:
+        if self._file.closed:
+            return
+        self._pending.append(self._offset)  # 마지막 레코드의 끝 위치
+        self._flush()
+        if fsync:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def build_index(data_path: str, index_path: Optional[str] = None) -> int:
+    """
+    이미 만들어진 레코드 파일을 한 번 훑어서 인덱스를 새로 만들고, 레코드 수를 돌려줍니다.
+    (빈 줄은 기존 복호화 스크립트와 똑같이 레코드로 치지 않습니다.)
+    """
+    index_path = index_path or index_path_for(data_path)
+    with open(data_path, 'rb') as data_file, IndexWriter(index_path) as index_writer:
+        for line in data_file:
+            if line.strip(b'\n'):
+                index_writer.add(len(line))
+            else:
+                index_writer.skip(len(line))
+        return index_writer.count
+
+
+class RecordIndex:
+    """
+    사이드카 인덱스와 데이터 파일을 모두 mmap 하여, 레코드 토큰을 O(1)로 꺼내 줍니다.
+    """
+
+    def __init__(self, data_path: str, index_path: Optional[str] = None):
+        index_path = index_path or index_path_for(data_path)
+        with open(index_path, 'rb') as index_file:
+            self._index_mm = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._index_mm[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"오류: '{index_path}'는 올바른 레코드 인덱스 파일이 아닙니다.")
+        self._count = (len(self._index_mm) - len(INDEX_MAGIC)) // _OFFSET.size - 1
+
+        with open(data_path, 'rb') as data_file:
+            # 빈 파일은 mmap 할 수 없으므로 빈 바이트열로 대신한다.
+            self._data_mm = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) \
+                if os.fstat(data_file.fileno()).st_size else b""
+        if self._count >= 0 and self._offset(self._count) != len(self._data_mm):
+            raise ValueError(f"오류: '{index_path}' 인덱스가 '{data_path}' 파일과 맞지 않습니다. build_index()로 다시 만드세요.")
+
+    def __len__(self) -> int:
+        return max(self._count, 0)
+
+    def _offset(self, n: int) -> int:
+        return _OFFSET.unpack_from(self._index_mm, len(INDEX_MAGIC) + n * _OFFSET.size)[0]
+
+    def span(self, n: int) -> Tuple[int, int]:
+        """n번째(0부터) 레코드가 데이터 파일에서 차지하는 [시작, 끝) 바이트 범위."""
+        if not 0 <= n < len(self):
+            raise IndexError(f"레코드 번호 {n}이(가) 범위(0~{len(self) - 1})를 벗어났습니다.")
+        return self._offset(n), self._offset(n + 1)
+
+    def token(self, n: int) -> bytes:
+        """n번째(0부터) 레코드의 암호화 토큰."""
+        start, end = self.span(n)
+        return self._data_mm[start:end].rstrip(b'\n')
+
+    def close(self) -> None:
+        if isinstance(self._data_mm, mmap.mmap):
+            self._data_mm.close()
+        self._index_mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class IndexedRecordStore:
+    """
+    인덱스를 이용해 원하는 레코드 하나만 찾아서 복호화하는 조회용 저장소.
+
+        with IndexedRecordStore("encrypted_records.bin", key) as store:
+            store.get_record(42)
+            store.get_records(range(100, 110))
+    """
+
+    def __init__(self, data_path: str, key: bytes, index_path: Optional[str] = None):
+        from cryptography.fernet import Fernet
+
+        self.index = RecordIndex(data_path, index_path)
+        self._fernet = Fernet(key)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get_record(self, n: int) -> str:
+        """n번째 레코드를 복호화합니다. 손상되었거나 키가 틀리면 InvalidToken이 발생합니다."""
+        return self._fernet.decrypt(self.index.token(n)).decode('utf-8')
+
+    def get_records(self, numbers: Union[range, slice, Iterable[int]]) -> List[DecryptResult]:
+        """
+        여러 레코드를 복호화합니다. 실패한 레코드는 예외 대신 DecryptResult.failure로 보고합니다.
+        """
+        if isinstance(numbers, slice):
+            numbers = range(*numbers.indices(len(self)))
+        return [decrypt_token(self._fernet, n, self.index.token(n)) for n in numbers]
+
+    def close(self) -> None:
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,324 @@
+"""
+평문을 만들지 않는 대량 무결성 검사와 대량 손상 시뮬레이션.
+
+Fernet 토큰 = Base64url(version(1) | timestamp(8) | IV(16) | ciphertext | HMAC-SHA256(32))이고,
+HMAC 키는 Fernet 키의 앞 16바이트(서명키)입니다. 그래서 "이 레코드가 변조되었는가?"는
+AES 복호화 없이 HMAC 한 번만 다시 계산해 보면 알 수 있습니다. (평문이 메모리에도 생기지 않는다!)
+
+    - scan_integrity(): 파일 전체의 HMAC을 병렬로 검사하여 손상된 레코드 번호를 비트맵으로 돌려줍니다.
+    - corrupt_copy(): N개 중 M개 레코드를 한 번에 골라 바이트를 변조한 사본 파일을 만듭니다.
+
+NumPy가 설치되어 있으면 레코드 경계 계산, 손상 위치 선택/변조, 비트맵 생성을 배열 연산으로 처리하고,
+없으면 같은 결과를 순수 파이썬으로 계산합니다. (HMAC 계산 자체는 어느 쪽이든 hmac.digest의 C 구현)
+
+비트맵 파일 형식 ('.bad'):
+    BITMAP_MAGIC(8) | 레코드 수 u64 | 비트맵 (레코드 i = i // 8번째 바이트의 (i % 8)번째 비트, LSB부터)
+"""
+import base64
+import binascii
+import hmac
+import os
+import random
+import shutil
+import struct
+from array import array
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from . import config
+from .engine import DEFAULT_CHUNK_SIZE, chunked, default_workers, ordered_map
+from .index import INDEX_MAGIC, RecordIndex, index_path_for
+from .keycheck import ensure_key_correct
+from .pipeline import Log, _log, _require_file, load_key
+from .reader import MappedRecordFile, _mapped, _shared_mapping
+
+BITMAP_MAGIC = b"RCBAD1\0\0"
+BITMAP_SUFFIX = ".bad"
+_BITMAP_HEADER = struct.Struct('<Q')
+
+FERNET_VERSION = 0x80
+HMAC_SIZE = 32
+_MIN_TOKEN_BYTES = 1 + 8 + 16 + 16 + HMAC_SIZE  # 빈 평문도 암호문 블록 하나(16바이트)는 나온다
+_URLSAFE_TO_STD = bytes.maketrans(b"-_", b"+/")
+_BASE64URL_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+# Base64 마지막 4글자(패딩이 포함될 수 있는 묶음)는 바꿔도 디코딩 결과가 같을 수 있으므로 변조 대상에서 뺀다.
+_TAIL_QUANTUM = 4
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class IntegrityReport(NamedTuple):
+    total: int
+    bad_indices: List[int]  # 손상된 레코드 번호 (0부터, 오름차순)
+    bitmap: bytes
+
+    @property
+    def bad(self) -> int:
+        return len(self.bad_indices)
+
+
+def bitmap_path_for(data_path: str) -> str:
+    return data_path + BITMAP_SUFFIX
+
+
+def make_bitmap(total: int, bad_indices: Sequence[int]) -> bytes:
+    """레코드 수와 손상된 레코드 번호들로 비트맵(LSB 우선)을 만듭니다."""
+    np = _numpy()
+    if np is not None:
+        mask = np.zeros(total, dtype=bool)
+        mask[np.asarray(bad_indices, dtype=np.int64)] = True
+        return np.packbits(mask, bitorder='little').tobytes()
+    bitmap = bytearray((total + 7) // 8)
+    for i in bad_indices:
+        bitmap[i >> 3] |= 1 << (i & 7)
+    return bytes(bitmap)
+
+
+def bitmap_indices(bitmap: bytes, total: int) -> List[int]:
+    """비트맵에서 켜진 비트(손상된 레코드)의 번호 목록."""
+    np = _numpy()
+    if np is not None:
+        bits = np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8), count=total, bitorder='little')
+        return np.flatnonzero(bits).tolist()
+    return [i for i in range(total) if bitmap[i >> 3] >> (i & 7) & 1]
+
+
+def write_bitmap(path: str, report: IntegrityReport) -> None:
+    with open(path, 'wb') as f:
+        f.write(BITMAP_MAGIC)
+        f.write(_BITMAP_HEADER.pack(report.total))
+        f.write(report.bitmap)
+
+
+def read_bitmap(path: str) -> Tuple[int, bytes]:
+    """비트맵 파일을 읽어 (레코드 수, 비트맵)을 돌려줍니다."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(BITMAP_MAGIC)] != BITMAP_MAGIC:
+        raise ValueError(f"오류: '{path}'는 손상 레코드 비트맵 파일이 아닙니다.")
+    (total,) = _BITMAP_HEADER.unpack_from(data, len(BITMAP_MAGIC))
+    return total, data[len(BITMAP_MAGIC) + _BITMAP_HEADER.size:]
+
+
+def record_spans(path: str):
+    """
+    모든 레코드의 (시작 위치 배열, 끝 위치 배열)을 돌려줍니다. 끝 위치는 개행 제외.
+
+    사이드카 인덱스가 파일과 맞으면 시작 위치는 인덱스에서 가져오고, 없으면 개행 위치를 찾아 계산합니다.
+    인덱스의 다음 오프셋 앞에는 개행 하나가 아니라 build_index가 건너뛴 빈 줄들이 더 있을 수 있고
+    마지막 레코드 뒤에는 개행이 없을 수도 있으므로, 끝 위치는 RecordIndex.token과 똑같이 뒤쪽 개행을 모두 걷어내서 구합니다.
+    NumPy가 있으면 numpy 배열, 없으면 array('Q')입니다.
+    """
+    np = _numpy()
+    if os.path.exists(index_path_for(path)):
+        try:
+            with RecordIndex(path):  # 인덱스가 파일과 맞는지 확인
+                pass
+            with open(index_path_for(path), 'rb') as f:
+                f.seek(len(INDEX_MAGIC))
+                offsets = f.read()
+            return _index_spans(path, offsets, np)
+        except ValueError:
+            pass
+
+    if np is None:
+        starts, ends = array('Q'), array('Q')
+        with MappedRecordFile(path) as records:
+            for start, end in records.spans():
+                starts.append(start)
+                ends.append(end)
+        return starts, ends
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # 파일 전체를 올리지 않고 mmap을 버퍼 크기씩 훑으며 개행 위치만 모은다
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    newlines = [np.flatnonzero(data[pos:pos + config.READ_BUFFER_SIZE] == ord('\n')) + pos
+                for pos in range(0, size, config.READ_BUFFER_SIZE)]
+    newlines = np.concatenate(newlines).astype(np.int64)
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [size]))
+    nonempty = ends > starts  # 빈 줄(마지막 개행 뒤 포함)은 레코드가 아니다
+    return starts[nonempty], ends[nonempty]
+
+
+def _index_spans(path: str, offsets: bytes, np):
+    """인덱스 오프셋으로 레코드 범위를 구합니다. 끝 위치는 다음 오프셋에서 뒤쪽 개행을 걷어낸 위치."""
+    if np is not None:
+        offsets = np.frombuffer(offsets, dtype='<u8').astype(np.int64)
+        starts, ends = offsets[:-1], offsets[1:].copy()
+        if len(starts) == 0:
+            return starts, ends
+        data = np.memmap(path, dtype=np.uint8, mode='r')  # 레코드 끝 근처의 페이지만 읽힌다
+        while True:
+            trailing = (ends > starts) & (data[np.maximum(ends - 1, 0)] == ord('\n'))
+            if not trailing.any():
+                return starts, ends
+            ends[trailing] -= 1
+
+    offsets = array('Q', offsets)
+    starts, ends = offsets[:-1], array('Q')
+    with MappedRecordFile(path) as records, records.view(0, None) as data:
+        for start, end in zip(starts, offsets[1:]):
+            while end > start and data[end - 1] == 0x0A:
+                end -= 1
+            ends.append(end)
+    return starts, ends
+
+
+def token_is_authentic(signing_key: bytes, token) -> bool:
+    """Fernet 토큰의 형식과 HMAC만 검사합니다. (복호화하지 않음)"""
+    try:
+        # Fernet과 똑같이 느슨한 디코딩을 해야 판정 결과도 복호화 결과와 같다
+        data = binascii.a2b_base64(bytes(token).translate(_URLSAFE_TO_STD))
+    except (binascii.Error, ValueError):
+        return False
+    if len(data) < _MIN_TOKEN_BYTES or data[0] != FERNET_VERSION:
+        return False
+    expected = hmac.digest(signing_key, memoryview(data)[:-HMAC_SIZE], 'sha256')
+    return hmac.compare_digest(expected, data[-HMAC_SIZE:])
+
+
+def _scan_span_chunk(path: str, start: int, spans: List[Tuple[int, int]], signing_key: bytes) -> List[int]:
+    records = _mapped(path)
+    return [index for index, (span_start, span_end) in enumerate(spans, start)
+            if not token_is_authentic(signing_key, records.view(span_start, span_end))]
+
+
+def scan_integrity(path: str, key: bytes, workers: Optional[int] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE, use_threads: bool = False) -> IntegrityReport:
+    """
+    파일의 모든 토큰 HMAC을 병렬로 검사하고, 손상된 레코드를 IntegrityReport로 돌려줍니다.
+
+    key는 Fernet 키(URL-safe Base64)이며, 그중 서명키(앞 16바이트)만 사용합니다.
+    키 자체가 틀렸는지는 이 함수가 확인하지 않습니다. (모든 레코드가 손상으로 보고됨)
+    """
+    workers = workers or default_workers()
+    signing_key = base64.urlsafe_b64decode(key)[:16]
+    path = os.path.abspath(path)
+    starts, ends = record_spans(path)
+    total = len(starts)
+    bad: List[int] = []
+    chunk_args = ((path, start, spans, signing_key)
+                  for start, spans in chunked(zip(starts.tolist(), ends.tolist()), chunk_size))
+    with _shared_mapping(path):
+        for chunk_bad in ordered_map(_scan_span_chunk, None, chunk_args, workers, use_threads):
+            bad.extend(chunk_bad)
+    return IntegrityReport(total, bad, make_bitmap(total, bad))
+
+
+def corrupt_copy(path: str, output_path: str, num_to_corrupt: int = config.NUM_TO_CORRUPT,
+                 seed: Optional[int] = None) -> List[int]:
+    """
+    레코드 num_to_corrupt개를 무작위로 골라 각각 Base64 문자 하나를 다른 문자로 바꾼 사본을 만들고,
+    손상시킨 레코드 번호(오름차순)를 돌려줍니다. 원본 파일은 건드리지 않습니다.
+    (파일 전체를 메모리에 올리지 않는다. NumPy가 있으면 사본의 해당 바이트만 mmap으로, 없으면 버퍼 단위로 복사하면서 바꾼다)
+
+    다른 Base64 문자로만 바꾸고 마지막 4글자는 건드리지 않으므로, 손상시킨 레코드는 반드시 검증에 실패하고
+    줄 구조(레코드 수, 오프셋)는 그대로 유지됩니다. 사이드카 인덱스가 있으면 함께 복사합니다.
+    """
+    starts, ends = record_spans(path)
+    total = len(starts)
+    if total == 0:
+        raise ValueError(f"오류: '{path}' 파일에 암호화된 레코드가 없습니다. 암호화를 먼저 확인하세요.")
+    num_to_corrupt = min(num_to_corrupt, total)
+    np = _numpy()
+
+    if np is None:
+        rng = random.Random(seed)
+        chosen = sorted(rng.sample(range(total), num_to_corrupt))
+        edits = []  # (위치, 문자 번호 이동량), 위치 오름차순
+        for i in chosen:
+            length = max(ends[i] - starts[i] - _TAIL_QUANTUM, 1)
+            edits.append((starts[i] + rng.randrange(length), rng.randrange(1, 64)))
+        _copy_with_edits(path, output_path, edits)
+    else:
+        rng = np.random.default_rng(seed)
+        chosen = np.sort(rng.choice(total, size=num_to_corrupt, replace=False))
+        lengths = np.maximum(ends[chosen] - starts[chosen] - _TAIL_QUANTUM, 1)
+        positions = starts[chosen] + (rng.random(num_to_corrupt) * lengths).astype(np.int64)
+        # 바이트 -> Base64url 문자 번호 (알파벳 밖의 바이트는 0번으로 취급)
+        symbol_of = np.zeros(256, dtype=np.int64)
+        alphabet = np.frombuffer(_BASE64URL_ALPHABET, dtype=np.uint8)
+        symbol_of[alphabet] = np.arange(64)
+        # 사본을 만든 뒤 고를 위치의 바이트만 mmap으로 고친다 (파일 전체를 메모리에 올리지 않음)
+        shutil.copyfile(path, output_path)
+        data = np.memmap(output_path, dtype=np.uint8, mode='r+')
+        shifted = (symbol_of[data[positions]] + rng.integers(1, 64, size=num_to_corrupt)) % 64
+        data[positions] = alphabet[shifted]
+        data.flush()
+        del data
+        chosen = chosen.tolist()
+
+    if os.path.exists(index_path_for(path)):
+        shutil.copyfile(index_path_for(path), index_path_for(output_path))
+    return chosen
+
+
+def _copy_with_edits(path: str, output_path: str, edits: List[Tuple[int, int]]) -> None:
+    """파일을 버퍼 크기씩 복사하면서, edits의 각 위치에 있는 Base64 문자를 이동량만큼 다른 문자로 바꿉니다."""
+    pending = iter(edits)
+    edit = next(pending, None)
+    offset = 0
+    with open(path, 'rb') as src, open(output_path, 'wb') as dst:
+        while True:
+            chunk = src.read(config.READ_BUFFER_SIZE)
+            if not chunk:
+                break
+            if edit is not None and edit[0] < offset + len(chunk):
+                chunk = bytearray(chunk)
+                while edit is not None and edit[0] < offset + len(chunk):
+                    pos, shift = edit
+                    symbol = _BASE64URL_ALPHABET.find(chunk[pos - offset])
+                    chunk[pos - offset] = _BASE64URL_ALPHABET[(max(symbol, 0) + shift) % 64]
+                    edit = next(pending, None)
+            dst.write(chunk)
+            offset += len(chunk)
+
+
+def integrity_scan(password: str, encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                   salt_path: str = config.SALT_FILE_NAME, bitmap_path: Optional[str] = None,
+                   simulate_corrupt: int = 0, seed: Optional[int] = None, workers: Optional[int] = None,
+                   log: Log = print) -> IntegrityReport:
+    """
+    파일 전체의 무결성을 복호화 없이 검사하고 손상 레코드 비트맵을 저장합니다.
+
+    simulate_corrupt > 0이면 그만큼의 레코드를 손상시킨 임시 사본을 검사하고,
+    찾아낸 손상 레코드가 실제로 손상시킨 레코드와 정확히 같은지 확인합니다.
+    """
+    key = load_key(password, salt_path)
+    _require_file(encrypted_path, "암호화된 레코드 파일")
+    ensure_key_correct(encrypted_path, key)
+    bitmap_path = bitmap_path or bitmap_path_for(encrypted_path)
+
+    scan_path, expected = encrypted_path, None
+    if simulate_corrupt:
+        scan_path = encrypted_path + ".corrupted"
+        expected = corrupt_copy(encrypted_path, scan_path, simulate_corrupt, seed)
+        _log(log, f"[!!!] 🚨🚨🚨 경고: 랜덤으로 선택된 레코드 {len(expected)}개를 손상시킨 사본 '{scan_path}'을 검사합니다! 🚨🚨🚨")
+    try:
+        report = scan_integrity(scan_path, key, workers=workers)
+    finally:
+        if simulate_corrupt:
+            for leftover in (scan_path, index_path_for(scan_path)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+    write_bitmap(bitmap_path, report)
+    _log(log, f"[*] 총 {report.total}개 레코드의 HMAC 검사 완료 (복호화 없음).")
+    if report.bad:
+        preview = ", ".join(str(i + 1) for i in report.bad_indices[:10])
+        more = " ..." if report.bad > 10 else ""
+        _log(log, f"[!] 손상된 레코드 {report.bad}개: {preview}{more}")
+    else:
+        _log(log, "[+] 손상된 레코드가 없습니다.")
+    _log(log, f"[+] 손상 레코드 비트맵이 '{bitmap_path}' 파일로 저장되었습니다. ({len(report.bitmap):,}바이트)")
+    if expected is not None and report.bad_indices != expected:
+        _log(log, "[!] 오류: 검사 결과가 손상시킨 레코드와 다릅니다. 코드를 다시 확인하세요.")
+    return report
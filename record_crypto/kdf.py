@@ -0,0 +1,226 @@
+"""
+공용 키 파생 모듈 (PBKDF2HMAC-SHA256).
+
+480,000회 반복 PBKDF2는 한 번에 약 0.5초의 순수 CPU 시간이 들기 때문에,
+같은 (솔트, 비밀번호, 반복 횟수) 조합은 프로세스 안에서 한 번만 계산하고 기억해 둡니다.
+선택적으로 디스크 캐시를 켜면 프로세스를 새로 띄워도 KDF를 다시 돌리지 않습니다.
+
+디스크 캐시 파일에는 '파생된 키 자체'가 저장되므로, 디렉터리는 0o700, 파일은 0o600 권한으로만 만들고
+다른 사용자가 읽을 수 있는 권한의 캐시 파일은 신뢰하지 않습니다. 이미 있는 디렉터리도 소유자가 다르거나
+그룹/기타 사용자 권한이 열려 있으면 디스크 캐시를 쓰지 않습니다.
+
+캐시 파일 이름은 캐시 디렉터리 안의 무작위 비밀값(CACHE_SECRET_FILE_NAME, 0o600)으로 계산한 HMAC입니다.
+(비밀번호 해시로 바로 이름을 지으면, 디렉터리 목록만 볼 수 있어도 PBKDF2 없이 비밀번호를 맞춰 볼 수 있다!)
+"""
+import base64
+import hashlib
+import hmac
+import os
+import stat
+import time
+import warnings
+from typing import Dict, Optional, Tuple
+
+DEFAULT_ITERATIONS = 480000
+KEY_LENGTH = 32  # Fernet 키 = 서명키 16바이트 + 암호화키 16바이트
+
+# 이 환경변수에 디렉터리를 지정하면 디스크 캐시가 기본으로 켜집니다.
+KEY_CACHE_DIR_ENV = "RECORD_CRYPTO_KEY_CACHE_DIR"
+KEY_CACHE_TTL_ENV = "RECORD_CRYPTO_KEY_CACHE_TTL"  # 초 단위, 지정하지 않으면 만료 없음
+_CACHE_FILE_SUFFIX = ".key"
+CACHE_SECRET_FILE_NAME = "cache.secret"  # 캐시 파일 이름을 정하는 HMAC 키
+
+# (솔트, 비밀번호 SHA-256, 반복 횟수) -> 파생된 원시 키(32바이트)
+_memo: Dict[Tuple[bytes, bytes, int], bytes] = {}
+
+
+def _memo_key(password: str, salt: bytes, iterations: int) -> Tuple[bytes, bytes, int]:
+    # 비밀번호 원문은 메모리 캐시의 키로도 들고 있지 않는다!
+    return bytes(salt), hashlib.sha256(password.encode('utf-8')).digest(), iterations
+
+
+def _cache_file_name(secret: bytes, memo_key: Tuple[bytes, bytes, int]) -> str:
+    salt, password_hash, iterations = memo_key
+    digest = hmac.new(secret, b"record_crypto-kdf\0" + salt + password_hash + iterations.to_bytes(4, 'big'),
+                      hashlib.sha256)
+    return digest.hexdigest() + _CACHE_FILE_SUFFIX
+
+
+def _default_cache_dir() -> Optional[str]:
+    return os.environ.get(KEY_CACHE_DIR_ENV) or None
+
+
+def _default_ttl() -> Optional[float]:
+    ttl = os.environ.get(KEY_CACHE_TTL_ENV)
+    return float(ttl) if ttl else None
+
+
+def _is_private(path: str) -> bool:
+    """그룹/기타 사용자가 접근할 수 없는 파일인지 확인 (POSIX 전용, 그 외에는 항상 True)."""
+    if os.name != 'posix':
+        return True
+    st = os.stat(path)
+    return (st.st_mode & 0o077) == 0 and st.st_uid == os.getuid()
+
+
+def _prepare_cache_dir(cache_dir: str) -> bool:
+    """
+    캐시 디렉터리를 (없으면 0o700으로) 만들고, 내 소유이며 다른 사용자에게 닫혀 있는 진짜 디렉터리인지 확인합니다.
+    조건에 맞지 않으면 경고하고 False를 돌려줍니다. (그 디렉터리는 디스크 캐시로 쓰지 않는다)
+    """
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if os.name != 'posix':
+            return True
+        st = os.lstat(cache_dir)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        warnings.warn(f"키 캐시 디렉터리 '{cache_dir}'의 소유자나 권한(0o{st.st_mode & 0o777:o})이 안전하지 않아 "
+                      f"디스크 캐시를 쓰지 않습니다. (내 소유, 0o700이어야 함)")
+        return False
+    return True
+
+
+def _cache_secret(cache_dir: str) -> Optional[bytes]:
+    """캐시 디렉터리의 파일 이름용 비밀값. 없으면 새로 만들고, 안전하지 않거나 읽을 수 없으면 None."""
+    path = os.path.join(cache_dir, CACHE_SECRET_FILE_NAME)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    except OSError:
+        return None
+    else:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(KEY_LENGTH))
+    try:
+        if not _is_private(path):
+            return None
+        with open(path, 'rb') as f:
+            secret = f.read()
+    except OSError:
+        return None
+    return secret if len(secret) == KEY_LENGTH else None  # 다른 프로세스가 아직 쓰는 중이면 이번엔 건너뛴다
+
+
+def _read_disk_cache(cache_dir: str, file_name: str, ttl: Optional[float]) -> Optional[bytes]:
+    path = os.path.join(cache_dir, file_name)
+    try:
+        if ttl is not None and time.time() - os.path.getmtime(path) > ttl:
+            os.remove(path)
+            return None
+        if not _is_private(path):
+            return None
+        with open(path, 'rb') as f:
+            key = f.read()
+    except OSError:
+        return None
+    return key if len(key) == KEY_LENGTH else None
+
+
+def _write_disk_cache(cache_dir: str, file_name: str, key: bytes) -> None:
+    path = os.path.join(cache_dir, file_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        os.replace(tmp_path, path)  # 다른 프로세스가 반쯤 쓰인 파일을 읽지 않도록 원자적으로 교체
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    from cryptography.hazmat.primitives import hashes
+
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=KEY_LENGTH,
+        salt=salt,
+        iterations=iterations,
+    )
+    return kdf.derive(password.encode('utf-8'))
+
+
+def derive_raw_key(password: str, salt: bytes, iterations: int = DEFAULT_ITERATIONS,
+                   cache_dir: Optional[str] = None, ttl: Optional[float] = None, use_disk_cache: bool = True) -> bytes:
+    """
+    비밀번호와 솔트로 32바이트 원시 키를 파생합니다.
+
+    cache_dir를 주지 않으면 RECORD_CRYPTO_KEY_CACHE_DIR 환경변수를 사용하고,
+    둘 다 없거나 use_disk_cache=False이면 프로세스 내부 메모리 캐시만 사용합니다.
+    """
+    memo_key = _memo_key(password, salt, iterations)
+    key = _memo.get(memo_key)
+    if key is not None:
+        return key
+
+    cache_dir = (cache_dir or _default_cache_dir()) if use_disk_cache else None
+    ttl = ttl if ttl is not None else _default_ttl()
+    secret = _cache_secret(cache_dir) if cache_dir and _prepare_cache_dir(cache_dir) else None
+    if secret is not None:
+        file_name = _cache_file_name(secret, memo_key)
+        key = _read_disk_cache(cache_dir, file_name, ttl)
+        if key is None:
+            key = _pbkdf2(password, salt, iterations)
+            _write_disk_cache(cache_dir, file_name, key)
+    else:
+        key = _pbkdf2(password, salt, iterations)
+
+    _memo[memo_key] = key
+    return key
+
+
+def derive_key(password: str, salt: bytes, iterations: int = DEFAULT_ITERATIONS,
+               cache_dir: Optional[str] = None, ttl: Optional[float] = None, use_disk_cache: bool = True) -> bytes:
+    """
+    주어진 비밀번호와 솔트를 사용하여 Fernet 암호화 키(URL-safe Base64)를 파생합니다.
+    """
+    return base64.urlsafe_b64encode(derive_raw_key(password, salt, iterations, cache_dir, ttl, use_disk_cache))
+
+
+def derive_subkey(raw_key: bytes, purpose: bytes, length: int = KEY_LENGTH) -> bytes:
+    """
+    원시 키에서 용도(purpose)별 하위 키를 HKDF-SHA256으로 파생합니다.
+
+    PBKDF2는 한 번만 돌리고, 컬럼별 암호화 키처럼 여러 개의 독립된 키가 필요할 때 사용합니다.
+    (HKDF는 해시 몇 번이면 끝나므로 하위 키는 캐시하지 않는다.)
+    """
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    from cryptography.hazmat.primitives import hashes
+
+    return HKDF(algorithm=hashes.SHA256(), length=length, salt=None, info=purpose).derive(raw_key)
+
+
+def evict_expired(cache_dir: Optional[str] = None, ttl: Optional[float] = None) -> int:
+    """
+    디스크 캐시에서 TTL이 지난 키 파일을 삭제하고, 삭제한 개수를 돌려줍니다.
+
+    ttl이 0이면 캐시를 모두 비웁니다.
+    """
+    cache_dir = cache_dir or _default_cache_dir()
+    ttl = ttl if ttl is not None else _default_ttl()
+    if not cache_dir or ttl is None or not os.path.isdir(cache_dir):
+        return 0
+
+    now = time.time()
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith(_CACHE_FILE_SUFFIX):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            if now - os.path.getmtime(path) >= ttl:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def clear_memo() -> None:
+    """프로세스 내부 메모리 캐시를 비웁니다."""
+    _memo.clear()
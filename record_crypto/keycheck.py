@@ -0,0 +1,98 @@
+"""
+틀린 비밀번호를 대량 복호화 전에 '한 번에' 걸러내는 키 검증.
+
+틀린 키로 복호화하면 레코드마다 HMAC 검증을 끝까지 한 뒤에야 InvalidToken이 나오므로,
+파일 전체를 다 돌아야 "키가 틀렸다"는 사실 하나를 알게 됩니다.
+그래서 암호화 시점에 키 검증 태그 HMAC-SHA256(키, KEY_CHECK_LABEL)을 함께 저장해 두고,
+복호화 전에 이 태그만 상수 시간 비교(hmac.compare_digest)로 확인합니다.
+
+    - 줄 단위 Fernet 파일: '<파일>.kcv' 사이드카 (32바이트)
+    - 컴팩트 컨테이너: 헤더 안 (container.py, 버전 2)
+
+태그가 없는 예전 파일은 앞쪽 레코드 몇 개만 시험 복호화(probe)해서 판단합니다.
+"""
+import base64
+import hashlib
+import hmac
+import os
+from itertools import islice
+from typing import Optional
+
+KEY_CHECK_LABEL = b"record_crypto key check v1"
+KEY_CHECK_SUFFIX = ".kcv"
+KEY_CHECK_SIZE = 32
+DEFAULT_PROBE_RECORDS = 8  # 태그가 없을 때 시험 복호화할 레코드 수
+
+
+class WrongKeyError(ValueError):
+    """비밀번호(키)가 암호화 시점의 것과 다를 때 발생합니다."""
+
+
+def key_check_path_for(data_path: str) -> str:
+    return data_path + KEY_CHECK_SUFFIX
+
+
+def compute_tag(raw_key: bytes) -> bytes:
+    """원시 키(32바이트)의 키 검증 태그."""
+    return hmac.new(raw_key, KEY_CHECK_LABEL, hashlib.sha256).digest()
+
+
+def fernet_key_tag(fernet_key: bytes) -> bytes:
+    """Fernet 키(URL-safe Base64)의 키 검증 태그."""
+    return compute_tag(base64.urlsafe_b64decode(fernet_key))
+
+
+def tags_match(expected: bytes, actual: bytes) -> bool:
+    return hmac.compare_digest(expected, actual)
+
+
+def write_key_check(data_path: str, fernet_key: bytes) -> str:
+    """Fernet 레코드 파일 옆에 키 검증 태그 사이드카를 쓰고, 그 경로를 돌려줍니다."""
+    path = key_check_path_for(data_path)
+    with open(path, 'wb') as f:
+        f.write(fernet_key_tag(fernet_key))
+    return path
+
+
+def read_key_check(data_path: str) -> Optional[bytes]:
+    path = key_check_path_for(data_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        tag = f.read()
+    return tag if len(tag) == KEY_CHECK_SIZE else None
+
+
+def probe_records(data_path: str, fernet_key: bytes, probe_records: int = DEFAULT_PROBE_RECORDS) -> bool:
+    """
+    앞쪽 레코드 최대 probe_records개를 시험 복호화합니다.
+    하나라도 성공하거나, 실패 원인이 InvalidToken이 아니면 키가 맞는 것으로 봅니다.
+    """
+    from cryptography.fernet import Fernet
+
+    from .engine import FAILURE_INVALID_TOKEN, decrypt_token
+    from .reader import MappedRecordFile
+
+    fernet = Fernet(fernet_key)
+    with MappedRecordFile(data_path) as records:
+        tokens = [bytes(view) for view in islice(iter(records), probe_records)]
+    if not tokens:
+        return True
+    results = [decrypt_token(fernet, i, token) for i, token in enumerate(tokens)]
+    return any(result.failure != FAILURE_INVALID_TOKEN for result in results)
+
+
+def is_key_correct(data_path: str, fernet_key: bytes, probe: int = DEFAULT_PROBE_RECORDS) -> bool:
+    """
+    키 검증 태그(있으면)나 시험 복호화로 키가 맞는지 빠르게 판단합니다.
+    """
+    tag = read_key_check(data_path)
+    if tag is not None:
+        return tags_match(tag, fernet_key_tag(fernet_key))
+    return probe_records(data_path, fernet_key, probe)
+
+
+def ensure_key_correct(data_path: str, fernet_key: bytes, probe: int = DEFAULT_PROBE_RECORDS) -> None:
+    """키가 틀리면 WrongKeyError를 발생시킵니다."""
+    if not is_key_correct(data_path, fernet_key, probe):
+        raise WrongKeyError(f"오류: '{data_path}'를 암호화할 때 사용한 비밀번호와 다릅니다. (키 검증 실패)")
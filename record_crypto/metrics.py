@@ -0,0 +1,283 @@
+"""
+단계별 타이머, 카운터, 지연 시간 히스토그램과 선택적 프로파일링 훅.
+
+기본값은 '꺼짐'이라서, 켜지 않으면 계측 지점마다 None 확인 한 번만 하고 지나갑니다.
+
+    from record_crypto import metrics
+    registry = metrics.enable()
+    decrypt_to_csv(...)
+    print(registry.to_prometheus())
+
+단계 이름:
+    salt_load, derive_key     : 솔트 파일 읽기 / PBKDF2 키 파생
+    file_read                 : 메인 프로세스에서 원본/암호화 파일을 읽고 레코드를 나누는 시간
+    encrypt, decrypt          : 워커 결과를 기다린 시간 (위 file_read 시간을 포함하는 벽시계 시간)
+    csv_write, parquet_write,
+    token_write               : 결과 파일에 쓰는 시간
+    blind_index_write         : 블라인드 인덱스 정렬 + 쓰기 (encrypt --blind-index)
+
+레코드별 지연 시간은 워커가 청크 하나를 처리한 시간을 청크 크기로 나눈 값으로 기록합니다.
+(레코드마다 시계를 읽으면 그 자체가 병목이 되므로 청크 평균을 쓴다)
+"""
+import json
+import sys
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+METRICS_SCHEMA_VERSION = 1
+PROMETHEUS_PREFIX = "record_crypto"
+
+# 레코드 하나 처리 시간 히스토그램 구간 (초, 상한 기준)
+LATENCY_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.1, float("inf"))
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """고정 구간 히스토그램 (Prometheus 히스토그램과 같은 의미)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float, count: int = 1) -> None:
+        self.counts[bisect_left(self.buckets, value)] += count
+        self.sum += value * count
+        self.count += count
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """구간 상한으로 근사한 분위수. (관측값이 없으면 None)"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for upper, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return upper
+        return self.buckets[-1]
+
+
+class Metrics:
+    """한 번의 실행에서 모은 계측 값들."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages: Dict[str, List[float]] = {}  # 단계 -> [누적 초, 호출 횟수]
+        self.counters: Dict[Tuple[str, Labels], int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.extra: Dict[str, object] = {}  # 프로파일링 결과 등
+
+    def add_time(self, stage: str, seconds: float, calls: int = 1) -> None:
+        entry = self.stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def count(self, name: str, value: int = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, count: int = 1) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value, count)
+
+    def to_dict(self) -> Dict:
+        histograms = {}
+        for name, histogram in self.histograms.items():
+            histograms[name] = {
+                "buckets": [["+Inf" if upper == float("inf") else upper, count]
+                            for upper, count in zip(histogram.buckets, histogram.counts)],
+                "sum": histogram.sum,
+                "count": histogram.count,
+                "p50": histogram.quantile(0.5),
+                "p99": histogram.quantile(0.99),
+            }
+        return {
+            "schema_version": METRICS_SCHEMA_VERSION,
+            "started": self.started,
+            "stages": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.stages.items()},
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in self.counters.items()],
+            "histograms": histograms,
+            **self.extra,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus 텍스트 노출 형식(0.0.4)으로 변환합니다. node_exporter textfile 수집기에 그대로 쓸 수 있습니다."""
+        lines = []
+        if self.stages:
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds_total counter")
+            for name, (seconds, _) in self.stages.items():
+                lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds_total{{stage="{name}"}} {seconds:.9f}')
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_stage_calls_total counter")
+            for name, (_, calls) in self.stages.items():
+                lines.append(f'{PROMETHEUS_PREFIX}_stage_calls_total{{stage="{name}"}} {calls}')
+        counter_names = sorted({name for name, _ in self.counters})
+        for counter_name in counter_names:
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{counter_name}_total counter")
+            for (name, labels), value in self.counters.items():
+                if name == counter_name:
+                    lines.append(f"{PROMETHEUS_PREFIX}_{name}_total{_format_labels(labels)} {value}")
+        for name, histogram in self.histograms.items():
+            metric = f"{PROMETHEUS_PREFIX}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for upper, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                le = "+Inf" if upper == float("inf") else repr(upper)
+                lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+            lines.append(f"{metric}_sum {histogram.sum:.9f}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+# 현재 켜져 있는 레지스트리 (꺼져 있으면 None)
+_registry: Optional[Metrics] = None
+
+
+def enable() -> Metrics:
+    """계측을 켜고 새 레지스트리를 돌려줍니다."""
+    global _registry
+    _registry = Metrics()
+    return _registry
+
+
+def disable() -> Optional[Metrics]:
+    """계측을 끄고, 그동안 모은 레지스트리를 돌려줍니다."""
+    global _registry
+    registry, _registry = _registry, None
+    return registry
+
+
+def current() -> Optional[Metrics]:
+    return _registry
+
+
+@contextmanager
+def suspended() -> Iterator[None]:
+    """잠시 계측을 끕니다. (바깥에서 같은 구간을 이미 재고 있어서 안쪽 계측이 이중으로 집계될 때)"""
+    global _registry
+    registry, _registry = _registry, None
+    try:
+        yield
+    finally:
+        _registry = registry
+
+
+def stage(name: str):
+    """계측이 켜져 있으면 단계 타이머, 꺼져 있으면 아무 일도 하지 않는 컨텍스트 매니저."""
+    return _registry.stage(name) if _registry is not None else nullcontext()
+
+
+def count(name: str, value: int = 1, **labels: str) -> None:
+    if _registry is not None:
+        _registry.count(name, value, **labels)
+
+
+def timed_iter(name: str, iterable: Iterable) -> Iterator:
+    """iterable에서 항목을 꺼내는 데 걸린 시간을 name 단계에 누적합니다. (꺼져 있으면 그대로 통과)"""
+    registry = _registry
+    if registry is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            registry.add_time(name, time.perf_counter() - start, 0)
+            return
+        registry.add_time(name, time.perf_counter() - start)
+        yield item
+
+
+def timed_chunk(func, *args, fernet=None):
+    """워커에서 청크 함수를 실행하고 (결과, 걸린 초)를 돌려줍니다. ordered_map에 그대로 넘길 수 있습니다."""
+    start = time.perf_counter()
+    result = func(*args, fernet=fernet)
+    return result, time.perf_counter() - start
+
+
+def observe_chunks(chunks: Iterable, stage_name: str, histogram: str = "record_latency") -> Iterator[list]:
+    """
+    timed_chunk로 감싼 결과 스트림을 풀어서 원래의 청크 결과를 돌려주고,
+    결과를 기다린 시간(stage_name)과 청크 평균 레코드 지연 시간(histogram)을 기록합니다.
+    """
+    registry = _registry
+    for results, seconds in timed_iter(stage_name, chunks):
+        if results:
+            registry.observe(histogram, seconds / len(results), len(results))
+        yield results
+
+
+@contextmanager
+def profiling(profile_path: Optional[str] = None, trace_memory: bool = False, top: int = 10) -> Iterator[None]:
+    """
+    선택적 cProfile / tracemalloc 훅.
+
+    profile_path를 주면 cProfile 통계를 그 파일에 저장하고(`python -m pstats`로 확인),
+    trace_memory=True면 최대 메모리 사용량과 할당이 가장 많은 코드 위치 top개를 레지스트리와 stderr에 남깁니다.
+    (tracemalloc은 할당마다 비용이 들기 때문에 필요할 때만 켠다)
+    """
+    profiler = None
+    if profile_path:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    if trace_memory:
+        import tracemalloc
+
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            print(f"[*] cProfile 결과가 '{profile_path}' 파일로 저장되었습니다.", file=sys.stderr)
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            top_stats = [str(stat) for stat in snapshot.statistics('lineno')[:top]]
+            if _registry is not None:
+                _registry.extra["memory"] = {"peak_traced_bytes": peak, "top_allocations": top_stats}
+            print(f"[*] tracemalloc 최대 추적 메모리: {peak:,}바이트", file=sys.stderr)
+            for line in top_stats:
+                print(f"    {line}", file=sys.stderr)
+
+
+def write_metrics(registry: Metrics, json_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> None:
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write(registry.to_json())
+    if prometheus_path:
+        with open(prometheus_path, 'w', encoding='utf-8') as f:
+            f.write(registry.to_prometheus())
@@ -0,0 +1,167 @@
+"""
+복호화 결과 출력 단계: 대용량 버퍼 CSV 쓰기 + 실패 레코드 사이드카 (+ 선택적 Parquet).
+
+예전에는 레코드마다 `write(line + '\\n')`을 호출했고, 실패한 레코드 자리에는
+'[복호화 실패 - 손상 레코드: N]' 같은 표시 줄을 데이터 사이에 섞어 써서 CSV 파서가 깨졌습니다.
+이제 결과 파일에는 복호화에 성공한 행만 들어가고, 실패한 레코드 번호는 별도의 작은 사이드카 CSV에 기록합니다.
+
+    결과        : 성공한 레코드의 평문 줄만 (원본 CSV와 같은 형식)
+    사이드카    : '<결과 파일>.failures.csv' - record,failure,reason (record는 1부터 시작하는 원본 줄 번호)
+
+성공한 행은 WRITE_BATCH_RECORDS개씩 모아 '\\n'.join 한 번과 write 한 번으로 기록합니다.
+Parquet 출력(pyarrow 필요)은 0번 레코드(헤더 줄)를 컬럼 이름으로 써서 모든 컬럼을 문자열로 저장하고,
+원본 줄 번호를 'record' 컬럼으로 함께 남깁니다.
+"""
+import csv
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+from . import config, metrics
+from .engine import DecryptResult, FAILURE_INVALID_TOKEN
+
+FAILURE_SIDECAR_SUFFIX = ".failures.csv"
+WRITE_BATCH_RECORDS = 4096  # 한 번에 이어 붙여 쓰는 행 수
+OUTPUT_FORMATS = ("csv", "parquet")
+
+FailureCallback = Optional[Callable[[DecryptResult], None]]
+
+
+class OutputCounts(NamedTuple):
+    total: int
+    invalid: int  # InvalidToken
+    errors: int  # 그 외 예외
+
+    @property
+    def failed(self) -> int:
+        return self.invalid + self.errors
+
+
+def failure_path_for(output_path: str) -> str:
+    return output_path + FAILURE_SIDECAR_SUFFIX
+
+
+class FailureSidecar:
+    """실패한 레코드를 'record,failure,reason' CSV로 기록합니다. 실패가 없으면 헤더만 남습니다."""
+
+    def __init__(self, path: str, reason: str):
+        self._file = open(path, 'w', encoding='utf-8', newline='', buffering=config.WRITE_BUFFER_SIZE)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(("record", "failure", "reason"))
+        self._reason = reason
+
+    def add(self, result: DecryptResult) -> None:
+        reason = self._reason if result.failure == FAILURE_INVALID_TOKEN else result.message
+        self._writer.writerow((result.index + 1, result.failure, reason))
+
+    def add_range(self, total: int, failure: str) -> None:
+        """레코드 1~total 전체를 같은 사유로 실패 처리합니다. (키 검증에서 통째로 거부된 경우)"""
+        self._writer.writerows((number, failure, self._reason) for number in range(1, total + 1))
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _successful_batches(results: Iterable[DecryptResult], sidecar: FailureSidecar, counts: List[int],
+                        on_failure: FailureCallback) -> Iterator[List[DecryptResult]]:
+    """성공한 결과를 WRITE_BATCH_RECORDS개씩 묶어 돌려주고, 실패는 사이드카로 보냅니다. counts = [전체, 무효, 오류]"""
+    batch: List[DecryptResult] = []
+    for result in results:
+        counts[0] += 1
+        if result.ok:
+            batch.append(result)
+            if len(batch) >= WRITE_BATCH_RECORDS:
+                yield batch
+                batch = []
+            continue
+        counts[1 if result.failure == FAILURE_INVALID_TOKEN else 2] += 1
+        sidecar.add(result)
+        if on_failure is not None:
+            on_failure(result)
+    if batch:
+        yield batch
+
+
+def _write_csv(batches: Iterable[List[DecryptResult]], output_path: str) -> None:
+    with open(output_path, 'w', encoding='utf-8', buffering=config.WRITE_BUFFER_SIZE) as output_file:
+        for batch in batches:
+            with metrics.stage("csv_write"):
+                output_file.write('\n'.join([result.plaintext for result in batch]))
+                output_file.write('\n')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("오류: Parquet 출력을 쓰려면 'pyarrow' 패키지를 설치하세요. (pip install pyarrow)") from None
+    return pyarrow
+
+
+def _write_parquet(batches: Iterable[List[DecryptResult]], output_path: str) -> None:
+    pa = _pyarrow()
+    columns: Optional[List[str]] = None
+    writer = None
+    try:
+        for batch in batches:
+            if columns is None:
+                if batch[0].index == 0:  # 0번 레코드 = 원본 CSV의 헤더 줄
+                    columns = next(csv.reader([batch[0].plaintext]))
+                    batch = batch[1:]
+                else:  # 헤더 줄이 손상되었으면 첫 데이터 행의 필드 수로 이름을 만든다
+                    columns = [f"col_{i}" for i in range(len(next(csv.reader([batch[0].plaintext]))))]
+                schema = pa.schema([("record", pa.int64())] + [(name, pa.string()) for name in columns])
+                writer = pa.parquet.ParquetWriter(output_path, schema)
+            if not batch:
+                continue
+            with metrics.stage("parquet_write"):
+                rows = list(csv.reader([result.plaintext for result in batch]))
+                arrays = [pa.array([result.index + 1 for result in batch], pa.int64())]
+                for i in range(len(columns)):
+                    arrays.append(pa.array([row[i] if i < len(row) else None for row in rows], pa.string()))
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        if writer is None:  # 성공한 레코드가 하나도 없어도 빈 파일은 남긴다
+            writer = pa.parquet.ParquetWriter(output_path, pa.schema([("record", pa.int64())]))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_results(results: Iterable[DecryptResult], output_path: str, failure_path: Optional[str] = None,
+                  failure_label: str = "손상된 레코드", output_format: str = "csv",
+                  on_failure: FailureCallback = None) -> OutputCounts:
+    """
+    복호화 결과 스트림을 출력 파일(성공한 행만)과 실패 사이드카로 나누어 씁니다.
+
+    결과를 리스트로 모아 두지 않으므로 메모리 사용량은 배치 하나 크기로 일정합니다.
+    on_failure는 실패한 레코드마다 호출됩니다. (경고 로그용)
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"오류: 알 수 없는 출력 형식 '{output_format}' (사용 가능: {', '.join(OUTPUT_FORMATS)})")
+    if output_format == "parquet":
+        _pyarrow()  # 복호화를 시작하기 전에 확인
+    counts = [0, 0, 0]
+    with FailureSidecar(failure_path or failure_path_for(output_path), failure_label) as sidecar:
+        batches = _successful_batches(results, sidecar, counts, on_failure)
+        if output_format == "parquet":
+            _write_parquet(batches, output_path)
+        else:
+            _write_csv(batches, output_path)
+    return OutputCounts(*counts)
+
+
+def write_rejected(total: int, output_path: str, failure_path: Optional[str] = None,
+                   failure_label: str = "인증키 불일치", output_format: str = "csv") -> OutputCounts:
+    """키 검증에서 통째로 거부된 파일의 결과: 빈 출력 파일과 '모든 레코드 실패' 사이드카를 복호화 없이 씁니다."""
+    with FailureSidecar(failure_path or failure_path_for(output_path), failure_label) as sidecar:
+        sidecar.add_range(total, FAILURE_INVALID_TOKEN)
+    if output_format == "parquet":
+        _write_parquet(iter(()), output_path)
+    else:
+        open(output_path, 'w', encoding='utf-8').close()
+    return OutputCounts(total, total, 0)
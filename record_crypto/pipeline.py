@@ -0,0 +1,306 @@
+"""
+암호화 / 복호화 / 손상 시뮬레이션 / 인증키 제거 검증 시나리오의 라이브러리 API.
+
+예전 네 개의 스크립트 본문이 여기로 옮겨졌습니다. CLI(record_crypto.cli)와 서비스 코드 모두
+이 함수들을 직접 호출하므로, 파이썬 프로세스를 새로 띄울 필요가 없습니다.
+
+진행 상황은 log 콜백(기본값 print)으로 보고하며, log=None이면 아무것도 출력하지 않습니다.
+"""
+import os
+import random
+import time
+from typing import BinaryIO, Callable, Dict, Iterable, NamedTuple, Optional, Sequence
+
+from . import config, metrics
+from .engine import FAILURE_INVALID_TOKEN, DecryptResult, encrypt_records
+from .index import IndexWriter, index_path_for
+from .kdf import derive_key
+from .keycheck import ensure_key_correct, is_key_correct, key_check_path_for, write_key_check
+from .output import failure_path_for, write_rejected, write_results
+from .reader import MappedRecordFile, decrypt_file
+
+Log = Optional[Callable[[str], None]]
+
+
+class RunSummary(NamedTuple):
+    """복호화 계열 시나리오 한 번의 결과 요약."""
+    total: int
+    succeeded: int
+    failed: int
+
+
+def _log(log: Log, message: str) -> None:
+    if log is not None:
+        log(message)
+
+
+def _require_file(path: str, what: str) -> None:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"오류: {what} '{path}'을(를) 찾을 수 없습니다. 먼저 암호화를 실행하거나 경로를 확인하세요!")
+
+
+def load_salt(salt_path: str = config.SALT_FILE_NAME) -> bytes:
+    """솔트 파일을 읽어옵니다."""
+    _require_file(salt_path, "솔트 파일")
+    with metrics.stage("salt_load"), open(salt_path, 'rb') as f:
+        return f.read()
+
+
+def save_salt(salt: bytes, salt_path: str = config.SALT_FILE_NAME) -> None:
+    """솔트 파일을 원자적으로 저장합니다. (쓰다가 죽어도 예전 솔트와 새 솔트 중 하나만 남는다)"""
+    tmp_path = salt_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(salt)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, salt_path)
+
+
+def strip_line_end(line: bytes) -> bytes:
+    """원본 CSV 줄 끝의 '\n' 또는 '\r\n'을 떼어냅니다. (모든 암호화 경로가 같은 레코드 바이트를 쓰도록)"""
+    if line.endswith(b'\n'):
+        return line[:-2] if line.endswith(b'\r\n') else line[:-1]
+    return line
+
+
+def load_key(password: str, salt_path: str = config.SALT_FILE_NAME) -> bytes:
+    """솔트 파일과 비밀번호로 Fernet 키를 (캐시를 거쳐) 파생합니다."""
+    salt = load_salt(salt_path)
+    with metrics.stage("derive_key"):
+        return derive_key(password, salt)
+
+
+def encrypt_csv(password: str, raw_path: str = config.RAW_DATA_FILE_NAME,
+                encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                salt_path: str = config.SALT_FILE_NAME, workers: Optional[int] = None, log: Log = print,
+                blind_index_columns: Optional[Sequence[str]] = None) -> int:
+    """
+    원본 CSV의 모든 줄(헤더 포함)을 레코드별로 암호화하여 스트리밍으로 저장하고, 레코드 수를 돌려줍니다.
+
+    새 무작위 솔트를 만들어 salt_path에 저장하며, 기존 암호화 파일/솔트/인덱스는 덮어씁니다.
+    (새 파일을 다 쓴 뒤에야 바꾸므로, 컬럼 이름이 틀렸거나 암호화 도중 실패하면 예전 파일들이 그대로 남습니다)
+    끝나면 증분 암호화 체크포인트도 새로 쓰므로, 이후 encrypt --incremental은 추가된 행만 암호화합니다.
+    blind_index_columns를 주면 같은 읽기 과정에서 그 컬럼들의 블라인드 인덱스(값으로 조회용)도 만듭니다.
+    """
+    from .blind_index import BlindIndexBuilder, check_index_columns, remove_blind_indexes
+
+    _require_file(raw_path, "원본 파일")
+    if blind_index_columns:
+        check_index_columns(raw_path, blind_index_columns)  # 틀린 컬럼 이름이면 아무 파일도 건드리지 않고 멈춘다
+
+    salt = os.urandom(16)
+    with metrics.stage("derive_key"):
+        key = derive_key(password, salt)
+    _log(log, "[*] 암호화 키 파생 완료.")
+
+    blind_index = None
+    if blind_index_columns:
+        blind_index = BlindIndexBuilder(key, blind_index_columns,
+                                        tmp_dir=os.path.dirname(os.path.abspath(encrypted_path)))
+    # 새 파일을 임시 파일에 다 쓴 뒤에야 예전 파일을 바꾸므로, 도중에 실패하면 예전 데이터/솔트/인덱스가 그대로 남는다.
+    count = write_encrypted_records(key, raw_path, encrypted_path, workers, blind_index)
+    save_salt(salt, salt_path)
+    _log(log, f"[*] '{salt_path}' 파일에 솔트 저장 완료.")
+    # 예전 데이터(키)로 만든 인덱스는 새 파일과 맞지 않는다
+    remove_blind_indexes(encrypted_path, [*config.BLIND_INDEX_COLUMNS, *(blind_index_columns or ())])
+    _log(log, f"[+] 총 {count}개의 레코드를 개별 암호화 완료.")
+    _log(log, f"[+] 개별 암호화된 레코드가 '{encrypted_path}' 파일로 저장되었습니다. (인덱스: '{index_path_for(encrypted_path)}')")
+    if blind_index is not None:
+        with metrics.stage("blind_index_write"):
+            paths = blind_index.write(encrypted_path)
+        _log(log, f"[+] 블라인드 인덱스 저장 완료: {', '.join(paths)}")
+    return count
+
+
+def write_encrypted_records(key: bytes, raw_path: str, encrypted_path: str, workers: Optional[int] = None,
+                            blind_index=None) -> int:
+    """
+    이미 파생된 키로 원본 CSV를 레코드별로 암호화하여 토큰 파일, 오프셋 인덱스, 키 검증 태그,
+    증분 암호화 체크포인트를 쓰고, 레코드 수를 돌려줍니다.
+
+    blind_index(BlindIndexBuilder)를 주면 암호화하는 레코드를 그대로 넘겨 인덱스 항목을 모읍니다. (파일 쓰기는 호출한 쪽에서)
+    토큰 파일과 사이드카는 '<파일>.tmp'에 다 쓴 뒤에야 제자리로 옮기므로, 도중에 실패하면 예전 파일이 그대로 남습니다.
+    """
+    from .incremental import SourceLines, new_checkpoint, remove_checkpoint, write_checkpoint
+
+    tmp_path = encrypted_path + ".tmp"
+    sidecars = (index_path_for, key_check_path_for)
+    try:
+        write_key_check(tmp_path, key)
+        with open(raw_path, 'rb', buffering=config.READ_BUFFER_SIZE) as raw_file, \
+                open(tmp_path, 'wb', buffering=config.WRITE_BUFFER_SIZE) as output_file:
+            source = SourceLines(raw_file, complete_only=False)
+            line_bytes_iter = metrics.timed_iter("file_read", source)
+            if blind_index is not None:
+                line_bytes_iter = blind_index.tap(line_bytes_iter)
+            index_writer = IndexWriter(index_path_for(tmp_path))
+            try:
+                count = write_token_stream(key, line_bytes_iter, output_file, index_writer, workers)
+                output_file.flush()
+                os.fsync(output_file.fileno())
+                encrypted_size = output_file.tell()
+            finally:
+                index_writer.close(fsync=True)
+    except BaseException:
+        for leftover in (tmp_path, *(path_for(tmp_path) for path_for in sidecars)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    # 예전 체크포인트는 파일을 바꾸기 직전에 지운다. (바꾸는 도중에 죽으면 체크포인트 없는 파일만 남아
+    # 증분 암호화가 거부된다)
+    remove_checkpoint(encrypted_path)
+    os.replace(tmp_path, encrypted_path)
+    for path_for in sidecars:
+        os.replace(path_for(tmp_path), path_for(encrypted_path))
+    write_checkpoint(encrypted_path, new_checkpoint(raw_path, encrypted_path, source, encrypted_size, count))
+    return count
+
+
+def write_token_stream(key: bytes, records: Iterable[bytes], output_file: BinaryIO, index_writer: IndexWriter,
+                       workers: Optional[int] = None) -> int:
+    """평문 레코드들을 병렬 암호화하여 한 줄에 토큰 하나씩 쓰고 인덱스에 기록합니다. 쓴 레코드 수를 돌려줍니다."""
+    registry = metrics.current()
+    count = 0
+    for token in encrypt_records(key, records, workers=workers):
+        write_start = time.perf_counter() if registry else 0.0
+        output_file.write(token)
+        output_file.write(b'\n')  # 각 암호화된 레코드 뒤에 개행 바이트 추가 (복호화 시 줄 단위로 읽기 위함)
+        index_writer.add(len(token) + 1)
+        count += 1
+        if count % config.FLUSH_EVERY_RECORDS == 0:
+            output_file.flush()
+        if registry:
+            registry.add_time("token_write", time.perf_counter() - write_start)
+    metrics.count("records", count, result="encrypted")
+    return count
+
+
+def write_decrypted_csv(key: bytes, encrypted_path: str, output_path: str, failure_label: str = "손상된 레코드",
+                        workers: Optional[int] = None, overrides: Optional[Dict[int, bytes]] = None,
+                        log: Log = None, log_invalid_tokens: bool = False, output_format: str = "csv") -> RunSummary:
+    """
+    이미 파생된 키로 모든 레코드를 복호화하여 성공한 행만 결과 파일(CSV 또는 Parquet)로 씁니다.
+
+    실패한 레코드 번호는 '<결과 파일>.failures.csv' 사이드카에 failure_label과 함께 기록합니다.
+    """
+    def on_failure(result: DecryptResult) -> None:
+        line_number = result.index + 1
+        if result.failure != FAILURE_INVALID_TOKEN:
+            _log(log, f"[!] 경고: {line_number}번째 레코드 복호화 중 예상치 못한 오류 발생: {result.message}")
+        elif log_invalid_tokens:
+            _log(log, f"[!] 경고: {line_number}번째 레코드 복호화 실패 (InvalidToken). 데이터가 손상되었을 수 있습니다.")
+
+    counts = write_results(decrypt_file(encrypted_path, key, workers=workers, overrides=overrides), output_path,
+                           failure_label=failure_label, output_format=output_format, on_failure=on_failure)
+    metrics.count("records", counts.total - counts.failed, result="ok")
+    metrics.count("records", counts.invalid, result=FAILURE_INVALID_TOKEN)
+    metrics.count("records", counts.errors, result="error")
+    return RunSummary(counts.total, counts.total - counts.failed, counts.failed)
+
+
+def _write_rejected_output(encrypted_path: str, output_path: str, failure_label: str,
+                           output_format: str = "csv") -> RunSummary:
+    """키 검증에서 거부된 파일의 결과 (빈 결과 파일 + 모든 레코드가 실패인 사이드카)를 복호화 없이 씁니다."""
+    with MappedRecordFile(encrypted_path) as encrypted_records:
+        total = len(encrypted_records)
+    write_rejected(total, output_path, failure_label=failure_label, output_format=output_format)
+    return RunSummary(total, 0, total)
+
+
+def decrypt_to_csv(password: str, encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                   salt_path: str = config.SALT_FILE_NAME,
+                   output_path: str = config.DECRYPTED_NORMAL_OUTPUT_FILE_NAME,
+                   workers: Optional[int] = None, verify_all: bool = False, log: Log = print,
+                   output_format: str = "csv") -> RunSummary:
+    """
+    모든 레코드를 복호화하여 CSV로 저장합니다. (정상 복호화 시나리오)
+
+    비밀번호가 틀리면 대량 복호화를 시작하기 전에 WrongKeyError가 발생합니다.
+    verify_all=True(감사 모드)이면 키 검증을 건너뛰고 모든 레코드를 직접 시도합니다.
+    """
+    key = load_key(password, salt_path)
+    _require_file(encrypted_path, "암호화된 레코드 파일")
+    if not verify_all:
+        ensure_key_correct(encrypted_path, key)
+    summary = write_decrypted_csv(key, encrypted_path, output_path, "손상된 레코드", workers, None, log, True,
+                                  output_format)
+    _log(log, f"[+] 총 {summary.succeeded}개의 레코드를 성공적으로 복호화 완료.")
+    if summary.failed:
+        _log(log, f"[!] {summary.failed}개의 레코드 복호화에 실패했습니다. (실패 목록: '{failure_path_for(output_path)}')")
+    _log(log, f"[+] 복호화된 개인 정보가 '{output_path}' 파일로 저장되었습니다.")
+    return summary
+
+
+def corrupt_random_records(encrypted_path: str, num_to_corrupt: int = config.NUM_TO_CORRUPT,
+                           rng: Optional[random.Random] = None) -> Dict[int, bytes]:
+    """
+    레코드 num_to_corrupt개를 무작위로 골라 바이트 하나씩을 변조한 {레코드 번호: 손상된 토큰}을 돌려줍니다.
+    원본 파일은 건드리지 않습니다.
+    """
+    rng = rng or random.Random()
+    with MappedRecordFile(encrypted_path) as encrypted_records:
+        total_records = len(encrypted_records)
+        if total_records == 0:
+            raise ValueError(f"오류: '{encrypted_path}' 파일에 암호화된 레코드가 없습니다. 암호화를 먼저 확인하세요.")
+        if total_records <= num_to_corrupt:
+            indices_to_corrupt = list(range(total_records))
+        else:
+            indices_to_corrupt = rng.sample(range(total_records), num_to_corrupt)
+        corrupted = encrypted_records.tokens_at(indices_to_corrupt)
+
+    for idx in indices_to_corrupt:
+        record_bytes = bytearray(corrupted[idx])
+        if len(record_bytes) > 10:  # 최소한의 길이 조건
+            record_bytes[rng.randint(0, len(record_bytes) - 1)] = rng.randint(0, 255)  # 랜덤 위치의 랜덤 값으로 변경
+            corrupted[idx] = bytes(record_bytes)
+    return corrupted
+
+
+def tamper_test(password: str, encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                salt_path: str = config.SALT_FILE_NAME,
+                output_path: str = config.DECRYPTED_MALICIOUS_OUTPUT_FILE_NAME,
+                num_to_corrupt: int = config.NUM_TO_CORRUPT, seed: Optional[int] = None,
+                workers: Optional[int] = None, verify_all: bool = False, log: Log = print,
+                output_format: str = "csv") -> RunSummary:
+    """무작위 레코드를 메모리에서 손상시킨 뒤 복호화합니다. (랜덤 손상 시뮬레이션 시나리오)"""
+    key = load_key(password, salt_path)
+    _require_file(encrypted_path, "암호화된 레코드 파일")
+    if not verify_all:
+        ensure_key_correct(encrypted_path, key)
+
+    corrupted = corrupt_random_records(encrypted_path, num_to_corrupt, random.Random(seed))
+    _log(log, f"[!!!] 🚨🚨🚨 경고: 랜덤으로 선택된 레코드 {len(corrupted)}개가 의도적으로 '손상'되었습니다! 🚨🚨🚨")
+
+    summary = write_decrypted_csv(key, encrypted_path, output_path, "손상 레코드", workers, corrupted, log, False,
+                                  output_format)
+    _log(log, f"[+] 총 {summary.succeeded}개의 레코드를 성공적으로 복호화 완료.")
+    if summary.failed:
+        _log(log, f"[!] {summary.failed}개의 레코드 복호화에 실패했습니다. (실패 목록: '{failure_path_for(output_path)}')")
+    _log(log, f"[+] 복호화된 개인 정보가 '{output_path}' 파일로 저장되었습니다.")
+    return summary
+
+
+def verify_without_key(password: str = "", encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                       salt_path: str = config.SALT_FILE_NAME,
+                       output_path: str = config.DECRYPTED_NO_KEY_OUTPUT_FILE_NAME,
+                       workers: Optional[int] = None, verify_all: bool = False, log: Log = print,
+                       output_format: str = "csv") -> RunSummary:
+    """
+    틀린(또는 빈) 인증키로 복호화를 시도하여 단 한 건도 유출되지 않는지 검증합니다. (인증키 제거 시나리오)
+
+    키 검증 태그로 틀린 키임이 확인되면 레코드별 복호화 없이 즉시 '전부 실패'로 보고합니다.
+    verify_all=True(감사 모드)이면 모든 레코드에 대해 실제로 복호화를 시도합니다.
+    """
+    key = load_key(password, salt_path)
+    _require_file(encrypted_path, "암호화된 레코드 파일")
+    if not verify_all and not is_key_correct(encrypted_path, key):
+        _log(log, "[*] 키 검증 실패: 레코드별 복호화 없이 즉시 거부합니다. (감사 모드: verify_all=True)")
+        summary = _write_rejected_output(encrypted_path, output_path, "인증키 불일치", output_format)
+    else:
+        summary = write_decrypted_csv(key, encrypted_path, output_path, "인증키 불일치", workers, None, log, False,
+                                      output_format)
+    _log(log, f"[*] 총 {summary.total}개 레코드 시도")
+    _log(log, f"[+] 성공적으로 복호화된 레코드 수: {summary.succeeded}개")
+    _log(log, f"[!] 복호화에 실패한 레코드 수: {summary.failed}개")
+    _log(log, f"[+] 복호화 시도 결과가 '{output_path}' 파일로 저장되었습니다. (실패 목록: '{failure_path_for(output_path)}')")
+    return summary
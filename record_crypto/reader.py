@@ -0,0 +1,188 @@
+"""
+encrypted_records.bin용 memory-mapped 리더.
+
+`for line in encrypted_file` + `.strip(b'\\n')` 방식은 레코드마다 bytes 객체를 새로 만들고,
+전체를 리스트에 복사해 두기까지 합니다. 여기서는 파일을 mmap 한 뒤 레코드마다 memoryview 조각만 돌려주므로
+버퍼링은 OS 페이지 캐시가 전부이고, 핫 루프에서 불필요한 할당이 생기지 않습니다.
+
+병렬 복호화(decrypt_file)에서는 워커 프로세스들이 같은 파일을 각자 mmap 하고
+메인 프로세스는 레코드의 (시작, 끝) 위치만 넘겨주므로, 토큰 바이트를 프로세스 사이로 복사하지도 않습니다.
+"""
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from . import metrics
+from .engine import DEFAULT_CHUNK_SIZE, DecryptResult, chunked, decrypt_token, default_workers, ordered_map, \
+    worker_fernet
+from .index import RecordIndex, index_path_for
+
+Span = Tuple[int, int]
+
+# 같은 프로세스 안에서 파일 경로별로 한 번만 mmap 해 두는 캐시 (워커 프로세스용)
+# use_threads=True이거나 서비스처럼 여러 호출이 동시에 돌면 여러 스레드가 같이 쓰므로 잠금으로 보호하고,
+# 현재 프로세스에서는 그 경로를 쓰는 호출 수(_mapped_refs)가 0이 될 때만 닫는다.
+_mapped_files: Dict[str, "MappedRecordFile"] = {}
+_mapped_refs: Dict[str, int] = {}
+_mapped_files_lock = threading.Lock()
+
+
+class MappedRecordFile:
+    """
+    줄 단위 Fernet 토큰 파일을 mmap 하여 레코드별 memoryview를 돌려줍니다.
+
+        with MappedRecordFile("encrypted_records.bin") as records:
+            for token_view in records:
+                ...
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            # 빈 파일은 mmap 할 수 없으므로 빈 바이트열로 대신한다.
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        self._view = memoryview(self._mm)
+        self._count: Optional[int] = None
+
+    def spans(self) -> Iterator[Span]:
+        """비어있지 않은 각 줄의 [시작, 끝) 위치 (개행 제외)."""
+        mm = self._mm
+        size = len(mm)
+        pos = 0
+        while pos < size:
+            newline = mm.find(b'\n', pos)
+            if newline == -1:
+                newline = size
+            if newline > pos:
+                yield pos, newline
+            pos = newline + 1
+
+    def view(self, start: int, end: int) -> memoryview:
+        return self._view[start:end]
+
+    def tokens_at(self, indices: Iterable[int]) -> Dict[int, bytes]:
+        """
+        지정한 레코드 번호들의 토큰만 골라서 bytes로 복사해 돌려줍니다. (범위를 벗어난 번호는 무시)
+        사이드카 인덱스가 있으면 해당 레코드로 바로 seek 하고, 없을 때만 파일 전체를 훑습니다.
+        """
+        wanted = set(indices)
+        index = _open_index(self.path)
+        if index is None:
+            return {i: self._mm[start:end] for i, (start, end) in enumerate(self.spans()) if i in wanted}
+        with index:
+            return {i: index.token(i) for i in wanted if 0 <= i < len(index)}
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for start, end in self.spans():
+            yield self._view[start:end]
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = _count_records(self)
+        return self._count
+
+    def close(self) -> None:
+        self._view.release()
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _open_index(path: str) -> Optional[RecordIndex]:
+    """사이드카 인덱스가 있고 파일과 맞으면 연 RecordIndex를, 아니면 None을 돌려줍니다."""
+    if not os.path.exists(index_path_for(path)):
+        return None
+    try:
+        return RecordIndex(path)
+    except ValueError:
+        return None
+
+
+def _count_records(records: MappedRecordFile) -> int:
+    # 사이드카 인덱스가 있고 파일과 맞으면 스캔 없이 바로 레코드 수를 안다.
+    index = _open_index(records.path)
+    if index is not None:
+        with index:
+            return len(index)
+    return sum(1 for _ in records.spans())
+
+
+def _mapped(path: str) -> MappedRecordFile:
+    records = _mapped_files.get(path)
+    if records is None:
+        with _mapped_files_lock:
+            records = _mapped_files.get(path)
+            if records is None:
+                records = _mapped_files[path] = MappedRecordFile(path)
+    return records
+
+
+@contextmanager
+def _shared_mapping(path: str) -> Iterator[None]:
+    """
+    이 블록 안에서 현재 프로세스의 _mapped(path) 캐시를 씁니다. 같은 경로를 쓰는 마지막 호출이 끝날 때 mmap을 닫습니다.
+    (다른 스레드가 아직 쓰고 있는 mmap을 닫아버리지 않도록)
+    """
+    with _mapped_files_lock:
+        _mapped_refs[path] = _mapped_refs.get(path, 0) + 1
+    try:
+        yield
+    finally:
+        cached = None
+        with _mapped_files_lock:
+            _mapped_refs[path] -= 1
+            if not _mapped_refs[path]:
+                del _mapped_refs[path]
+                cached = _mapped_files.pop(path, None)
+        if cached is not None:
+            cached.close()
+
+
+def _decrypt_span_chunk(path: str, start: int, spans: List[Span], overrides: Mapping[int, bytes],
+                        fernet=None) -> List[DecryptResult]:
+    fernet = fernet or worker_fernet()
+    records = _mapped(path)
+    results = []
+    for index, (span_start, span_end) in enumerate(spans, start):
+        token = overrides.get(index)
+        if token is None:
+            token = records.view(span_start, span_end)
+        results.append(decrypt_token(fernet, index, token))
+    return results
+
+
+def decrypt_file(path: str, key: bytes, workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 use_threads: bool = False, overrides: Optional[Mapping[int, bytes]] = None) -> Iterator[DecryptResult]:
+    """
+    줄 단위 Fernet 토큰 파일을 mmap 기반으로 병렬 복호화하여 DecryptResult를 레코드 순서대로 돌려줍니다.
+
+    overrides에 {레코드 번호: 토큰}을 주면 해당 레코드만 파일 내용 대신 그 토큰으로 복호화합니다.
+    (손상 시뮬레이션처럼 일부 레코드만 바꿔치기할 때, 나머지 레코드는 복사하지 않기 위함)
+    """
+    workers = workers or default_workers()
+    overrides = overrides or {}
+    path = os.path.abspath(path)
+    with MappedRecordFile(path) as records:
+        chunk_args = (
+            (path, start, spans, {i: overrides[i] for i in range(start, start + len(spans)) if i in overrides}
+             if overrides else {})
+            for start, spans in chunked(records.spans(), chunk_size)
+        )
+        # 현재 프로세스에서 직접(또는 스레드로) 처리했다면 캐시해 둔 mmap도 (마지막 사용자가) 닫아준다.
+        with _shared_mapping(path):
+            if metrics.current() is None:
+                chunk_results = ordered_map(_decrypt_span_chunk, key, chunk_args, workers, use_threads)
+            else:
+                timed = ordered_map(partial(metrics.timed_chunk, _decrypt_span_chunk), key,
+                                    metrics.timed_iter("file_read", chunk_args), workers, use_threads)
+                chunk_results = metrics.observe_chunks(timed, "decrypt")
+            for results in chunk_results:
+                yield from results
@@ -0,0 +1,217 @@
+"""
+비밀번호/솔트 교체(키 회전) 도구.
+
+예전에는 비밀번호를 바꾸려면 전체를 평문 CSV로 복호화한 뒤 다시 암호화해야 했습니다.
+(느리고, 무엇보다 개인정보가 평문으로 디스크에 남는다!)
+여기서는 encrypted_records.bin을 스트리밍으로 읽어 MultiFernet([새 키, 옛 키]).rotate()로
+토큰을 메모리 안에서만 새 키로 다시 암호화합니다. 평문은 파일은 물론 프로세스 사이로도 오가지 않습니다.
+
+진행 상황은 '<암호화 파일>.rekey.ckpt'에 주기적으로 기록합니다. (쓰는 중인 결과는 '<암호화 파일>.rekey.tmp')
+    records / source_offset - 지금까지 처리한 레코드 수와 원본 토큰 파일의 바이트 위치
+    output_size             - fsync까지 끝난 결과 파일 크기
+    new_salt, new_key_check - 새 솔트와 새 키의 검증 태그 (이어서 할 때 같은 새 키인지 확인)
+    done                    - 모든 레코드를 처리하고 마무리(파일 교체) 단계에 들어갔는지
+
+중간에 죽으면 같은 명령을 다시 실행하면 됩니다. 결과 파일을 output_size로 잘라낸 뒤 source_offset부터 이어서 처리합니다.
+마무리 단계는 새 솔트 임시 파일 -> 데이터 파일 교체 -> 솔트 파일 교체 -> 키 검증 태그/인덱스 순서이며,
+이 단계에서 죽어도 다시 실행하면 남은 교체만 마저 합니다.
+"""
+import base64
+import json
+import os
+from collections import deque
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import config
+from .blind_index import remove_blind_indexes
+from .engine import DEFAULT_CHUNK_SIZE, default_workers, ordered_map
+from .incremental import checkpoint_path_for, load_checkpoint
+from .index import build_index
+from .kdf import derive_key
+from .keycheck import WrongKeyError, ensure_key_correct, fernet_key_tag, tags_match, write_key_check
+from .pipeline import Log, _log, _require_file, load_key
+
+REKEY_CHECKPOINT_SUFFIX = ".rekey.ckpt"
+REKEY_TMP_SUFFIX = ".rekey.tmp"
+REKEY_CHECKPOINT_VERSION = 1
+
+# 워커 프로세스마다 (새 키, 옛 키) 조합별로 한 번만 만들어 두는 MultiFernet
+_worker_rotators: Dict[Tuple[bytes, bytes], object] = {}
+
+
+class RekeyResult(NamedTuple):
+    records: int  # 새 키로 다시 암호화된 전체 레코드 수
+    resumed_from: int  # 이어서 시작한 레코드 번호 (처음부터 했으면 0)
+
+
+def rekey_checkpoint_path_for(encrypted_path: str) -> str:
+    return encrypted_path + REKEY_CHECKPOINT_SUFFIX
+
+
+def _load_rekey_checkpoint(encrypted_path: str) -> Optional[Dict]:
+    path = rekey_checkpoint_path_for(encrypted_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("version") != REKEY_CHECKPOINT_VERSION:
+        raise ValueError(f"오류: 지원하지 않는 키 교체 체크포인트 버전입니다: '{path}'")
+    return checkpoint
+
+
+def _write_rekey_checkpoint(encrypted_path: str, checkpoint: Dict) -> None:
+    path = rekey_checkpoint_path_for(encrypted_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _rotator(new_key: bytes, old_key: bytes):
+    rotator = _worker_rotators.get((new_key, old_key))
+    if rotator is None:
+        from cryptography.fernet import Fernet, MultiFernet
+
+        rotator = _worker_rotators[(new_key, old_key)] = MultiFernet([Fernet(new_key), Fernet(old_key)])
+    return rotator
+
+
+def _rotate_chunk(start: int, tokens: List[bytes], new_key: bytes, old_key: bytes, fernet=None) -> List[bytes]:
+    """
+    토큰들을 새 키로 다시 암호화합니다. (원래 타임스탬프 유지)
+    손상된 토큰이 있으면 그 레코드 번호를 담은 ValueError를 발생시킵니다.
+    """
+    from cryptography.fernet import InvalidToken
+
+    rotator = _rotator(new_key, old_key)
+    rotated = []
+    for index, token in enumerate(tokens, start):
+        try:
+            rotated.append(rotator.rotate(token))
+        except InvalidToken:
+            raise ValueError(f"오류: {index + 1}번째 레코드가 손상되어 키를 교체할 수 없습니다. "
+                             f"(scan 명령으로 손상 레코드를 먼저 확인하세요)") from None
+    return rotated
+
+
+def _source_chunks(source_file, start_record: int, chunk_size: int,
+                   ends: deque) -> Iterator[Tuple[int, List[bytes]]]:
+    """원본 토큰 파일의 현재 위치부터 (시작 레코드 번호, 토큰 목록)을 만들고, 청크 끝 위치를 ends에 기록합니다."""
+    offset = source_file.tell()
+    index = start_record
+    chunk: List[bytes] = []
+    for line in source_file:
+        offset += len(line)
+        token = line.strip(b'\n')
+        if token:
+            chunk.append(token)
+        if len(chunk) >= chunk_size:
+            ends.append((index + len(chunk), offset))
+            yield index, chunk
+            index += len(chunk)
+            chunk = []
+    if chunk:
+        ends.append((index + len(chunk), offset))
+        yield index, chunk
+
+
+def _finalize(encrypted_path: str, salt_path: str, checkpoint: Dict, new_key: bytes, log: Log = print) -> None:
+    """다 만든 결과 파일과 새 솔트를 제자리에 교체합니다. 여러 번 실행해도 안전합니다."""
+    tmp_path = encrypted_path + REKEY_TMP_SUFFIX
+    new_salt = base64.b64decode(checkpoint["new_salt"])
+    new_salt_tmp = salt_path + REKEY_TMP_SUFFIX
+    if not os.path.exists(new_salt_tmp):
+        with open(new_salt_tmp, 'wb') as f:
+            f.write(new_salt)
+            f.flush()
+            os.fsync(f.fileno())
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, encrypted_path)
+    os.replace(new_salt_tmp, salt_path)
+    write_key_check(encrypted_path, new_key)
+    build_index(encrypted_path)
+    # 블라인드 인덱스는 옛 키에서 파생한 하위 키로 만들었으므로 더는 쓸 수 없다.
+    removed = remove_blind_indexes(encrypted_path)
+    if removed:
+        _log(log, f"[!] 옛 키로 만든 블라인드 인덱스를 지웠습니다: {', '.join(removed)} (build-index로 다시 만드세요)")
+
+    # 증분 암호화 체크포인트는 토큰 길이가 그대로라 보통 유효하지만, 크기가 다르면 버린다.
+    incremental = load_checkpoint(encrypted_path)
+    if incremental is not None and incremental.get("encrypted_size") != os.path.getsize(encrypted_path):
+        os.remove(checkpoint_path_for(encrypted_path))
+    os.remove(rekey_checkpoint_path_for(encrypted_path))
+
+
+def rekey(old_password: str, new_password: str, encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+          salt_path: str = config.SALT_FILE_NAME, workers: Optional[int] = None,
+          chunk_size: int = DEFAULT_CHUNK_SIZE, checkpoint_every: int = config.REKEY_CHECKPOINT_RECORDS,
+          log: Log = print) -> RekeyResult:
+    """
+    모든 레코드를 옛 비밀번호의 키에서 새 비밀번호 + 새 솔트의 키로 옮기고, 레코드 수를 돌려줍니다.
+
+    체크포인트가 남아 있으면 그 지점부터 이어서 처리합니다.
+    손상된 레코드가 하나라도 있으면 ValueError로 중단하며, 원본 파일은 마무리 단계 전까지 건드리지 않습니다.
+    """
+    _require_file(encrypted_path, "암호화된 레코드 파일")
+    tmp_path = encrypted_path + REKEY_TMP_SUFFIX
+    checkpoint = _load_rekey_checkpoint(encrypted_path)
+
+    if checkpoint is None:
+        old_key = load_key(old_password, salt_path)
+        ensure_key_correct(encrypted_path, old_key)
+        new_salt = os.urandom(16)
+        new_key = derive_key(new_password, new_salt)
+        checkpoint = {"version": REKEY_CHECKPOINT_VERSION, "records": 0, "source_offset": 0, "output_size": 0,
+                      "new_salt": base64.b64encode(new_salt).decode('ascii'),
+                      "new_key_check": fernet_key_tag(new_key).hex(), "done": False}
+        open(tmp_path, 'wb').close()
+        _write_rekey_checkpoint(encrypted_path, checkpoint)
+    else:
+        new_key = derive_key(new_password, base64.b64decode(checkpoint["new_salt"]))
+        if not tags_match(bytes.fromhex(checkpoint["new_key_check"]), fernet_key_tag(new_key)):
+            raise WrongKeyError("오류: 진행 중인 키 교체와 다른 새 비밀번호입니다. (키 검증 실패)")
+        if checkpoint["done"]:
+            _log(log, "[*] 모든 레코드의 키 교체가 끝나 있습니다. 남은 파일 교체만 마무리합니다.")
+            _finalize(encrypted_path, salt_path, checkpoint, new_key, log)
+            return RekeyResult(checkpoint["records"], checkpoint["records"])
+        old_key = load_key(old_password, salt_path)
+        ensure_key_correct(encrypted_path, old_key)
+        _log(log, f"[*] 체크포인트 발견: 레코드 {checkpoint['records']}개까지 키 교체되어 있어 이어서 진행합니다.")
+
+    resumed_from = checkpoint["records"]
+    workers = workers or default_workers()
+    ends: deque = deque()
+    with open(encrypted_path, 'rb', buffering=config.READ_BUFFER_SIZE) as source_file, \
+            open(tmp_path, 'r+b', buffering=config.WRITE_BUFFER_SIZE) as output_file:
+        # 지난번에 커밋되지 못한 꼬리 부분은 잘라버리고 이어서 쓴다.
+        output_file.truncate(checkpoint["output_size"])
+        output_file.seek(checkpoint["output_size"])
+        source_file.seek(checkpoint["source_offset"])
+        chunk_args = ((start, tokens, new_key, old_key)
+                      for start, tokens in _source_chunks(source_file, resumed_from, chunk_size, ends))
+        records, source_offset = checkpoint["records"], checkpoint["source_offset"]
+        since_checkpoint = 0
+        for rotated in ordered_map(_rotate_chunk, new_key, chunk_args, workers, False):
+            for token in rotated:
+                output_file.write(token)
+                output_file.write(b'\n')
+            records, source_offset = ends.popleft()
+            since_checkpoint += len(rotated)
+            if since_checkpoint >= checkpoint_every:
+                output_file.flush()
+                os.fsync(output_file.fileno())
+                checkpoint.update(records=records, source_offset=source_offset, output_size=output_file.tell())
+                _write_rekey_checkpoint(encrypted_path, checkpoint)
+                _log(log, f"[*] 레코드 {records}개 키 교체 완료 (체크포인트 저장)")
+                since_checkpoint = 0
+        output_file.flush()
+        os.fsync(output_file.fileno())
+        checkpoint.update(records=records, source_offset=source_offset, output_size=output_file.tell(), done=True)
+    _write_rekey_checkpoint(encrypted_path, checkpoint)
+
+    _finalize(encrypted_path, salt_path, checkpoint, new_key, log)
+    _log(log, f"[+] 총 {checkpoint['records']}개의 레코드를 새 키로 다시 암호화했습니다. (평문은 디스크에 쓰지 않음)")
+    _log(log, f"[+] 새 솔트가 '{salt_path}' 파일에 저장되었습니다. 이제부터는 새 비밀번호를 사용하세요.")
+    return RekeyResult(checkpoint["records"], resumed_from)
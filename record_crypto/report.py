@@ -0,0 +1,286 @@
+"""
+벤치마크 보고서 / 실행 계측 JSON으로 성능 대시보드를 그리는 도구.
+
+예전 시각화.py는 시나리오별 숫자를 코드에 직접 적어 두고, Windows 전용 'Malgun Gothic' 폰트를 고정한 뒤
+plt.show()로 창을 띄워서 Linux CI에서는 그래프를 만들 수 없었습니다.
+이제는 실제 측정 결과를 읽어서 Agg 백엔드로 PNG/SVG 파일만 만듭니다. (화면이 없어도 된다!)
+
+    python -m record_crypto bench --rows 1000 100000 --output run_logs/bench.json
+    python -m record_crypto --metrics-json run_logs/decrypt.json decrypt ...
+    python -m record_crypto report --input run_logs --output report.png report.svg --freq D
+
+읽을 수 있는 입력 (파일, 디렉터리(하위의 *.json / *.jsonl 전체), JSON Lines 모두 가능):
+    bench 보고서      : results[]의 시나리오별 records_per_s, mb_per_s, latency_us, failed
+    --metrics-json 결과 : records 카운터(result별), encrypt/decrypt 단계 시간, record_latency 히스토그램
+                          (시나리오 이름은 'run:<서브커맨드>')
+
+수천 번의 실행도 pandas groupby로 한 번에 집계하고, matplotlib / seaborn / pandas는 실제로 그릴 때만 import 합니다.
+seaborn은 있으면 스타일에만 쓰고, 없으면 matplotlib 기본 스타일로 그립니다.
+"""
+import glob
+import importlib.util
+import json
+import math
+import os
+import warnings
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .metrics import METRICS_SCHEMA_VERSION
+
+# bench.BENCH_SCHEMA_VERSION과 같은 값. (bench/pipeline은 cryptography를 import 하므로,
+# 그래프만 그리는 CI 머신에서도 돌 수 있도록 여기서는 가져오지 않는다)
+BENCH_SCHEMA_VERSION = 1
+
+Log = Optional[Callable[[str], None]]
+
+# 한글을 그릴 수 있는 폰트 후보 (앞에서부터 설치된 것을 고른다)
+KOREAN_FONT_CANDIDATES = ("Malgun Gothic", "AppleGothic", "NanumGothic", "NanumBarunGothic",
+                          "Noto Sans CJK KR", "Noto Sans KR", "UnDotum")
+RUN_COLUMNS = ("source", "timestamp", "kind", "scenario", "rows", "records", "failed", "seconds",
+               "records_per_s", "mb_per_s", "latency_p50_us", "latency_p99_us", "peak_rss_bytes",
+               "peak_rss_children_bytes")
+
+
+def _log(log: Log, message: str) -> None:
+    if log is not None:
+        log(message)
+
+
+def _json_files(path: str) -> List[str]:
+    if not os.path.isdir(path):
+        return [path]
+    pattern = os.path.join(path, "**", "*.json")
+    return sorted(glob.glob(pattern, recursive=True) + glob.glob(pattern + "l", recursive=True))
+
+
+def _iter_documents(paths: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+    """(파일 경로, JSON 문서)를 차례로 돌려줍니다. *.jsonl 파일은 한 줄이 문서 하나입니다."""
+    for path in paths:
+        for file_path in _json_files(path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                if file_path.endswith(".jsonl"):
+                    for line in f:
+                        if line.strip():
+                            yield file_path, json.loads(line)
+                else:
+                    yield file_path, json.load(f)
+
+
+def _number(value) -> Optional[float]:
+    # 히스토그램 분위수가 +Inf 구간에 걸리면 Infinity가 들어오므로 값 없음으로 취급
+    if value is None or isinstance(value, bool) or not math.isfinite(value):
+        return None
+    return value
+
+
+def _bench_rows(source: str, report: Dict) -> Iterator[Dict]:
+    try:
+        timestamp = datetime.strptime(report["timestamp"], "%Y-%m-%dT%H:%M:%S%z").timestamp()
+    except (KeyError, ValueError):
+        timestamp = os.path.getmtime(source)
+    for result in report["results"]:
+        latency = result.get("latency_us") or {}
+        rss = result.get("peak_rss_bytes") or {}  # {"self": 시나리오 프로세스, "children": 그 워커 자식 프로세스}
+        yield {
+            "source": source, "timestamp": timestamp, "kind": "bench", "scenario": result["scenario"],
+            "rows": result.get("rows"), "records": result.get("records"), "failed": result.get("failed"),
+            "seconds": result.get("seconds"), "records_per_s": result.get("records_per_s"),
+            "mb_per_s": result.get("mb_per_s"), "latency_p50_us": _number(latency.get("p50")),
+            "latency_p99_us": _number(latency.get("p99")), "peak_rss_bytes": rss.get("self"),
+            "peak_rss_children_bytes": rss.get("children"),
+        }
+
+
+def _metrics_row(source: str, document: Dict) -> Dict:
+    by_result: Dict[str, int] = {}
+    for counter in document.get("counters", ()):
+        if counter["name"] == "records":
+            result = counter["labels"].get("result", "")
+            by_result[result] = by_result.get(result, 0) + counter["value"]
+    records = sum(by_result.values()) or None
+    failed = records - by_result.get("ok", 0) - by_result.get("encrypted", 0) if records else None
+    stages = document.get("stages", {})
+    main_stage = stages.get("decrypt") or stages.get("encrypt")  # 워커 결과를 기다린 벽시계 시간
+    seconds = main_stage["seconds"] if main_stage else None
+    histogram = document.get("histograms", {}).get("record_latency", {})
+    p50, p99 = _number(histogram.get("p50")), _number(histogram.get("p99"))
+    return {
+        "source": source, "timestamp": document["started"], "kind": "run",
+        "scenario": f"run:{document.get('command', 'unknown')}", "rows": None, "records": records,
+        "failed": failed, "seconds": seconds,
+        "records_per_s": records / seconds if records and seconds else None, "mb_per_s": None,
+        "latency_p50_us": p50 * 1e6 if p50 is not None else None,
+        "latency_p99_us": p99 * 1e6 if p99 is not None else None,
+        "peak_rss_bytes": document.get("memory", {}).get("peak_traced_bytes"), "peak_rss_children_bytes": None,
+    }
+
+
+def _pandas():
+    try:
+        import pandas
+    except ImportError:
+        pandas = None
+    if pandas is None or importlib.util.find_spec("matplotlib") is None:  # 그리기 전에 미리 확인 (import는 그릴 때)
+        raise ValueError("오류: 성능 보고서를 만들려면 'pandas'와 'matplotlib' 패키지를 설치하세요. "
+                         "(pip install pandas matplotlib)")
+    return pandas
+
+
+def load_runs(paths: Sequence[str], log: Log = print):
+    """
+    bench 보고서와 --metrics-json 결과를 읽어, 시나리오 측정 하나가 한 행인 pandas DataFrame으로 돌려줍니다.
+    (알 수 없는 JSON 문서는 경고만 하고 건너뜀)
+    """
+    pd = _pandas()
+    rows: List[Dict] = []
+    for source, document in _iter_documents(paths):
+        if not isinstance(document, dict):
+            _log(log, f"[!] 경고: '{source}'는 알 수 없는 형식이라 건너뜁니다.")
+        elif "results" in document and document.get("schema_version") == BENCH_SCHEMA_VERSION:
+            rows.extend(_bench_rows(source, document))
+        elif "stages" in document and document.get("schema_version") == METRICS_SCHEMA_VERSION:
+            rows.append(_metrics_row(source, document))
+        else:
+            _log(log, f"[!] 경고: '{source}'는 bench 보고서나 계측 JSON이 아니라 건너뜁니다.")
+    frame = pd.DataFrame(rows, columns=list(RUN_COLUMNS))
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], unit="s", utc=True)
+    numeric = [column for column in RUN_COLUMNS if column not in ("source", "timestamp", "kind", "scenario")]
+    frame[numeric] = frame[numeric].apply(pd.to_numeric, errors="coerce")
+    return frame.sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+def summarize(frame):
+    """시나리오별 실행 횟수, 처리량/지연 시간 중앙값, 복호화 성공률을 한 번의 groupby로 집계합니다."""
+    summary = frame.groupby("scenario", sort=False).agg(
+        runs=("scenario", "size"),
+        records=("records", "sum"),
+        failed=("failed", "sum"),
+        failed_reported=("failed", "count"),
+        records_per_s=("records_per_s", "median"),
+        mb_per_s=("mb_per_s", "median"),
+        latency_p50_us=("latency_p50_us", "median"),
+        latency_p99_us=("latency_p99_us", "median"),
+    )
+    # 실패 수를 보고하지 않는 시나리오(kdf, encrypt 등)는 성공률이 없다
+    summary["success_rate"] = (1 - summary["failed"] / summary["records"]).where(summary["failed_reported"] > 0)
+    return summary.drop(columns="failed_reported")
+
+
+def over_time(frame, freq: Optional[str] = None):
+    """
+    시간 축으로 집계합니다. freq(pandas 주기 문자열, 예: 'h', 'D', 'W')를 주면 그 구간마다,
+    없으면 실행 시각마다 시나리오별 처리량 평균과 지연 시간 중앙값을 구합니다.
+    """
+    pd = _pandas()
+    time_key = pd.Grouper(key="timestamp", freq=freq) if freq else "timestamp"
+    grouped = frame.groupby([time_key, "scenario"], sort=True).agg(
+        records_per_s=("records_per_s", "mean"),
+        latency_p50_us=("latency_p50_us", "median"),
+        latency_p99_us=("latency_p99_us", "median"),
+    )
+    return grouped.dropna(how="all").reset_index()
+
+
+def _pick_font(preferred: Optional[str], log: Log) -> Optional[str]:
+    from matplotlib import font_manager
+
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    for name in ((preferred,) if preferred else ()) + KOREAN_FONT_CANDIDATES:
+        if name in installed:
+            return name
+    _log(log, "[!] 경고: 한글 폰트를 찾지 못해 기본 폰트로 그립니다. 한글이 네모로 보이면 "
+              "fonts-nanum 같은 폰트를 설치하거나 --font로 지정하세요.")
+    return None
+
+
+def _style(font: Optional[str]) -> Dict:
+    import matplotlib
+
+    try:
+        import seaborn
+        style = dict(seaborn.axes_style("whitegrid"))
+    except ImportError:
+        style = {"axes.grid": True, "grid.linestyle": "--", "grid.alpha": 0.6}
+    if font:
+        style["font.family"] = "sans-serif"
+        style["font.sans-serif"] = [font] + list(matplotlib.rcParams["font.sans-serif"])
+    style["axes.unicode_minus"] = False  # 마이너스 기호 깨짐 방지
+    return style
+
+
+def _plot_over_time(ax, timeline, column: str, linestyle: str = "-", label_suffix: str = "") -> None:
+    for scenario, group in timeline.groupby("scenario", sort=False):
+        group = group.dropna(subset=[column])
+        if not group.empty:
+            ax.plot(group["timestamp"], group[column], marker="o", markersize=3, linestyle=linestyle,
+                    label=f"{scenario}{label_suffix}")
+
+
+def render_report(frame, output_paths: Sequence[str], freq: Optional[str] = None, font: Optional[str] = None,
+                  title: str = "record_crypto 성능 보고서", log: Log = print) -> None:
+    """처리량 추이 / 지연 시간 추이 / 시나리오별 성공률 그래프를 그려서 output_paths(PNG, SVG 등)에 저장합니다."""
+    import matplotlib
+    from matplotlib import dates
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    timeline = over_time(frame, freq)
+    summary = summarize(frame)
+    with matplotlib.rc_context(_style(_pick_font(font, log))):
+        # pyplot을 거치지 않으므로 GUI 백엔드나 전역 상태가 전혀 필요 없다
+        figure = Figure(figsize=(14, 16), layout="constrained")
+        FigureCanvasAgg(figure)
+        figure.suptitle(title, fontsize=20)
+        throughput_ax, latency_ax, success_ax = figure.subplots(3, 1)
+
+        _plot_over_time(throughput_ax, timeline, "records_per_s")
+        throughput_ax.set_yscale("log")  # kdf(초당 몇 개)와 복호화(초당 수십만 개)를 한 축에
+        throughput_ax.set_title("시나리오별 처리량 추이")
+        throughput_ax.set_ylabel("레코드 / 초")
+
+        _plot_over_time(latency_ax, timeline, "latency_p50_us", "-", " p50")
+        _plot_over_time(latency_ax, timeline, "latency_p99_us", "--", " p99")
+        latency_ax.set_yscale("log")
+        latency_ax.set_title("레코드당 지연 시간 추이")
+        latency_ax.set_ylabel("마이크로초")
+
+        for ax in (throughput_ax, latency_ax):
+            ax.set_xlabel("실행 시각 (UTC)")
+            locator = dates.AutoDateLocator()
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(dates.ConciseDateFormatter(locator))
+            if ax.has_data():
+                ax.legend(loc="upper left", bbox_to_anchor=(1.01, 1), fontsize=9)
+
+        rates = summary["success_rate"].dropna() * 100
+        bars = success_ax.bar(rates.index, rates.values, color="skyblue", edgecolor="black")
+        for bar, rate in zip(bars, rates.values):
+            success_ax.text(bar.get_x() + bar.get_width() / 2, rate + 2, f"{rate:.1f}%", ha="center", va="bottom",
+                            color="purple", fontweight="bold")
+        success_ax.set_ylim(0, 110)
+        success_ax.set_title("시나리오별 복호화 성공률 (전체 실행 합계)")
+        success_ax.set_ylabel("성공률 (%)")
+        success_ax.set_xlabel("시나리오")
+
+        with warnings.catch_warnings():
+            # 한글 폰트가 없다는 경고는 위에서 한 번만 했으니, 글자마다 나오는 경고는 숨긴다
+            warnings.filterwarnings("ignore", message="Glyph .* missing from font")
+            for path in output_paths:
+                figure.savefig(path, dpi=120)
+                _log(log, f"[+] 성능 보고서가 '{path}' 파일로 저장되었습니다.")
+
+
+def build_report(input_paths: Sequence[str], output_paths: Sequence[str], freq: Optional[str] = None,
+                 font: Optional[str] = None, summary_path: Optional[str] = None, log: Log = print):
+    """입력 JSON들을 읽어 그래프를 저장하고, 시나리오별 요약 표(DataFrame)를 돌려줍니다."""
+    frame = load_runs(input_paths, log)
+    if frame.empty:
+        raise ValueError(f"오류: {list(input_paths)}에서 읽을 수 있는 bench 보고서나 계측 JSON이 없습니다.")
+    _log(log, f"[*] 실행 결과 {frame['source'].nunique()}개 파일에서 측정값 {len(frame)}개를 읽었습니다.")
+    render_report(frame, output_paths, freq=freq, font=font, log=log)
+    summary = summarize(frame)
+    if summary_path:
+        summary.to_csv(summary_path, encoding='utf-8')
+        _log(log, f"[+] 시나리오별 요약이 '{summary_path}' 파일로 저장되었습니다.")
+    return summary
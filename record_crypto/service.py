@@ -0,0 +1,201 @@
+"""
+레코드 복호화 조회용 상주 asyncio 서비스.
+
+조회할 때마다 서브프로세스로 스크립트를 띄우면 인터프리터 시작, cryptography import, 48만 회 KDF를
+매번 다시 치르게 됩니다. 이 서비스는 솔트/키/인덱스를 시작할 때 한 번만 준비해 두고,
+로컬 Unix 소켓(기본값, 만든 사용자만 접속 가능한 0600)으로 들어오는 요청을 처리합니다.
+TCP는 명시적으로 host를 지정할 때만 열며, 이때는 모든 요청에 공유 비밀 토큰("token")이 있어야 합니다.
+
+프로토콜: 한 줄에 JSON 하나 (요청/응답 모두 '\\n'으로 끝남)
+
+    요청  {"id": 1, "records": [0, 42, 99]}          # 레코드 번호(0부터)로 조회
+          {"id": 2, "tokens": ["gAAAAA...", ...]}     # 토큰을 직접 복호화
+          (토큰 인증을 켰다면 모든 요청에 "token": "<공유 비밀>"을 함께 보낸다)
+    응답  {"id": 1, "results": [{"index": 0, "plaintext": "..."},
+                                {"index": 42, "error": "InvalidToken"}, ...]}
+          {"id": 2, "error": "..."}                     # 요청 자체가 잘못된 경우
+
+복호화는 스레드 풀 executor에서 실행하고, 동시에 처리하는 배치 수는 세마포어로 제한합니다.
+한 연결에서는 응답을 다 보낸 뒤(drain)에야 다음 요청을 읽으므로 느린 클라이언트는 자연스럽게 역압(backpressure)을 받습니다.
+"""
+import asyncio
+import hmac
+import json
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from . import config
+from .engine import DecryptResult, decrypt_token, default_workers
+from .index import IndexedRecordStore, build_index, index_path_for
+from .keycheck import ensure_key_correct
+from .pipeline import Log, _log, load_key
+
+DEFAULT_MAX_CONCURRENCY = 64  # 동시에 처리할 수 있는 배치 수
+DEFAULT_MAX_BATCH = 10000  # 요청 하나에 담을 수 있는 레코드/토큰 수
+DEFAULT_TCP_PORT = 8765
+MAX_REQUEST_BYTES = 16 * 1024 * 1024  # 요청 한 줄의 최대 크기
+
+
+def _result_to_json(result: DecryptResult) -> Dict:
+    if result.ok:
+        return {"index": result.index, "plaintext": result.plaintext}
+    entry = {"index": result.index, "error": result.failure}
+    if result.message:
+        entry["message"] = result.message
+    return entry
+
+
+def _encode(response: Dict) -> bytes:
+    return json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n"
+
+
+class DecryptService:
+    """키와 인덱스를 한 번만 준비해 두고 배치 복호화 요청을 처리합니다."""
+
+    def __init__(self, password: str, encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                 salt_path: str = config.SALT_FILE_NAME, workers: Optional[int] = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, max_batch: int = DEFAULT_MAX_BATCH,
+                 log: Log = print, auth_token: Optional[str] = None):
+        from cryptography.fernet import Fernet
+
+        self._log = log
+        # 설정하면 모든 요청의 "token"이 이 값과 같아야 한다 (TCP로 열 때는 필수)
+        self._auth_token = auth_token.encode('utf-8') if auth_token else None
+        key = load_key(password, salt_path)
+        ensure_key_correct(encrypted_path, key)
+        if not os.path.exists(index_path_for(encrypted_path)):
+            _log(log, f"[*] 인덱스가 없어 '{index_path_for(encrypted_path)}'를 새로 만듭니다.")
+            build_index(encrypted_path)
+        self._store = IndexedRecordStore(encrypted_path, key)
+        self._fernet = Fernet(key)
+        self._executor = ThreadPoolExecutor(max_workers=workers or default_workers())
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._max_concurrency = max_concurrency
+        self.max_batch = max_batch
+
+    def _decrypt_tokens(self, tokens: List[str]) -> List[DecryptResult]:
+        return [decrypt_token(self._fernet, i, token.encode('ascii', 'replace')) for i, token in enumerate(tokens)]
+
+    def _authorized(self, request: Dict) -> bool:
+        if self._auth_token is None:
+            return True
+        token = request.get("token")
+        if not isinstance(token, str):
+            return False
+        return hmac.compare_digest(token.encode('utf-8'), self._auth_token)
+
+    async def handle_request(self, request: Dict) -> Dict:
+        """요청 하나(JSON 객체)를 처리하여 응답 객체를 돌려줍니다."""
+        response = {"id": request.get("id")}
+        if not self._authorized(request):
+            response["error"] = "인증 토큰이 없거나 틀렸습니다."
+            return response
+        if "records" in request:
+            items, work = request["records"], self._store.get_records
+            if not isinstance(items, list) or \
+                    not all(isinstance(n, int) and 0 <= n < len(self._store) for n in items):
+                response["error"] = f"records는 0 이상 {len(self._store)} 미만의 정수 목록이어야 합니다."
+                return response
+        elif "tokens" in request:
+            items, work = request["tokens"], self._decrypt_tokens
+            if not isinstance(items, list) or not all(isinstance(token, str) for token in items):
+                response["error"] = "tokens는 문자열 목록이어야 합니다."
+                return response
+        else:
+            response["error"] = "'records' 또는 'tokens' 중 하나가 필요합니다."
+            return response
+        if len(items) > self.max_batch:
+            response["error"] = f"요청 하나에 최대 {self.max_batch}개까지 보낼 수 있습니다."
+            return response
+
+        if self._semaphore is None:  # 이벤트 루프 안에서 만들어야 한다
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self._executor, work, items)
+        response["results"] = [_result_to_json(result) for result in results]
+        return response
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # 요청 한 줄이 MAX_REQUEST_BYTES를 넘음
+                    writer.write(_encode({"error": "요청이 너무 큽니다."}))
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("요청은 JSON 객체여야 합니다.")
+                except ValueError as e:
+                    response = {"error": f"잘못된 요청: {e}"}
+                else:
+                    response = await self.handle_request(request)
+                writer.write(_encode(response))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _start_unix_server(self, unix_path: str) -> asyncio.AbstractServer:
+        try:
+            st = os.lstat(unix_path)
+        except FileNotFoundError:
+            pass
+        else:
+            # 이전 실행이 남긴 소켓만 지운다. (경로를 잘못 주어 일반 파일을 지워버리지 않도록)
+            if not stat.S_ISSOCK(st.st_mode):
+                raise FileExistsError(f"'{unix_path}'는 소켓이 아닌 기존 파일입니다.")
+            os.remove(unix_path)
+        # bind가 만드는 소켓 파일이 처음부터 0600이 되도록 umask를 건다.
+        # (만든 뒤 chmod 하면 그 사이에 다른 사용자가 접속할 수 있다)
+        old_umask = os.umask(0o177)
+        try:
+            return await asyncio.start_unix_server(self.handle_connection, path=unix_path, limit=MAX_REQUEST_BYTES)
+        finally:
+            os.umask(old_umask)
+
+    async def serve(self, unix_path: str = config.SERVICE_SOCKET_FILE_NAME, host: Optional[str] = None,
+                    port: int = DEFAULT_TCP_PORT) -> None:
+        """
+        연결을 받기 시작하고, 취소될 때까지 계속 실행합니다.
+        host를 지정하면 Unix 소켓 대신 TCP로 열며, 이때는 auth_token이 반드시 설정되어 있어야 합니다.
+        """
+        if host is not None:
+            if self._auth_token is None:
+                raise ValueError("TCP로 열려면 인증 토큰이 필요합니다.")
+            server = await asyncio.start_server(self.handle_connection, host=host, port=port, limit=MAX_REQUEST_BYTES)
+            _log(self._log, f"[+] 복호화 서비스 시작: {host}:{port} (토큰 인증, 레코드 {len(self._store)}개)")
+        else:
+            server = await self._start_unix_server(unix_path)
+            _log(self._log, f"[+] 복호화 서비스 시작: unix:{unix_path} (레코드 {len(self._store)}개)")
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._store.close()
+
+
+def run_service(password: str, encrypted_path: str = config.ENCRYPTED_PER_RECORD_FILE_NAME,
+                salt_path: str = config.SALT_FILE_NAME, unix_path: str = config.SERVICE_SOCKET_FILE_NAME,
+                host: Optional[str] = None, port: int = DEFAULT_TCP_PORT, auth_token: Optional[str] = None,
+                workers: Optional[int] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                max_batch: int = DEFAULT_MAX_BATCH, log: Log = print) -> None:
+    """서비스를 만들고 Ctrl+C로 멈출 때까지 실행합니다. (host를 지정하면 토큰 인증 TCP)"""
+    if host is not None and not auth_token:
+        raise ValueError("TCP로 열려면 인증 토큰이 필요합니다.")
+    service = DecryptService(password, encrypted_path, salt_path, workers, max_concurrency, max_batch, log,
+                             auth_token=auth_token)
+    try:
+        asyncio.run(service.serve(unix_path, host, port))
+    except KeyboardInterrupt:
+        _log(log, "[*] 복호화 서비스를 종료합니다.")
+    finally:
+        service.close()
@@ -0,0 +1,445 @@
+"""
+여러 파일로 나눈(샤딩) 암호화 데이터셋.
+
+encrypted_records.bin 하나에 모든 레코드를 담으면 쓰는 프로세스도 하나뿐이고, 일부만 다시 처리할 수도 없습니다.
+여기서는 원본 CSV를 줄 경계에 맞춘 바이트 구간 N개로 나누어, 프로세스마다 샤드 파일을 하나씩 따로 암호화합니다.
+샤드 파일 하나하나는 기존과 같은 줄 단위 Fernet 토큰 파일(+ .idx, .kcv)이라 scan, IndexedRecordStore 등에 그대로 쓸 수 있습니다.
+
+디렉터리 구성:
+    manifest.json : KDF 파라미터(모든 샤드가 공유하는 솔트), 키 검증 태그, 전체 레코드 수,
+                    샤드별 파일 경로 / 첫 레코드 번호 / 레코드 수 / 바이트 수 / SHA-256
+    shard_<i>.bin : 샤드 i의 토큰 파일
+
+shard_dirs로 여러 디렉터리(디스크)를 주면 샤드 파일을 돌아가며 나누어 두고, manifest에는 상대 경로로 기록합니다.
+manifest는 모든 샤드를 다 쓰고 fsync 한 뒤 마지막에 원자적으로 기록하므로, 중간에 중단된 데이터셋은 읽히지 않습니다.
+manifest를 기록한 다음에는 예전 실행이 남긴(새 manifest에 없는) 샤드 파일을 지웁니다.
+
+복호화는 샤드마다 별도 프로세스가 '<결과 파일>.parts/' 아래에 부분 결과를 쓰고, 모두 끝나면 샤드 순서대로 이어 붙입니다.
+샤드 하나가 실패해도 나머지 샤드의 부분 결과는 남아 있으므로, 같은 명령을 다시 실행하면 실패한 샤드만 다시 처리합니다.
+부분 결과의 완료 표시에는 샤드의 SHA-256과 함께 키 검증 태그와 옵션(verify_all 등)을 기록해 두므로,
+다른 비밀번호나 옵션으로 다시 실행하면 예전 부분 결과를 쓰지 않고 새로 복호화합니다.
+"""
+import base64
+import csv
+import hashlib
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from . import config, metrics
+from .engine import FAILURE_INVALID_TOKEN, default_workers
+from .index import IndexWriter, index_path_for
+from .kdf import DEFAULT_ITERATIONS, derive_key
+from .keycheck import WrongKeyError, fernet_key_tag, key_check_path_for, tags_match, write_key_check
+from .output import FAILURE_SIDECAR_SUFFIX, OutputCounts, write_results
+from .pipeline import Log, RunSummary, _log, _require_file, strip_line_end, write_token_stream
+from .reader import decrypt_file
+
+MANIFEST_FILE_NAME = "manifest.json"
+SHARDS_FORMAT = "record_crypto-shards"
+SHARDS_VERSION = 1
+PARTS_SUFFIX = ".parts"  # 복호화 중인 샤드별 부분 결과 디렉터리
+_HASH_BLOCK_SIZE = 1024 * 1024
+_SHARD_FILE_PATTERN = re.compile(r"shard_\d{5,}\.bin")
+
+
+class ShardInfo(NamedTuple):
+    path: str  # 샤드 파일 경로 (manifest 기준 상대 경로를 풀어 놓은 것)
+    first_record: int  # 이 샤드 첫 레코드의 전체 데이터셋 기준 번호 (0부터)
+    records: int
+    size: int
+    sha256: str
+
+
+def shard_file_name(shard: int) -> str:
+    return f"shard_{shard:05d}.bin"
+
+
+def file_digest(path: str) -> Tuple[str, int, int]:
+    """파일의 (SHA-256 hex, 바이트 수, 줄 수)를 한 번 읽어서 구합니다. (토큰 파일의 줄 수 = 레코드 수)"""
+    digest = hashlib.sha256()
+    size = lines = 0
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(_HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            size += len(block)
+            lines += block.count(b'\n')
+    return digest.hexdigest(), size, lines
+
+
+def _line_aligned_ranges(path: str, shards: int) -> List[Tuple[int, int]]:
+    """파일을 바이트 기준으로 거의 같은 크기의 구간 shards개로 나누되, 경계를 줄 시작 위치에 맞춥니다."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, shards):
+            position = size * i // shards
+            if position <= bounds[-1]:
+                continue
+            f.seek(position - 1)
+            f.readline()  # position-1이 줄 끝이면 그대로 position, 아니면 다음 줄 시작으로
+            if bounds[-1] < f.tell() < size:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _raw_records(raw_path: str, start: int, end: int) -> Iterator[bytes]:
+    """
+    원본 CSV의 [start, end) 구간을 줄 단위 레코드(bytes)로 돌려줍니다.
+    (텍스트 모드로 읽는 encrypt_csv와 같게 줄 끝의 '\\n'과 '\\r\\n'을 떼어낸다)
+    """
+    with open(raw_path, 'rb', buffering=config.READ_BUFFER_SIZE) as raw_file:
+        raw_file.seek(start)
+        position = start
+        for line in raw_file:
+            position += len(line)
+            yield strip_line_end(line)
+            if position >= end:
+                return
+
+
+def _encrypt_shard(raw_path: str, start: int, end: int, shard_path: str, key: bytes) -> Tuple[int, int, str]:
+    """워커 프로세스에서 원본 구간 하나를 샤드 파일로 암호화하고 (레코드 수, 바이트 수, SHA-256)을 돌려줍니다."""
+    write_key_check(shard_path, key)
+    with open(shard_path, 'wb', buffering=config.WRITE_BUFFER_SIZE) as output_file:
+        index_writer = IndexWriter(index_path_for(shard_path))
+        try:
+            count = write_token_stream(key, _raw_records(raw_path, start, end), output_file, index_writer, workers=1)
+            # manifest는 샤드가 디스크에 닿은 뒤에만 기록되어야 한다
+            output_file.flush()
+            os.fsync(output_file.fileno())
+        finally:
+            index_writer.close(fsync=True)
+    sha256, size, _ = file_digest(shard_path)
+    return count, size, sha256
+
+
+def _run_per_shard(func, jobs: Sequence[tuple], workers: int) -> Iterator[Tuple[int, object, Optional[Exception]]]:
+    """
+    샤드마다 func(*job)을 별도 프로세스에서 실행하고, 끝나는 순서대로 (job 번호, 결과, 예외)를 돌려줍니다.
+    한 샤드의 예외가 다른 샤드의 처리를 멈추지 않습니다.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        for number, job in enumerate(jobs):
+            try:
+                with metrics.suspended():  # 워커 프로세스에서처럼 안쪽 단계는 따로 집계하지 않는다
+                    result = func(*job)
+            except Exception as e:
+                yield number, None, e
+            else:
+                yield number, result, None
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = {executor.submit(func, *job): number for number, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], None if error else future.result(), error
+
+
+def _write_manifest(directory: str, manifest: Dict) -> None:
+    path = os.path.join(directory, MANIFEST_FILE_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _listed_shard_paths(directory: str) -> List[str]:
+    """기존 manifest에 적힌 샤드 파일 경로들. (manifest가 없거나 읽을 수 없으면 빈 목록)"""
+    try:
+        return [shard.path for shard in ShardedDataset(directory).shards]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def _remove_stale_shards(candidates: Sequence[str], directories: Sequence[str], keep: Sequence[str]) -> List[str]:
+    """
+    예전 manifest에 있던 샤드와 directories 안의 shard_<i>.bin 중 keep에 없는 것을 사이드카(.idx, .kcv)와 함께 지우고,
+    지운 샤드 파일 경로를 돌려줍니다. (샤드 수를 줄여 다시 암호화했을 때 예전 키로 만든 파일이 남지 않도록)
+    """
+    stale = set(candidates)
+    for directory in directories:
+        stale.update(os.path.join(directory, name) for name in os.listdir(directory)
+                     if _SHARD_FILE_PATTERN.fullmatch(name))
+    keep = {os.path.abspath(path) for path in keep}
+    removed = []
+    for path in sorted(stale):
+        if os.path.abspath(path) in keep:
+            continue
+        for leftover in (path, index_path_for(path), key_check_path_for(path)):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        removed.append(path)
+    return removed
+
+
+def encrypt_csv_sharded(password: str, raw_path: str = config.RAW_DATA_FILE_NAME,
+                        output_dir: str = config.SHARD_DIR_NAME, shards: int = config.SHARD_COUNT,
+                        shard_dirs: Optional[Sequence[str]] = None, workers: Optional[int] = None,
+                        iterations: int = DEFAULT_ITERATIONS, log: Log = print) -> int:
+    """
+    원본 CSV의 모든 줄(헤더 포함)을 샤드 파일 최대 shards개로 나누어 병렬 암호화하고, 전체 레코드 수를 돌려줍니다.
+
+    모든 샤드는 새 무작위 솔트 하나로 파생한 같은 키를 쓰며, 솔트는 manifest에 저장됩니다.
+    """
+    _require_file(raw_path, "원본 파일")
+    if shards < 1:
+        raise ValueError("오류: 샤드 수는 1 이상이어야 합니다.")
+    ranges = _line_aligned_ranges(raw_path, shards)
+    if not ranges:
+        raise ValueError(f"오류: '{raw_path}' 파일이 비어 있습니다.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+    previous_shards = _listed_shard_paths(output_dir)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # 다 쓰기 전까지는 읽을 수 없는 상태로 둔다
+    shard_dirs = list(shard_dirs or [output_dir])
+    for directory in shard_dirs:
+        os.makedirs(directory, exist_ok=True)
+
+    salt = os.urandom(16)
+    with metrics.stage("derive_key"):
+        key = derive_key(password, salt, iterations)
+    _log(log, f"[*] 암호화 키 파생 완료. 원본을 샤드 {len(ranges)}개로 나누어 암호화합니다.")
+
+    shard_paths = [os.path.join(shard_dirs[i % len(shard_dirs)], shard_file_name(i)) for i in range(len(ranges))]
+    jobs = [(raw_path, start, end, shard_path, key) for (start, end), shard_path in zip(ranges, shard_paths)]
+    results: Dict[int, Tuple[int, int, str]] = {}
+    errors: Dict[int, Exception] = {}
+    with metrics.stage("encrypt"):
+        for shard, result, error in _run_per_shard(_encrypt_shard, jobs, workers or default_workers()):
+            if error is not None:
+                errors[shard] = error
+                _log(log, f"[!] 샤드 {shard} 암호화 실패: {type(error).__name__} - {error}")
+            else:
+                results[shard] = result
+    if errors:
+        raise ValueError(f"오류: 샤드 {sorted(errors)} 암호화에 실패했습니다. (manifest는 기록하지 않음)")
+
+    entries = []
+    first_record = 0
+    for shard, shard_path in enumerate(shard_paths):
+        records, size, sha256 = results[shard]
+        entries.append({"file": os.path.relpath(shard_path, output_dir), "first_record": first_record,
+                        "records": records, "bytes": size, "sha256": sha256})
+        first_record += records
+    _write_manifest(output_dir, {
+        "format": SHARDS_FORMAT,
+        "version": SHARDS_VERSION,
+        "kdf": {"name": "pbkdf2-sha256", "iterations": iterations, "salt": base64.b64encode(salt).decode('ascii')},
+        "key_check": fernet_key_tag(key).hex(),
+        "records": first_record,
+        "shards": entries,
+    })
+    stale = _remove_stale_shards(previous_shards, sorted(set(shard_dirs + [output_dir])), shard_paths)
+    if stale:
+        _log(log, f"[*] 새 manifest에 없는 예전 샤드 파일 {len(stale)}개를 지웠습니다.")
+    metrics.count("records", first_record, result="encrypted")
+    _log(log, f"[+] 총 {first_record}개의 레코드를 샤드 {len(entries)}개로 나누어 암호화 완료.")
+    _log(log, f"[+] 샤드 목록과 KDF 파라미터가 '{manifest_path}' 파일로 저장되었습니다.")
+    return first_record
+
+
+class ShardedDataset:
+    """manifest.json으로 샤드 데이터셋을 엽니다."""
+
+    def __init__(self, directory: str = config.SHARD_DIR_NAME):
+        self.directory = directory
+        manifest_path = os.path.join(directory, MANIFEST_FILE_NAME)
+        _require_file(manifest_path, "샤드 데이터셋 manifest")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("format") != SHARDS_FORMAT or manifest.get("version") != SHARDS_VERSION:
+            raise ValueError(f"오류: '{directory}'는 지원하지 않는 샤드 데이터셋입니다. "
+                             f"(format={manifest.get('format')}, version={manifest.get('version')}).")
+        self.salt = base64.b64decode(manifest["kdf"]["salt"])
+        self.iterations = manifest["kdf"]["iterations"]
+        self.key_check = bytes.fromhex(manifest["key_check"])
+        self.records = manifest["records"]
+        self.shards = [ShardInfo(os.path.normpath(os.path.join(directory, entry["file"])), entry["first_record"],
+                                 entry["records"], entry["bytes"], entry["sha256"]) for entry in manifest["shards"]]
+
+    def __len__(self) -> int:
+        return self.records
+
+    def derive_key(self, password: str) -> bytes:
+        with metrics.stage("derive_key"):
+            return derive_key(password, self.salt, self.iterations)
+
+    def is_key_correct(self, key: bytes) -> bool:
+        return tags_match(self.key_check, fernet_key_tag(key))
+
+    def unlock(self, password: str) -> bytes:
+        """비밀번호로 키를 파생하고, 틀리면 WrongKeyError를 발생시킵니다."""
+        key = self.derive_key(password)
+        if not self.is_key_correct(key):
+            raise WrongKeyError(f"오류: '{self.directory}'를 암호화할 때 사용한 비밀번호와 다릅니다. (키 검증 실패)")
+        return key
+
+
+def _check_shard(shard: ShardInfo) -> Optional[str]:
+    """샤드 파일 하나를 manifest와 대조하여, 문제가 있으면 그 사유를 돌려줍니다."""
+    if not os.path.exists(shard.path):
+        return "파일 없음"
+    sha256, size, lines = file_digest(shard.path)
+    if size != shard.size:
+        return f"크기 불일치 ({size} != {shard.size}바이트)"
+    if lines != shard.records:
+        return f"레코드 수 불일치 ({lines} != {shard.records})"
+    if sha256 != shard.sha256:
+        return "SHA-256 불일치 (내용 변조 또는 손상)"
+    return None
+
+
+def verify_shards(directory: str = config.SHARD_DIR_NAME, workers: Optional[int] = None,
+                  log: Log = print) -> Dict[int, str]:
+    """
+    모든 샤드의 크기 / 레코드 수 / SHA-256을 manifest와 병렬로 대조합니다. (키 불필요)
+    문제가 있는 샤드의 {샤드 번호: 사유}를 돌려줍니다.
+    """
+    dataset = ShardedDataset(directory)
+    problems: Dict[int, str] = {}
+    jobs = [(shard,) for shard in dataset.shards]
+    for number, reason, error in _run_per_shard(_check_shard, jobs, workers or default_workers()):
+        if error is not None:
+            reason = f"{type(error).__name__} - {error}"
+        if reason is not None:
+            problems[number] = reason
+            _log(log, f"[!] 샤드 {number} ('{dataset.shards[number].path}') 검증 실패: {reason}")
+    _log(log, f"[*] 샤드 {len(dataset.shards)}개 중 {len(dataset.shards) - len(problems)}개가 manifest와 일치합니다.")
+    return dict(sorted(problems.items()))
+
+
+def _part_paths(parts_dir: str, shard: int) -> Tuple[str, str, str]:
+    base = os.path.join(parts_dir, f"shard_{shard:05d}")
+    return base + ".csv", base + ".csv" + FAILURE_SIDECAR_SUFFIX, base + ".done.json"
+
+
+def _fsync_path(path: str) -> None:
+    with open(path, 'r+b') as f:
+        os.fsync(f.fileno())
+
+
+def _marker_options(key: bytes, verify_all: bool, failure_label: str) -> Dict[str, object]:
+    """부분 결과를 만든 조건. 완료 표시에 함께 기록하고, 다시 실행할 때 하나라도 다르면 그 부분 결과를 버린다."""
+    # 감사 모드에서는 틀린 키로도 '완료'되므로, 키 검증 태그가 다르면 결과도 다르다
+    return {"key_check": fernet_key_tag(key).hex(), "verify_all": verify_all, "failure_label": failure_label}
+
+
+def _load_done_marker(marker_path: str, shard: ShardInfo, options: Dict[str, object]) -> Optional[OutputCounts]:
+    """같은 샤드(SHA-256 일치)를 같은 키와 옵션으로 이미 끝까지 처리해 둔 부분 결과가 있으면 그 집계를 돌려줍니다."""
+    if not os.path.exists(marker_path):
+        return None
+    with open(marker_path, 'r', encoding='utf-8') as f:
+        marker = json.load(f)
+    if marker.get("sha256") != shard.sha256 or any(marker.get(name) != value for name, value in options.items()):
+        return None
+    return OutputCounts(marker["total"], marker["invalid"], marker["errors"])
+
+
+def _decrypt_shard(shard: ShardInfo, key: bytes, parts_dir: str, shard_number: int,
+                   failure_label: str, options: Dict[str, object]) -> OutputCounts:
+    """워커 프로세스에서 샤드 하나를 부분 결과 파일로 복호화하고, 끝나면 완료 표시를 남깁니다."""
+    part_path, failure_path, marker_path = _part_paths(parts_dir, shard_number)
+    _require_file(shard.path, f"샤드 {shard_number} 파일")
+    counts = write_results(decrypt_file(shard.path, key, workers=1), part_path, failure_path, failure_label)
+    if counts.total != shard.records:
+        raise ValueError(f"오류: 샤드 {shard_number}의 레코드 수가 manifest와 다릅니다. "
+                         f"({counts.total} != {shard.records}, 파일이 잘렸거나 바뀌었습니다)")
+    # 완료 표시는 부분 결과가 디스크에 닿은 뒤에만 남긴다
+    _fsync_path(part_path)
+    _fsync_path(failure_path)
+    tmp_path = marker_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"sha256": shard.sha256, **options, **counts._asdict()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, marker_path)
+    return counts
+
+
+def _merge_parts(dataset: ShardedDataset, parts_dir: str, output_path: str, failure_label: str) -> None:
+    """샤드별 부분 결과를 샤드 순서대로 이어 붙이고, 실패 목록의 레코드 번호는 전체 데이터셋 기준으로 바꿉니다."""
+    with open(output_path, 'wb') as output_file, \
+            open(output_path + FAILURE_SIDECAR_SUFFIX, 'w', encoding='utf-8', newline='') as failure_file:
+        failure_writer = csv.writer(failure_file)
+        failure_writer.writerow(("record", "failure", "reason"))
+        for number, shard in enumerate(dataset.shards):
+            part_path, failure_path, _ = _part_paths(parts_dir, number)
+            with open(part_path, 'rb') as part_file:
+                shutil.copyfileobj(part_file, output_file, config.WRITE_BUFFER_SIZE)
+            with open(failure_path, 'r', encoding='utf-8', newline='') as part_failures:
+                rows = csv.reader(part_failures)
+                next(rows, None)
+                for record, failure, reason in rows:
+                    failure_writer.writerow((int(record) + shard.first_record, failure, reason or failure_label))
+
+
+def decrypt_sharded(password: str, directory: str = config.SHARD_DIR_NAME,
+                    output_path: str = config.DECRYPTED_NORMAL_OUTPUT_FILE_NAME, workers: Optional[int] = None,
+                    verify_all: bool = False, log: Log = print) -> RunSummary:
+    """
+    샤드들을 여러 프로세스에서 동시에 복호화하고, 결과를 원래 레코드 순서대로 합쳐 CSV로 저장합니다.
+
+    샤드 하나라도 실패하면 ValueError로 중단하지만 다른 샤드의 부분 결과는 남겨 두므로,
+    다시 실행하면 실패한(또는 아직 안 끝난) 샤드만 처리합니다.
+    verify_all=True(감사 모드)이면 키 검증을 건너뛰고 모든 레코드를 직접 시도합니다.
+    """
+    dataset = ShardedDataset(directory)
+    key = dataset.derive_key(password) if verify_all else dataset.unlock(password)
+    failure_label = "손상된 레코드"
+    parts_dir = output_path + PARTS_SUFFIX
+    os.makedirs(parts_dir, exist_ok=True)
+    options = _marker_options(key, verify_all, failure_label)
+
+    shard_counts: Dict[int, OutputCounts] = {}
+    jobs, job_shards = [], []
+    for number, shard in enumerate(dataset.shards):
+        done = _load_done_marker(_part_paths(parts_dir, number)[2], shard, options)
+        if done is not None:
+            shard_counts[number] = done
+        else:
+            jobs.append((shard, key, parts_dir, number, failure_label, options))
+            job_shards.append(number)
+    if shard_counts:
+        _log(log, f"[*] 이미 복호화가 끝난 샤드 {len(shard_counts)}개는 건너뛰고, 남은 샤드 {len(jobs)}개만 처리합니다.")
+
+    failed_shards = []
+    with metrics.stage("decrypt"):
+        for job, counts, error in _run_per_shard(_decrypt_shard, jobs, workers or default_workers()):
+            number = job_shards[job]
+            if error is not None:
+                failed_shards.append(number)
+                _log(log, f"[!] 샤드 {number} 복호화 실패: {type(error).__name__} - {error}")
+            else:
+                shard_counts[number] = counts
+    if failed_shards:
+        raise ValueError(f"오류: 샤드 {sorted(failed_shards)} 복호화에 실패했습니다. "
+                         f"같은 명령을 다시 실행하면 실패한 샤드만 다시 처리합니다. (부분 결과: '{parts_dir}')")
+
+    with metrics.stage("csv_write"):
+        _merge_parts(dataset, parts_dir, output_path, failure_label)
+    shutil.rmtree(parts_dir)
+
+    total = sum(counts.total for counts in shard_counts.values())
+    invalid = sum(counts.invalid for counts in shard_counts.values())
+    errors = sum(counts.errors for counts in shard_counts.values())
+    failed = invalid + errors
+    metrics.count("records", total - failed, result="ok")
+    metrics.count("records", invalid, result=FAILURE_INVALID_TOKEN)
+    metrics.count("records", errors, result="error")
+    _log(log, f"[+] 샤드 {len(dataset.shards)}개에서 총 {total - failed}개의 레코드를 성공적으로 복호화 완료.")
+    if failed:
+        _log(log, f"[!] {failed}개의 레코드 복호화에 실패했습니다. (실패 목록: '{output_path + FAILURE_SIDECAR_SUFFIX}')")
+    _log(log, f"[+] 복호화된 개인 정보가 '{output_path}' 파일로 저장되었습니다.")
+    return RunSummary(total, total - failed, failed)
@@ -0,0 +1,62 @@
+"""
+record_crypto 테스트 공용 픽스처.
+
+PBKDF2(480,000회)가 테스트마다 돌면 느리므로, 암호화는 되도록 한 번만 하고 결과 파일을 복사해서 씁니다.
+모든 테스트는 tmp_path 아래에서만 파일을 만들고, 워커는 1개(현재 프로세스)로 돌립니다.
+"""
+import os
+import shutil
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from record_crypto import config  # noqa: E402
+from record_crypto.bench import generate_synthetic_csv  # noqa: E402
+
+PASSWORD = "test-password"
+WRONG_PASSWORD = "wrong-password"
+ROWS = 200  # 헤더 줄을 빼고 만든 데이터 행 수
+
+
+def dataset_paths(directory) -> SimpleNamespace:
+    directory = str(directory)
+    return SimpleNamespace(
+        directory=directory,
+        raw=os.path.join(directory, config.RAW_DATA_FILE_NAME),
+        encrypted=os.path.join(directory, config.ENCRYPTED_PER_RECORD_FILE_NAME),
+        salt=os.path.join(directory, config.SALT_FILE_NAME),
+        output=os.path.join(directory, config.DECRYPTED_NORMAL_OUTPUT_FILE_NAME),
+    )
+
+
+@pytest.fixture
+def raw_csv(tmp_path) -> SimpleNamespace:
+    """가짜 개인정보 CSV(헤더 + ROWS행)만 있는 데이터셋 경로."""
+    paths = dataset_paths(tmp_path)
+    generate_synthetic_csv(paths.raw, ROWS, seed=7)
+    return paths
+
+
+@pytest.fixture(scope="session")
+def _encrypted_template(tmp_path_factory) -> SimpleNamespace:
+    from record_crypto.pipeline import encrypt_csv
+
+    paths = dataset_paths(tmp_path_factory.mktemp("encrypted"))
+    generate_synthetic_csv(paths.raw, ROWS, seed=7)
+    encrypt_csv(PASSWORD, paths.raw, paths.encrypted, paths.salt, workers=1, log=None)
+    return paths
+
+
+@pytest.fixture
+def encrypted(_encrypted_template, tmp_path) -> SimpleNamespace:
+    """encrypt_csv로 한 번 암호화해 둔 데이터셋(원본, 토큰 파일, 솔트, 사이드카)의 테스트별 복사본."""
+    for name in os.listdir(_encrypted_template.directory):
+        shutil.copy2(os.path.join(_encrypted_template.directory, name), tmp_path)
+    return dataset_paths(tmp_path)
+
+
+def read_lines(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().splitlines()
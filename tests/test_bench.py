@@ -0,0 +1,17 @@
+from record_crypto.bench import run_scenarios
+
+FAST_ITERATIONS = 1000
+
+
+def test_run_scenarios_reports_per_scenario_rss(tmp_path):
+    results = run_scenarios(50, str(tmp_path), workers=1, iterations=FAST_ITERATIONS)
+    assert [result["scenario"] for result in results] == [
+        "kdf", "encrypt", "decrypt", "corrupted-decrypt", "wrong-key", "wrong-key-check"]
+    by_name = {result["scenario"]: result for result in results}
+    assert by_name["decrypt"]["failed"] == 0
+    assert by_name["wrong-key"]["failed"] == 51
+    assert by_name["wrong-key-check"]["rejected"] is True
+    assert all("key" not in result for result in results)
+    # 시나리오마다 새 프로세스에서 재므로 누적값 표시 없이 그 시나리오의 값만 남는다
+    assert all(set(result["peak_rss_bytes"]) == {"self", "children"} for result in results)
+    assert list(tmp_path.iterdir()) == []
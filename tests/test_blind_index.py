@@ -0,0 +1,105 @@
+import os
+import shutil
+
+import pytest
+
+from record_crypto.blind_index import BlindIndexBuilder, blind_index_paths, build_blind_indexes, lookup_records
+from record_crypto.incremental import encrypt_incremental
+from record_crypto.pipeline import encrypt_csv, load_key
+from record_crypto.rekey import rekey
+
+from conftest import PASSWORD, read_lines
+
+COLUMNS = ["이메일", "전화번호"]
+
+
+@pytest.fixture
+def indexed(encrypted):
+    build_blind_indexes(load_key(PASSWORD, encrypted.salt), COLUMNS, encrypted.encrypted, workers=1, log=None)
+    return encrypted
+
+
+def _rows(raw_path):
+    return read_lines(raw_path)[1:]
+
+
+def test_lookup_finds_matching_records(indexed):
+    row = _rows(indexed.raw)[42]
+    email, phone = row.split(",")[3], row.split(",")[2]
+    matches = lookup_records(PASSWORD, "이메일", f"  {email.upper()} ", indexed.encrypted, indexed.salt)
+    assert row in [match.plaintext for match in matches]
+    assert all(match.plaintext.split(",")[3] == email for match in matches)
+    matches = lookup_records(PASSWORD, "전화번호", phone.replace("-", ""), indexed.encrypted, indexed.salt)
+    assert row in [match.plaintext for match in matches]
+    assert lookup_records(PASSWORD, "이메일", "nobody@example.com", indexed.encrypted, indexed.salt) == []
+
+
+def test_spilled_runs_match_in_memory_build(indexed):
+    key = load_key(PASSWORD, indexed.salt)
+    lines = read_lines(indexed.raw)
+    expected = {}
+    for path in blind_index_paths(indexed.encrypted):
+        with open(path, 'rb') as f:
+            expected[path] = f.read()
+
+    builder = BlindIndexBuilder(key, COLUMNS, run_entries=16, tmp_dir=indexed.directory)
+    for number, line in enumerate(lines):
+        builder.add(number, line)
+    assert sorted(builder.write(indexed.encrypted)) == sorted(expected)
+    for path, data in expected.items():
+        with open(path, 'rb') as f:
+            assert f.read() == data
+
+
+def test_rekey_and_incremental_append_remove_stale_indexes(indexed):
+    assert len(blind_index_paths(indexed.encrypted)) == len(COLUMNS)
+    rekey(PASSWORD, "new-password", indexed.encrypted, indexed.salt, workers=1, log=None)
+    assert blind_index_paths(indexed.encrypted) == []
+
+    build_blind_indexes(load_key("new-password", indexed.salt), COLUMNS, indexed.encrypted, workers=1, log=None)
+    with open(indexed.raw, 'a', encoding='utf-8') as f:
+        f.write("홍길동,서울특별시 강남구,010-1234-5678,hong@naver.com,40,남,850101-1234567,신한 110-123-456789\n")
+    result = encrypt_incremental("new-password", indexed.raw, indexed.encrypted, indexed.salt, workers=1, log=None)
+    assert result.new_records == 1
+    assert blind_index_paths(indexed.encrypted) == []
+
+
+def _snapshot(directory):
+    snapshot = {}
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as f:
+            snapshot[name] = f.read()
+    return snapshot
+
+
+def test_unknown_column_leaves_existing_dataset_untouched(indexed):
+    before = _snapshot(indexed.directory)
+    with pytest.raises(ValueError):
+        encrypt_csv(PASSWORD, indexed.raw, indexed.encrypted, indexed.salt, workers=1, log=None,
+                    blind_index_columns=["이메일주소"])
+    assert _snapshot(indexed.directory) == before
+
+
+def test_failed_encrypt_leaves_existing_dataset_untouched(indexed, monkeypatch):
+    from record_crypto import pipeline
+
+    def fail(*args, **kwargs):
+        raise OSError("디스크가 가득 찼습니다")
+
+    before = _snapshot(indexed.directory)
+    monkeypatch.setattr(pipeline, "write_token_stream", fail)
+    with pytest.raises(OSError):
+        encrypt_csv(PASSWORD, indexed.raw, indexed.encrypted, indexed.salt, workers=1, log=None,
+                    blind_index_columns=COLUMNS)
+    assert _snapshot(indexed.directory) == before
+
+
+def test_sibling_dataset_indexes_are_not_touched(indexed):
+    sibling = indexed.encrypted + ".v2"
+    shutil.copyfile(indexed.encrypted, sibling)
+    sibling_paths = build_blind_indexes(load_key(PASSWORD, indexed.salt), COLUMNS, sibling, workers=1, log=None)
+    assert sorted(blind_index_paths(indexed.encrypted)) == sorted(
+        indexed.encrypted + f".{column}.bidx" for column in COLUMNS)
+    rekey(PASSWORD, "new-password", indexed.encrypted, indexed.salt, workers=1, log=None)
+    assert blind_index_paths(indexed.encrypted) == []
+    assert all(os.path.exists(path) for path in sibling_paths)
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from record_crypto.blocks import BlockReader, BlockWriter, blocks_to_csv, encrypt_csv_blocks
+from record_crypto.engine import FAILURE_INVALID_TOKEN
+from record_crypto.index import index_path_for
+from record_crypto.keycheck import WrongKeyError
+
+from conftest import PASSWORD, ROWS, WRONG_PASSWORD, read_lines
+
+FAST_ITERATIONS = 1000
+BLOCK_RECORDS = 64
+
+
+@pytest.fixture
+def block_file(raw_csv):
+    path = os.path.join(raw_csv.directory, "records.rcz")
+    encrypt_csv_blocks(PASSWORD, raw_csv.raw, path, block_records=BLOCK_RECORDS, iterations=FAST_ITERATIONS,
+                       log=None)
+    return path
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_round_trip(raw_csv, block_file, workers):
+    output = os.path.join(raw_csv.directory, "decrypted.csv")
+    succeeded, failed = blocks_to_csv(PASSWORD, block_file, output, workers=workers, log=None)
+    assert (succeeded, failed) == (ROWS + 1, 0)
+    assert read_lines(output) == read_lines(raw_csv.raw)
+
+
+def test_random_access(raw_csv, block_file):
+    lines = read_lines(raw_csv.raw)
+    with BlockReader(block_file) as reader:
+        reader.unlock(PASSWORD)
+        assert reader.records == len(lines)
+        for n in (0, 1, BLOCK_RECORDS, len(lines) - 1):
+            assert reader.get_record(n) == lines[n]
+
+
+def test_wrong_password_is_rejected(block_file):
+    with BlockReader(block_file) as reader:
+        with pytest.raises(WrongKeyError):
+            reader.unlock(WRONG_PASSWORD)
+
+
+def test_corrupt_last_block_counts_only_its_records(block_file):
+    with open(block_file, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0x01]))
+    with BlockReader(block_file) as reader:
+        reader.unlock(PASSWORD)
+        results = list(reader.decrypt_all())
+    failed = [result for result in results if not result.ok]
+    assert len(results) == ROWS + 1
+    assert len(failed) == (ROWS + 1) % BLOCK_RECORDS
+    assert all(result.failure == FAILURE_INVALID_TOKEN for result in failed)
+
+
+def test_failed_write_leaves_no_file(tmp_path):
+    path = str(tmp_path / "records.rcz")
+    with pytest.raises(RuntimeError):
+        with BlockWriter.create(path, PASSWORD, iterations=FAST_ITERATIONS) as writer:
+            writer.write(b"first")
+            raise RuntimeError("중단")
+    assert sorted(os.listdir(tmp_path)) == []
+    assert not os.path.exists(index_path_for(path))
+
+
+def test_only_the_current_version_is_accepted(block_file):
+    with open(block_file, 'r+b') as f:
+        f.seek(4)  # MAGIC 바로 뒤의 version 바이트
+        f.write(bytes([1]))
+    with pytest.raises(ValueError):
+        BlockReader(block_file)
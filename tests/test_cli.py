@@ -0,0 +1,39 @@
+import json
+import os
+
+import pytest
+
+from record_crypto.cli import build_parser, main
+
+from conftest import PASSWORD, ROWS, read_lines
+
+
+@pytest.mark.parametrize("argv", [
+    ["--metrics-json", "m.json", "--trace-memory", "decrypt", "--password", "x"],
+    ["decrypt", "--password", "x", "--metrics-json", "m.json", "--trace-memory"],
+])
+def test_global_options_before_or_after_subcommand(argv):
+    args = build_parser().parse_args(argv)
+    assert (args.command, args.metrics_json, args.trace_memory, args.profile) == ("decrypt", "m.json", True, None)
+
+
+def test_global_option_after_subcommand_does_not_reset_earlier_one():
+    args = build_parser().parse_args(["--metrics-json", "m.json", "decrypt", "--password", "x"])
+    assert args.metrics_json == "m.json"
+
+
+def test_wrapper_style_argv_with_metrics(raw_csv):
+    # "Hacking project.py" / "복호화 과정.py"처럼 서브커맨드와 비밀번호 뒤에 사용자 옵션이 붙는 경우
+    metrics_path = os.path.join(raw_csv.directory, "metrics.json")
+    common = ["--encrypted-file", raw_csv.encrypted, "--salt-file", raw_csv.salt, "--workers", "1"]
+    assert main(["encrypt", "--password", PASSWORD, "--input", raw_csv.raw, *common]) == 0
+    assert main(["decrypt", "--password", PASSWORD, "--output", raw_csv.output, *common,
+                 "--metrics-json", metrics_path]) == 0
+
+    assert read_lines(raw_csv.output) == read_lines(raw_csv.raw)
+    with open(metrics_path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    assert document["command"] == "decrypt"
+    ok = [counter for counter in document["counters"]
+          if counter["name"] == "records" and counter["labels"].get("result") == "ok"]
+    assert ok[0]["value"] == ROWS + 1
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from record_crypto.columnar import MANIFEST_FILE_NAME, ColumnarReader, ColumnarWriter, encrypt_csv_columnar
+from record_crypto.keycheck import WrongKeyError
+
+from conftest import PASSWORD, ROWS, WRONG_PASSWORD, read_lines
+
+FAST_ITERATIONS = 1000
+
+
+def test_round_trip_with_selective_columns(raw_csv):
+    output_dir = os.path.join(raw_csv.directory, "columns")
+    count = encrypt_csv_columnar(PASSWORD, raw_csv.raw, output_dir, iterations=FAST_ITERATIONS, row_group_size=64,
+                                 log=None)
+    assert count == ROWS
+    rows = [line.split(",") for line in read_lines(raw_csv.raw)[1:]]
+
+    reader = ColumnarReader(output_dir)
+    assert reader.read_column("나이") == [row[4] for row in rows]  # 평문 컬럼은 비밀번호 없이 읽힌다
+    with pytest.raises(RuntimeError):
+        reader.read_column("이메일")
+    with pytest.raises(WrongKeyError):
+        reader.unlock(WRONG_PASSWORD)
+    reader.unlock(PASSWORD)
+    assert list(reader.iter_rows(["이메일", "성별"])) == [(row[3], row[5]) for row in rows]
+
+
+def test_tampered_sensitive_column_is_detected(raw_csv):
+    output_dir = os.path.join(raw_csv.directory, "columns")
+    encrypt_csv_columnar(PASSWORD, raw_csv.raw, output_dir, iterations=FAST_ITERATIONS, log=None)
+    reader = ColumnarReader(output_dir).unlock(PASSWORD)
+    path = os.path.join(output_dir, reader._columns["이메일"]["file"])
+    with open(path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0x01]))
+    with pytest.raises(ValueError):
+        reader.read_column("이메일")
+
+
+def test_failed_write_publishes_no_manifest(tmp_path):
+    directory = str(tmp_path / "columns")
+    with pytest.raises(ValueError):
+        with ColumnarWriter.create(directory, PASSWORD, ["이름", "나이"], ["이름"], iterations=FAST_ITERATIONS) as writer:
+            writer.write_row(["김주원", "27"])
+            writer.write_row(["필드가 하나뿐인 행"])
+    assert not os.path.exists(os.path.join(directory, MANIFEST_FILE_NAME))
+    with pytest.raises(FileNotFoundError):
+        ColumnarReader(directory)
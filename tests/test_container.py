@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from record_crypto.container import ContainerReader, ContainerWriter, convert_fernet_file
+from record_crypto.index import RecordIndex, index_path_for
+from record_crypto.kdf import derive_key
+from record_crypto.keycheck import WrongKeyError
+from record_crypto.pipeline import write_encrypted_records
+
+from conftest import PASSWORD, WRONG_PASSWORD, read_lines
+
+FAST_ITERATIONS = 1000  # 테스트용으로 KDF 반복 횟수를 줄인다
+END_FRAME_SIZE = 4 + 12 + 16  # 길이 접두 + nonce + GCM 태그 (빈 평문)
+
+
+def _write_container(path, records, with_index=True):
+    with ContainerWriter.create(path, PASSWORD, iterations=FAST_ITERATIONS, with_index=with_index) as writer:
+        for record in records:
+            writer.write(record)
+
+
+def test_container_round_trip_and_random_access(tmp_path):
+    path = str(tmp_path / "records.rcb")
+    records = [f"레코드 {i}".encode('utf-8') for i in range(50)]
+    _write_container(path, records)
+    assert not os.path.exists(path + ".tmp")
+
+    with ContainerReader(path) as reader:
+        reader.unlock(PASSWORD)
+        assert [result.plaintext.encode('utf-8') for result in reader.decrypt_all()] == records
+        assert reader.get_record(42).plaintext == "레코드 42"
+
+
+def test_wrong_password_is_rejected(tmp_path):
+    path = str(tmp_path / "records.rcb")
+    _write_container(path, [b"a", b"b"])
+    with ContainerReader(path) as reader, pytest.raises(WrongKeyError):
+        reader.unlock(WRONG_PASSWORD)
+
+
+def test_tampered_frame_fails_only_that_record(tmp_path):
+    path = str(tmp_path / "records.rcb")
+    _write_container(path, [b"first", b"second", b"third"], with_index=False)
+    with open(path, 'r+b') as f:
+        f.seek(-(END_FRAME_SIZE + 3), os.SEEK_END)  # 끝 표시 바로 앞, 마지막 레코드의 GCM 태그
+        last = f.read(1)
+        f.seek(-(END_FRAME_SIZE + 3), os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    with ContainerReader(path) as reader:
+        reader.unlock(PASSWORD)
+        assert [result.ok for result in reader.decrypt_all()] == [True, True, False]
+
+
+def test_truncated_length_prefix_is_an_error(tmp_path):
+    path = str(tmp_path / "records.rcb")
+    _write_container(path, [b"first", b"second"], with_index=False)
+    with open(path, 'ab') as f:
+        f.write(b"\x05\x00")  # 4바이트 길이 접두보다 짧은 꼬리
+    with ContainerReader(path) as reader, pytest.raises(ValueError):
+        list(reader.frames())
+
+
+@pytest.mark.parametrize("keep_end_frame", [False, True])
+def test_dropped_trailing_record_is_detected(tmp_path, keep_end_frame):
+    path = str(tmp_path / "records.rcb")
+    _write_container(path, [b"first", b"second", b"third"])
+    with RecordIndex(path) as index:
+        cut, _ = index.span(2)
+    with open(path, 'rb') as f:
+        data = f.read()
+    os.remove(index_path_for(path))
+    with open(path, 'wb') as f:  # 마지막 레코드 프레임을 통째로 잘라낸다 (끝 표시는 남기거나 함께 버림)
+        f.write(data[:cut] + (data[-END_FRAME_SIZE:] if keep_end_frame else b""))
+    with ContainerReader(path) as reader, pytest.raises(ValueError):
+        reader.unlock(PASSWORD)
+        list(reader.decrypt_all())
+
+
+def test_failed_write_leaves_no_container(tmp_path):
+    path = str(tmp_path / "records.rcb")
+    with pytest.raises(RuntimeError):
+        with ContainerWriter.create(path, PASSWORD, iterations=FAST_ITERATIONS, with_index=True) as writer:
+            writer.write(b"first")
+            raise RuntimeError("중단")
+    assert os.listdir(tmp_path) == []
+
+
+def test_convert_legacy_file_with_different_iterations(raw_csv):
+    salt = os.urandom(16)
+    with open(raw_csv.salt, 'wb') as f:
+        f.write(salt)
+    write_encrypted_records(derive_key(PASSWORD, salt, FAST_ITERATIONS), raw_csv.raw, raw_csv.encrypted, workers=1)
+
+    output_path = os.path.join(raw_csv.directory, "records.rcb")
+    count = convert_fernet_file(raw_csv.encrypted, raw_csv.salt, PASSWORD, output_path, iterations=FAST_ITERATIONS * 2,
+                                workers=1, source_iterations=FAST_ITERATIONS)
+    lines = read_lines(raw_csv.raw)
+    assert count == len(lines)
+    with ContainerReader(output_path) as reader:
+        assert reader.iterations == FAST_ITERATIONS * 2
+        reader.unlock(PASSWORD)
+        assert [result.plaintext for result in reader.decrypt_all()] == lines
+    assert os.path.exists(index_path_for(output_path))
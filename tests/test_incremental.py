@@ -0,0 +1,111 @@
+import os
+import shutil
+
+import pytest
+
+from record_crypto.incremental import checkpoint_path_for, encrypt_incremental, load_checkpoint
+from record_crypto.pipeline import decrypt_to_csv
+
+from conftest import PASSWORD, ROWS, read_lines
+
+NEW_ROWS = ["홍길동,서울특별시 강남구,010-1234-5678,hong@naver.com,40,남,850101-1234567,신한 110-123-456789",
+            "성춘향,전라남도 목포시,010-8765-4321,chun@daum.net,23,여,030303-4123456,국민 123456-78-901234"]
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def _decrypted_lines(paths):
+    decrypt_to_csv(PASSWORD, paths.encrypted, paths.salt, paths.output, workers=1, log=None)
+    return read_lines(paths.output)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_full_encrypt_writes_checkpoint_and_incremental_appends(encrypted):
+    checkpoint = load_checkpoint(encrypted.encrypted)
+    assert checkpoint["records"] == ROWS + 1
+    assert checkpoint["source_offset"] == os.path.getsize(encrypted.raw)
+    salt, tokens = _read(encrypted.salt), _read(encrypted.encrypted)
+
+    _append(encrypted.raw, "\n".join(NEW_ROWS) + "\n")
+    result = encrypt_incremental(PASSWORD, encrypted.raw, encrypted.encrypted, encrypted.salt, workers=1, log=None)
+    assert (result.new_records, result.total_records) == (2, ROWS + 3)
+    assert _read(encrypted.salt) == salt
+    assert _read(encrypted.encrypted).startswith(tokens)
+    assert _decrypted_lines(encrypted) == read_lines(encrypted.raw)
+
+    again = encrypt_incremental(PASSWORD, encrypted.raw, encrypted.encrypted, encrypted.salt, workers=1, log=None)
+    assert again == (0, ROWS + 3)
+
+
+def test_uncommitted_tail_is_discarded(encrypted):
+    _append(encrypted.encrypted, "반쯤 쓰인 토큰")  # 체크포인트 이후에 죽은 실행의 흔적
+    _append(encrypted.raw, NEW_ROWS[0] + "\n")
+    encrypt_incremental(PASSWORD, encrypted.raw, encrypted.encrypted, encrypted.salt, workers=1, log=None)
+    assert _decrypted_lines(encrypted) == read_lines(encrypted.raw)
+
+
+def test_unfinished_last_row_is_deferred(encrypted):
+    _append(encrypted.raw, NEW_ROWS[0])
+    assert encrypt_incremental(PASSWORD, encrypted.raw, encrypted.encrypted, encrypted.salt, workers=1,
+                               log=None).new_records == 0
+    _append(encrypted.raw, "\n")
+    assert encrypt_incremental(PASSWORD, encrypted.raw, encrypted.encrypted, encrypted.salt, workers=1,
+                               log=None).new_records == 1
+    assert _decrypted_lines(encrypted) == read_lines(encrypted.raw)
+
+
+def test_full_encrypt_without_trailing_newline_then_append(raw_csv):
+    from record_crypto.pipeline import encrypt_csv
+
+    with open(raw_csv.raw, 'r+b') as f:
+        f.truncate(os.path.getsize(raw_csv.raw) - 1)  # 마지막 개행 제거
+    encrypt_csv(PASSWORD, raw_csv.raw, raw_csv.encrypted, raw_csv.salt, workers=1, log=None)
+    _append(raw_csv.raw, "\n" + NEW_ROWS[0] + "\n")
+    result = encrypt_incremental(PASSWORD, raw_csv.raw, raw_csv.encrypted, raw_csv.salt, workers=1, log=None)
+    assert result == (1, ROWS + 2)
+    assert _decrypted_lines(raw_csv) == read_lines(raw_csv.raw)
+
+
+def test_changed_last_row_without_newline_is_rejected(raw_csv):
+    from record_crypto.pipeline import encrypt_csv
+
+    with open(raw_csv.raw, 'r+b') as f:
+        f.truncate(os.path.getsize(raw_csv.raw) - 1)
+    encrypt_csv(PASSWORD, raw_csv.raw, raw_csv.encrypted, raw_csv.salt, workers=1, log=None)
+    _append(raw_csv.raw, "추가된 글자\n")
+    with pytest.raises(ValueError):
+        encrypt_incremental(PASSWORD, raw_csv.raw, raw_csv.encrypted, raw_csv.salt, workers=1, log=None)
+
+
+def test_missing_checkpoint_is_refused(encrypted):
+    os.remove(checkpoint_path_for(encrypted.encrypted))
+    before = _read(encrypted.encrypted), _read(encrypted.salt)
+    with pytest.raises(ValueError):
+        encrypt_incremental(PASSWORD, encrypted.raw, encrypted.encrypted, encrypted.salt, workers=1, log=None)
+    assert (_read(encrypted.encrypted), _read(encrypted.salt)) == before
+
+
+def test_different_source_or_changed_prefix_is_refused(encrypted):
+    other = os.path.join(encrypted.directory, "other.csv")
+    shutil.copy(encrypted.raw, other)
+    with pytest.raises(ValueError):
+        encrypt_incremental(PASSWORD, other, encrypted.encrypted, encrypted.salt, workers=1, log=None)
+
+    with open(encrypted.raw, 'r+b') as f:
+        f.seek(0)
+        f.write(b"X")
+    with pytest.raises(ValueError):
+        encrypt_incremental(PASSWORD, encrypted.raw, encrypted.encrypted, encrypted.salt, workers=1, log=None)
+
+
+def test_incremental_from_scratch(raw_csv):
+    result = encrypt_incremental(PASSWORD, raw_csv.raw, raw_csv.encrypted, raw_csv.salt, workers=1, log=None)
+    assert result == (ROWS + 1, ROWS + 1)
+    assert _decrypted_lines(raw_csv) == read_lines(raw_csv.raw)
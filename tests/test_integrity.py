@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from record_crypto import integrity
+from record_crypto.index import build_index, index_path_for
+from record_crypto.integrity import corrupt_copy, record_spans, scan_integrity
+from record_crypto.pipeline import load_key
+from record_crypto.reader import MappedRecordFile
+
+from conftest import PASSWORD, ROWS
+
+
+@pytest.fixture(params=["numpy", "pure-python"])
+def backend(request, monkeypatch):
+    """NumPy 경로와 순수 파이썬 경로를 모두 검사합니다."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(integrity, "_numpy", lambda: None)
+    return request.param
+
+
+def test_clean_file_has_no_bad_records(encrypted, backend):
+    report = scan_integrity(encrypted.encrypted, load_key(PASSWORD, encrypted.salt), workers=1)
+    assert (report.total, report.bad) == (ROWS + 1, 0)
+
+
+def test_corrupted_records_are_found(encrypted, backend):
+    corrupted = encrypted.encrypted + ".corrupted"
+    chosen = corrupt_copy(encrypted.encrypted, corrupted, num_to_corrupt=7, seed=3)
+    assert len(chosen) == 7
+    assert os.path.getsize(corrupted) == os.path.getsize(encrypted.encrypted)
+    report = scan_integrity(corrupted, load_key(PASSWORD, encrypted.salt), workers=1)
+    assert report.bad_indices == chosen
+    assert integrity.bitmap_indices(report.bitmap, report.total) == chosen
+
+
+def test_index_spans_skip_blank_lines(tmp_path, backend):
+    path = str(tmp_path / "records.bin")
+    with open(path, 'wb') as f:
+        f.write(b"first\n\n\nsecond\n\nthird")  # 빈 줄과, 개행 없이 끝나는 마지막 레코드
+    build_index(path)
+    assert os.path.exists(index_path_for(path))
+    starts, ends = record_spans(path)
+    with MappedRecordFile(path) as records:
+        assert list(zip(starts, ends)) == list(records.spans())
+
+
+def test_scanned_spans_across_buffer_boundaries(tmp_path, backend, monkeypatch):
+    # 인덱스가 없으면 버퍼 크기씩 훑어 개행을 찾으므로, 레코드가 버퍼 경계에 걸쳐도 같아야 한다
+    monkeypatch.setattr(integrity.config, "READ_BUFFER_SIZE", 4)
+    path = str(tmp_path / "records.bin")
+    with open(path, 'wb') as f:
+        f.write(b"first\n\n\nsecond\n\nthird")
+    starts, ends = record_spans(path)
+    with MappedRecordFile(path) as records:
+        assert list(zip(starts, ends)) == list(records.spans())
+
+    open(path, 'wb').close()
+    starts, ends = record_spans(path)
+    assert len(starts) == len(ends) == 0
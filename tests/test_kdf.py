@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from record_crypto import kdf
+
+FAST_ITERATIONS = 1000
+SALT = b"\x01" * 16
+
+
+@pytest.fixture(autouse=True)
+def _fresh_memo(monkeypatch):
+    monkeypatch.delenv(kdf.KEY_CACHE_DIR_ENV, raising=False)
+    kdf.clear_memo()
+    yield
+    kdf.clear_memo()
+
+
+def _key_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".key"))
+
+
+def test_disk_cache_names_are_keyed_per_directory(tmp_path):
+    first, second = str(tmp_path / "first"), str(tmp_path / "second")
+    key = kdf.derive_key("pw", SALT, FAST_ITERATIONS, cache_dir=first)
+    kdf.clear_memo()
+    assert kdf.derive_key("pw", SALT, FAST_ITERATIONS, cache_dir=second) == key
+    assert len(_key_files(first)) == len(_key_files(second)) == 1
+    assert _key_files(first) != _key_files(second)  # 디렉터리마다 다른 비밀값으로 이름을 짓는다
+    assert oct(os.stat(first).st_mode & 0o777) == oct(0o700)
+
+    kdf.clear_memo()
+    assert kdf.derive_key("pw", SALT, FAST_ITERATIONS, cache_dir=first) == key  # 디스크 캐시 적중
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="POSIX 권한 검사")
+def test_loose_cache_dir_is_refused(tmp_path):
+    directory = tmp_path / "loose"
+    directory.mkdir(mode=0o755)
+    os.chmod(directory, 0o755)
+    with pytest.warns(UserWarning):
+        kdf.derive_key("pw", SALT, FAST_ITERATIONS, cache_dir=str(directory))
+    assert os.listdir(directory) == []
+
+
+def test_use_disk_cache_false_ignores_env(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setenv(kdf.KEY_CACHE_DIR_ENV, str(directory))
+    kdf.derive_key("pw", SALT, FAST_ITERATIONS, use_disk_cache=False)
+    assert not directory.exists()
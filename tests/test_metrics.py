@@ -0,0 +1,31 @@
+import pytest
+from cryptography.fernet import Fernet
+
+from record_crypto import metrics
+from record_crypto.engine import decrypt_records, encrypt_records
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.enable()
+    yield registry
+    metrics.disable()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_decrypt_records_is_instrumented(registry, workers):
+    key = Fernet.generate_key()
+    records = [f"레코드 {i}".encode('utf-8') for i in range(50)]
+    tokens = list(encrypt_records(key, records, workers=workers, chunk_size=8, use_threads=True))
+    results = list(decrypt_records(key, tokens, workers=workers, chunk_size=8, use_threads=True))
+    assert [result.plaintext.encode('utf-8') for result in results] == records
+
+    document = registry.to_dict()
+    assert {"encrypt", "decrypt"} <= set(document["stages"])
+    assert document["histograms"]["record_latency"]["count"] == 2 * len(records)
+
+
+def test_prometheus_output_lists_counters(registry):
+    metrics.count("records", 3, result="ok")
+    text = registry.to_prometheus()
+    assert 'record_crypto_records_total{result="ok"} 3' in text
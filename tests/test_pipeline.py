@@ -0,0 +1,74 @@
+import pytest
+
+from record_crypto.index import IndexedRecordStore
+from record_crypto.keycheck import WrongKeyError
+from record_crypto.output import failure_path_for
+from record_crypto.pipeline import decrypt_to_csv, encrypt_csv, load_key, tamper_test, verify_without_key
+
+from conftest import PASSWORD, ROWS, WRONG_PASSWORD, read_lines
+
+
+def test_encrypt_decrypt_round_trip(raw_csv):
+    count = encrypt_csv(PASSWORD, raw_csv.raw, raw_csv.encrypted, raw_csv.salt, workers=1, log=None)
+    assert count == ROWS + 1  # 헤더 줄 포함
+
+    summary = decrypt_to_csv(PASSWORD, raw_csv.encrypted, raw_csv.salt, raw_csv.output, workers=1, log=None)
+    assert (summary.total, summary.succeeded, summary.failed) == (ROWS + 1, ROWS + 1, 0)
+    assert read_lines(raw_csv.output) == read_lines(raw_csv.raw)
+    assert read_lines(failure_path_for(raw_csv.output)) == ["record,failure,reason"]
+
+
+def test_indexed_store_reads_single_records(encrypted):
+    key = load_key(PASSWORD, encrypted.salt)
+    lines = read_lines(encrypted.raw)
+    with IndexedRecordStore(encrypted.encrypted, key) as store:
+        assert len(store) == len(lines)
+        assert store.get_record(0) == lines[0]
+        assert store.get_record(ROWS) == lines[ROWS]
+        assert [result.plaintext for result in store.get_records(range(10, 13))] == lines[10:13]
+
+
+def test_tampered_token_on_disk_is_reported(encrypted):
+    with open(encrypted.encrypted, 'rb') as f:
+        tokens = f.read().split(b'\n')
+    token = bytearray(tokens[5])
+    token[20] = ord('A') if token[20] != ord('A') else ord('B')
+    tokens[5] = bytes(token)
+    with open(encrypted.encrypted, 'wb') as f:
+        f.write(b'\n'.join(tokens))
+
+    summary = decrypt_to_csv(PASSWORD, encrypted.encrypted, encrypted.salt, encrypted.output, workers=1, log=None)
+    assert (summary.succeeded, summary.failed) == (ROWS, 1)
+    failures = read_lines(failure_path_for(encrypted.output))[1:]
+    assert [line.split(",")[:2] for line in failures] == [["6", "InvalidToken"]]
+    expected = read_lines(encrypted.raw)
+    del expected[5]
+    assert read_lines(encrypted.output) == expected
+
+
+def test_tamper_simulation_leaves_file_untouched(encrypted):
+    with open(encrypted.encrypted, 'rb') as f:
+        before = f.read()
+    summary = tamper_test(PASSWORD, encrypted.encrypted, encrypted.salt, encrypted.output, num_to_corrupt=10, seed=1,
+                          workers=1, log=None)
+    assert summary.total == ROWS + 1
+    assert summary.failed == len(read_lines(failure_path_for(encrypted.output))) - 1
+    assert 0 < summary.failed <= 10
+    with open(encrypted.encrypted, 'rb') as f:
+        assert f.read() == before
+
+
+def test_wrong_password_is_rejected_before_decrypting(encrypted):
+    with pytest.raises(WrongKeyError):
+        decrypt_to_csv(WRONG_PASSWORD, encrypted.encrypted, encrypted.salt, encrypted.output, workers=1, log=None)
+
+    summary = verify_without_key(WRONG_PASSWORD, encrypted.encrypted, encrypted.salt, encrypted.output, workers=1,
+                                 log=None)
+    assert (summary.succeeded, summary.failed) == (0, ROWS + 1)
+    assert read_lines(encrypted.output) == []
+
+
+def test_audit_mode_tries_every_record_with_wrong_password(encrypted):
+    summary = verify_without_key(WRONG_PASSWORD, encrypted.encrypted, encrypted.salt, encrypted.output, workers=1,
+                                 verify_all=True, log=None)
+    assert (summary.succeeded, summary.failed) == (0, ROWS + 1)
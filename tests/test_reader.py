@@ -0,0 +1,50 @@
+import os
+
+from record_crypto.index import index_path_for
+from record_crypto.pipeline import load_key
+from record_crypto.reader import MappedRecordFile, decrypt_file
+
+from conftest import PASSWORD, ROWS, read_lines
+
+
+def test_tokens_at_with_and_without_index(encrypted):
+    with open(encrypted.encrypted, 'rb') as f:
+        tokens = f.read().splitlines()
+    wanted = [0, 7, ROWS, ROWS + 5]  # 마지막 번호는 범위 밖이라 무시된다
+
+    with MappedRecordFile(encrypted.encrypted) as records:
+        indexed = records.tokens_at(wanted)
+    os.remove(index_path_for(encrypted.encrypted))
+    with MappedRecordFile(encrypted.encrypted) as records:
+        scanned = records.tokens_at(wanted)
+
+    expected = {i: tokens[i] for i in (0, 7, ROWS)}
+    assert indexed == expected
+    assert scanned == expected
+
+
+def test_decrypt_file_with_thread_workers(encrypted):
+    key = load_key(PASSWORD, encrypted.salt)
+    results = list(decrypt_file(encrypted.encrypted, key, workers=4, chunk_size=16, use_threads=True))
+    assert [result.index for result in results] == list(range(ROWS + 1))
+    assert [result.plaintext for result in results] == read_lines(encrypted.raw)
+
+
+def test_concurrent_decrypt_file_shares_mapping(encrypted):
+    # 한 호출이 끝나며 mmap을 닫아도 같은 경로를 읽는 다른 스레드의 호출은 계속 돌아야 한다
+    from concurrent.futures import ThreadPoolExecutor
+
+    from record_crypto import reader
+
+    key = load_key(PASSWORD, encrypted.salt)
+    expected = read_lines(encrypted.raw)
+
+    def run(_):
+        results = decrypt_file(encrypted.encrypted, key, workers=2, chunk_size=8, use_threads=True)
+        return [result.plaintext for result in results]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        outputs = list(pool.map(run, range(8)))
+    assert all(output == expected for output in outputs)
+    assert encrypted.encrypted not in reader._mapped_files
+    assert encrypted.encrypted not in reader._mapped_refs
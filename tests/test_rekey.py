@@ -0,0 +1,58 @@
+import importlib
+import os
+
+import pytest
+
+from record_crypto.keycheck import WrongKeyError
+from record_crypto.pipeline import load_key, write_decrypted_csv
+from record_crypto.rekey import rekey, rekey_checkpoint_path_for
+
+from conftest import PASSWORD, ROWS, read_lines
+
+NEW_PASSWORD = "new-password"
+rekey_module = importlib.import_module("record_crypto.rekey")  # 패키지의 rekey 속성은 같은 이름의 함수
+
+
+def _interrupt_after(monkeypatch, records: int) -> None:
+    """records번째 레코드부터는 키 교체 도중에 죽은 것처럼 예외를 내게 만듭니다."""
+    rotate_chunk = rekey_module._rotate_chunk
+
+    def failing(start, tokens, *args, **kwargs):
+        if start >= records:
+            raise KeyboardInterrupt
+        return rotate_chunk(start, tokens, *args, **kwargs)
+
+    monkeypatch.setattr(rekey_module, "_rotate_chunk", failing)
+
+
+def _assert_decrypts_with(encrypted, password):
+    summary = write_decrypted_csv(load_key(password, encrypted.salt), encrypted.encrypted, encrypted.output,
+                                  workers=1)
+    assert summary.failed == 0
+    assert read_lines(encrypted.output) == read_lines(encrypted.raw)
+
+
+def test_rekey_round_trip(encrypted):
+    result = rekey(PASSWORD, NEW_PASSWORD, encrypted.encrypted, encrypted.salt, workers=1, log=None)
+    assert result == (ROWS + 1, 0)
+    assert not os.path.exists(rekey_checkpoint_path_for(encrypted.encrypted))
+    _assert_decrypts_with(encrypted, NEW_PASSWORD)
+
+
+def test_interrupted_rekey_resumes_from_checkpoint(encrypted, monkeypatch):
+    with monkeypatch.context() as patch:
+        _interrupt_after(patch, 100)
+        with pytest.raises(KeyboardInterrupt):
+            rekey(PASSWORD, NEW_PASSWORD, encrypted.encrypted, encrypted.salt, workers=1, chunk_size=25,
+                  checkpoint_every=50, log=None)
+    assert os.path.exists(rekey_checkpoint_path_for(encrypted.encrypted))
+    _assert_decrypts_with(encrypted, PASSWORD)  # 마무리 전까지 원본은 그대로
+
+    with pytest.raises(WrongKeyError):
+        rekey(PASSWORD, "another-password", encrypted.encrypted, encrypted.salt, workers=1, log=None)
+
+    result = rekey(PASSWORD, NEW_PASSWORD, encrypted.encrypted, encrypted.salt, workers=1, chunk_size=25,
+                   checkpoint_every=50, log=None)
+    assert result == (ROWS + 1, 100)
+    assert not os.path.exists(rekey_checkpoint_path_for(encrypted.encrypted))
+    _assert_decrypts_with(encrypted, NEW_PASSWORD)
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("matplotlib")
+
+from record_crypto.report import BENCH_SCHEMA_VERSION, load_runs, render_report, summarize  # noqa: E402
+
+
+def _bench_report(records_per_s: float) -> dict:
+    return {
+        "schema_version": BENCH_SCHEMA_VERSION,
+        "timestamp": "2026-10-01T12:00:00+0900",
+        "results": [{
+            "scenario": "decrypt", "rows": 1000, "records": 1001, "seconds": 1001 / records_per_s,
+            "records_per_s": records_per_s, "mb_per_s": 1.0, "failed": 0,
+            "latency_us": {"p50": 20.0, "p99": 40.0, "samples": 1000},
+            "peak_rss_bytes": {"self": 50_000_000, "children": 80_000_000},
+        }],
+    }
+
+
+def test_bench_report_rows(tmp_path):
+    with open(tmp_path / "bench.jsonl", 'w', encoding='utf-8') as f:
+        for records_per_s in (1000.0, 3000.0):
+            f.write(json.dumps(_bench_report(records_per_s)) + "\n")
+    frame = load_runs([str(tmp_path)], log=None)
+    assert len(frame) == 2
+    assert frame["peak_rss_bytes"].tolist() == [50_000_000, 50_000_000]
+    assert frame["peak_rss_children_bytes"].tolist() == [80_000_000, 80_000_000]
+    summary = summarize(frame)
+    assert summary.loc["decrypt", "records_per_s"] == 2000.0
+    assert summary.loc["decrypt", "success_rate"] == 1.0
+
+
+def test_render_report_writes_png(tmp_path):
+    with open(tmp_path / "bench.json", 'w', encoding='utf-8') as f:
+        json.dump(_bench_report(1000.0), f)
+    output = tmp_path / "report.png"
+    render_report(load_runs([str(tmp_path / "bench.json")], log=None), [str(output)], log=None)
+    assert output.stat().st_size > 0
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import os
+import stat
+
+import pytest
+
+from record_crypto.service import DecryptService
+
+from conftest import PASSWORD, read_lines
+
+
+def _service(encrypted, **kwargs) -> DecryptService:
+    return DecryptService(PASSWORD, encrypted.encrypted, encrypted.salt, workers=1, log=None, **kwargs)
+
+
+def test_unix_socket_is_private(encrypted):
+    socket_path = os.path.join(encrypted.directory, "service.sock")
+    service = _service(encrypted)
+
+    async def scenario():
+        task = asyncio.ensure_future(service.serve(socket_path))
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(json.dumps({"id": 1, "records": [0, 5]}).encode('utf-8') + b"\n")
+        response = json.loads(await reader.readline())
+        writer.close()
+        task.cancel()
+        return mode, response
+
+    try:
+        mode, response = asyncio.run(scenario())
+    finally:
+        service.close()
+    assert mode == 0o600
+    lines = read_lines(encrypted.raw)
+    assert [result["plaintext"] for result in response["results"]] == [lines[0], lines[5]]
+
+
+def test_unix_socket_does_not_replace_regular_file(encrypted):
+    service = _service(encrypted)
+    try:
+        with pytest.raises(FileExistsError):
+            asyncio.run(service.serve(encrypted.raw))
+    finally:
+        service.close()
+    assert os.path.getsize(encrypted.raw) > 0
+
+
+def test_tcp_requires_token(encrypted):
+    service = _service(encrypted)
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(service.serve(host="127.0.0.1", port=0))
+    finally:
+        service.close()
+
+
+def test_every_request_needs_the_token(encrypted):
+    service = _service(encrypted, auth_token="s3cret")
+    try:
+        missing = asyncio.run(service.handle_request({"id": 1, "records": [0]}))
+        wrong = asyncio.run(service.handle_request({"id": 2, "records": [0], "token": "guess"}))
+        right = asyncio.run(service.handle_request({"id": 3, "records": [0], "token": "s3cret"}))
+    finally:
+        service.close()
+    assert "results" not in missing and "error" in missing
+    assert "results" not in wrong and "error" in wrong
+    assert right["results"][0]["plaintext"] == read_lines(encrypted.raw)[0]
@@ -0,0 +1,69 @@
+import os
+import shutil
+
+import pytest
+
+from record_crypto.keycheck import WrongKeyError
+from record_crypto.shards import ShardedDataset, decrypt_sharded, encrypt_csv_sharded, verify_shards
+
+from conftest import PASSWORD, ROWS, WRONG_PASSWORD, read_lines
+
+FAST_ITERATIONS = 1000
+SHARDS = 3
+
+
+@pytest.fixture
+def sharded(raw_csv):
+    directory = os.path.join(raw_csv.directory, "shards")
+    count = encrypt_csv_sharded(PASSWORD, raw_csv.raw, directory, shards=SHARDS, workers=1,
+                                iterations=FAST_ITERATIONS, log=None)
+    assert count == ROWS + 1
+    return directory
+
+
+def test_round_trip(raw_csv, sharded):
+    summary = decrypt_sharded(PASSWORD, sharded, raw_csv.output, workers=1, log=None)
+    assert (summary.total, summary.failed) == (ROWS + 1, 0)
+    assert read_lines(raw_csv.output) == read_lines(raw_csv.raw)
+    with pytest.raises(WrongKeyError):
+        decrypt_sharded(WRONG_PASSWORD, sharded, raw_csv.output, workers=1, log=None)
+
+
+def test_verify_detects_tampered_shard(sharded):
+    assert verify_shards(sharded, workers=1, log=None) == {}
+    shard = ShardedDataset(sharded).shards[1]
+    with open(shard.path, 'r+b') as f:
+        f.seek(10)
+        byte = f.read(1)
+        f.seek(10)
+        f.write(bytes([byte[0] ^ 0x01]))
+    problems = verify_shards(sharded, workers=1, log=None)
+    assert list(problems) == [1]
+
+
+def test_retry_ignores_parts_from_another_key(raw_csv, sharded):
+    shard = ShardedDataset(sharded).shards[SHARDS - 1]
+    shutil.move(shard.path, shard.path + ".moved")
+    # 감사 모드 + 틀린 비밀번호: 앞 샤드들은 '모두 실패'로 완료 표시가 남고, 마지막 샤드는 파일이 없어 실패한다
+    with pytest.raises(ValueError):
+        decrypt_sharded(WRONG_PASSWORD, sharded, raw_csv.output, workers=1, verify_all=True, log=None)
+    shutil.move(shard.path + ".moved", shard.path)
+
+    summary = decrypt_sharded(PASSWORD, sharded, raw_csv.output, workers=1, log=None)
+    assert (summary.total, summary.failed) == (ROWS + 1, 0)
+    assert read_lines(raw_csv.output) == read_lines(raw_csv.raw)
+
+
+def test_reencrypt_with_fewer_shards_removes_stale_files(raw_csv, sharded):
+    extra_dir = os.path.join(raw_csv.directory, "disk2")
+    encrypt_csv_sharded(PASSWORD, raw_csv.raw, sharded, shards=SHARDS + 2, shard_dirs=[sharded, extra_dir],
+                        workers=1, iterations=FAST_ITERATIONS, log=None)
+    assert os.listdir(extra_dir)
+    # 샤드 디렉터리를 바꿔 다시 만들면 예전 manifest의 파일(다른 디렉터리 포함)도 지워진다
+    encrypt_csv_sharded(PASSWORD, raw_csv.raw, sharded, shards=2, workers=1, iterations=FAST_ITERATIONS, log=None)
+    listed = {os.path.basename(shard.path) for shard in ShardedDataset(sharded).shards}
+    on_disk = {name for name in os.listdir(sharded) if name.endswith(".bin")}
+    assert on_disk == listed
+    assert os.listdir(extra_dir) == []
+    summary = decrypt_sharded(PASSWORD, sharded, raw_csv.output, workers=1, log=None)
+    assert (summary.total, summary.failed) == (ROWS + 1, 0)